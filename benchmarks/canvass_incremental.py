@@ -0,0 +1,86 @@
+"""Benchmark: full canvass run vs. a rerun after a small voter-file refresh and a
+one-turf edit (only the changed turfs are rewritten)
+
+Run from the repository root:
+    python -m benchmarks.canvass_incremental --n-voters 500000 --n-turfs 300
+"""
+
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+from click.testing import CliRunner
+
+from benchmarks.synthetic import synthetic_roads, synthetic_voters
+from utils.io import dict_to_yaml
+from voters.canvass import canvass
+
+
+def run(config: dict, config_path: Path, *args) -> float:
+    dict_to_yaml(config, str(config_path))
+    t0 = time.perf_counter()
+    result = CliRunner().invoke(canvass, [str(config_path), *args])
+    elapsed = time.perf_counter() - t0
+    if result.exit_code != 0:
+        raise result.exception
+    return elapsed
+
+
+@click.command()
+@click.option("--n-voters", default=500_000, show_default=True)
+@click.option("--n-turfs", default=300, show_default=True)
+@click.option("--n-refreshed", default=50, show_default=True)
+def main(n_voters, n_turfs, n_refreshed):
+    logging.getLogger().setLevel(logging.WARNING)
+    work_dir = Path(tempfile.mkdtemp())
+    voters_df = synthetic_voters(n_voters)
+    voter_file = work_dir / "voters.csv"
+    voters_df.to_csv(voter_file, index=False)
+    config = {
+        "voter_file": str(voter_file),
+        "output_dir": str(work_dir),
+        "list_generation_id": "plan",
+        "cache_dir": str(work_dir / "cache"),
+        "groupby_cols": ["form_id", "fullstname", "number", "fullname"],
+        "write_out_cols": ["form_id", "address", "apt", "fullname", "occupation"],
+        "street_col": "fullstname",
+        "street_number_col": "number",
+        "roads": synthetic_roads(voters_df, n_turfs=n_turfs, streets_per_turf=6),
+    }
+    config_path = work_dir / "plan.yml"
+
+    full = run(config, config_path)
+    unchanged = run(config, config_path)
+    written = {f: f.stat().st_mtime_ns for f in work_dir.glob("*_addresses.csv")}
+
+    # refresh a few voters' occupations and edit one turf's roads
+    rng = np.random.default_rng(1)
+    rows = rng.choice(n_voters, n_refreshed, replace=False)
+    voters_df.loc[rows, "occupation"] = "REFRESHED"
+    voters_df.to_csv(voter_file, index=False)
+    first = next(iter(config["roads"]))
+    config["roads"][first] = config["roads"][first][:-1]
+    refreshed = run(config, config_path)
+    master = (work_dir / "plan.csv").read_bytes()
+    rewritten = sum(
+        written.get(f) != f.stat().st_mtime_ns for f in work_dir.glob("*_addresses.csv")
+    )
+
+    rebuilt = run(config, config_path, "--rebuild")
+    assert (work_dir / "plan.csv").read_bytes() == master, "master files differ"
+
+    print(f"{n_voters} voters, {n_turfs} turfs")
+    print(f"  full run                         : {full:7.2f} s")
+    print(f"  rerun, nothing changed           : {unchanged:7.2f} s")
+    print(
+        f"  rerun, {n_refreshed} voters + 1 turf changed : {refreshed:7.2f} s "
+        f"({rewritten} turfs rewritten)"
+    )
+    print(f"  full rebuild of the same inputs  : {rebuilt:7.2f} s (same master)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: peak memory and run time of canvass loading the whole voter file vs.
+streaming it in chunks (--chunk-size), on a synthetic city
+
+Each mode runs in its own process, which reports its peak resident size (VmHWM,
+so Linux only) once canvass returns.
+
+Run from the repository root:
+    python -m benchmarks.canvass_streaming --n-voters 2000000 --n-turfs 300
+"""
+
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from benchmarks.synthetic import synthetic_roads, synthetic_voters
+from utils.io import dict_to_yaml
+
+# runs canvass, then prints the process's peak resident size in kB
+CHILD = """
+import sys
+from voters.canvass import canvass
+canvass(sys.argv[1:], standalone_mode=False)
+status = open("/proc/self/status").read().split("VmHWM:")[1]
+print(status.split()[0])
+"""
+
+
+def run(config: dict, work_dir: Path, *args) -> tuple:
+    """Runs canvass in a child process; returns its time, peak RSS (MiB) and output"""
+    dict_to_yaml(config, str(work_dir / "plan.yml"))
+    t0 = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, str(work_dir / "plan.yml"), *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - t0
+    peak = int(result.stdout.split()[-1]) / 1024
+    return elapsed, peak, (work_dir / "plan.csv").read_bytes()
+
+
+@click.command()
+@click.option("--n-voters", default=2_000_000, show_default=True)
+@click.option("--n-turfs", default=300, show_default=True)
+@click.option("--chunk-size", default=100_000, show_default=True)
+def main(n_voters, n_turfs, chunk_size):
+    work_dir = Path(tempfile.mkdtemp())
+    voters_df = synthetic_voters(n_voters, n_streets=max(2_000, n_voters // 250))
+    voters_df.to_csv(work_dir / "voters.csv", index=False)
+    config = {
+        "voter_file": str(work_dir / "voters.csv"),
+        "output_dir": str(work_dir),
+        "list_generation_id": "plan",
+        "voter_cache": False,
+        "groupby_cols": ["form_id", "fullstname", "number", "fullname"],
+        "write_out_cols": ["form_id", "address", "apt", "fullname", "occupation"],
+        "street_col": "fullstname",
+        "street_number_col": "number",
+        "roads": synthetic_roads(voters_df, n_turfs=n_turfs, streets_per_turf=6),
+    }
+    del voters_df
+
+    streamed = run(config, work_dir, "--rebuild", "--chunk-size", str(chunk_size))
+    loaded = run(config, work_dir, "--rebuild")
+    assert streamed[2] == loaded[2], "master files differ"
+
+    print(f"{n_voters} voters, {n_turfs} turfs")
+    print(f"  whole file       : {loaded[0]:7.2f} s, peak RSS {loaded[1]:7.0f} MiB")
+    print(
+        f"  chunks of {chunk_size:<7d}: {streamed[0]:7.2f} s, "
+        f"peak RSS {streamed[1]:7.0f} MiB (same master)"
+    )
+
+
+if __name__ == "__main__":
+    main()
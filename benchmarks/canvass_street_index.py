@@ -0,0 +1,72 @@
+"""Benchmark: per-road boolean masks vs. StreetIndex lookups for canvass turf extraction
+
+Run from the repository root:
+    python -m benchmarks.canvass_street_index --n-voters 500000 --n-turfs 300
+"""
+
+import time
+
+import click
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_roads, synthetic_voters
+from voters.streets import StreetIndex, normalize_street_numbers
+
+
+def masked_turf(voters_df, roadlist, street_col, street_number_col):
+    """The original canvass extraction: one full-column scan per road entry"""
+    out_list = []
+    for s in roadlist:
+        if isinstance(s, dict):
+            streetname = list(s.keys())[0]
+            numbers = list(s.values())[0]
+            out_list.append(
+                voters_df.loc[
+                    (voters_df[street_col] == streetname)
+                    & (
+                        (voters_df[street_number_col] >= numbers[0])
+                        & (voters_df[street_number_col] <= numbers[1])
+                        | (voters_df[street_number_col] == -1)
+                    )
+                ]
+            )
+        else:
+            out_list.append(voters_df.loc[(voters_df[street_col] == s)])
+    return pd.concat(out_list)
+
+
+@click.command()
+@click.option("--n-voters", default=500_000, show_default=True)
+@click.option("--n-turfs", default=300, show_default=True)
+def main(n_voters, n_turfs):
+    voters_df = synthetic_voters(n_voters)
+    voters_df["number"], _ = normalize_street_numbers(voters_df["number"])
+    roads = synthetic_roads(voters_df, n_turfs=n_turfs)
+
+    t0 = time.perf_counter()
+    masked = {
+        name: masked_turf(voters_df, roadlist, "fullstname", "number")
+        for name, roadlist in roads.items()
+    }
+    t_mask = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    street_index = StreetIndex(voters_df, "fullstname", "number")
+    t_build = time.perf_counter() - t0
+    indexed = {
+        name: pd.concat([voters_df.iloc[p] for p in street_index.lookup_roads(rl)])
+        for name, rl in roads.items()
+    }
+    t_index = time.perf_counter() - t0
+
+    for name, expected in masked.items():
+        pd.testing.assert_frame_equal(expected, indexed[name])
+
+    print(f"{n_voters} voters, {n_turfs} turfs ({sum(map(len, roads.values()))} roads)")
+    print(f"  boolean masks : {t_mask:8.3f} s")
+    print(f"  street index  : {t_index:8.3f} s (of which {t_build:.3f} s building)")
+    print(f"  speedup       : {t_mask / t_index:8.1f}x, outputs identical")
+
+
+if __name__ == "__main__":
+    main()
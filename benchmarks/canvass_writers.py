@@ -0,0 +1,82 @@
+"""Benchmark: in-memory master list (copy + pd.concat) vs. streamed turf files
+
+Run from the repository root:
+    python -m benchmarks.canvass_writers --n-voters 500000 --n-turfs 300
+"""
+
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_roads, synthetic_voters
+from utils.io import concatenate_csv_files
+from voters.canvass import init_turf_writer, turf_writer_columns, write_turf
+from voters.doors import DoorTable
+from voters.streets import StreetIndex, normalize_street_numbers
+
+GROUPBY_COLS = ["form_id", "fullstname", "number", "fullname"]
+WRITE_OUT_COLS = ["form_id", "address", "apt", "fullname", "occupation"]
+
+
+def copy_and_concat(voters_df, names, turf_positions, output_dir):
+    """The previous canvass writer: keep a copy of every turf, concat at the end"""
+    df_list = []
+    for name, positions in zip(names, turf_positions):
+        out_df = voters_df.iloc[positions]
+        out_df = out_df.sort_values(by=GROUPBY_COLS, ascending=True)
+        out_df = out_df[WRITE_OUT_COLS]
+        out_df["canvass_list"] = name
+        n = out_df.address.nunique()
+        out_df.to_csv(output_dir / f"{name}_{n}_addresses.csv", index=False)
+        df_list.append(out_df.copy())
+    pd.concat(df_list).to_csv(output_dir / "master.csv", index=False)
+
+
+def stream(voters_df, names, turf_positions, output_dir):
+    """The current canvass writer: write turfs, then stream them into the master"""
+    config = {
+        "groupby_cols": GROUPBY_COLS,
+        "write_out_cols": WRITE_OUT_COLS,
+        "output_dir": output_dir,
+    }
+    doors = DoorTable(voters_df)
+    init_turf_writer(voters_df[turf_writer_columns(config)], doors, config)
+    paths = [write_turf(n, p) for n, p in zip(names, turf_positions)]
+    concatenate_csv_files(paths, output_dir / "master.csv")
+
+
+@click.command()
+@click.option("--n-voters", default=500_000, show_default=True)
+@click.option("--n-turfs", default=300, show_default=True)
+def main(n_voters, n_turfs):
+    voters_df = synthetic_voters(n_voters)
+    voters_df["number"], _ = normalize_street_numbers(voters_df["number"])
+    roads = synthetic_roads(voters_df, n_turfs=n_turfs, streets_per_turf=25)
+    street_index = StreetIndex(voters_df, "fullstname", "number")
+    names = list(roads.keys())
+    turf_positions = [
+        np.concatenate(street_index.lookup_roads(roads[n])) for n in names
+    ]
+
+    masters = []
+    for label, writer in [("copy + concat", copy_and_concat), ("streamed", stream)]:
+        output_dir = Path(tempfile.mkdtemp())
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        writer(voters_df, names, turf_positions, output_dir)
+        elapsed = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        masters.append((output_dir / "master.csv").read_bytes())
+        print(f"  {label:14s}: {elapsed:7.2f} s, peak {peak / 2**20:8.1f} MiB")
+    assert masters[0] == masters[1], "master files differ"
+    print(f"{n_voters} voters, {n_turfs} turfs; master files identical")
+
+
+if __name__ == "__main__":
+    main()
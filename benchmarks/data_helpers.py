@@ -0,0 +1,103 @@
+"""Benchmark: per-row cost of the scalar zero_pad / contains_text in a comprehension
+vs. zero_pad_array / contains_text_array / TextMatcher
+
+Run from the repository root:
+    python -m benchmarks.data_helpers --n 1000000
+"""
+
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from utils.data import (
+    TextMatcher,
+    contains_text,
+    contains_text_array,
+    zero_pad,
+    zero_pad_array,
+)
+
+OCCUPATIONS = ["Retired Teacher", "banker", "Nurse", "student", "Attorney", "None"]
+# occupation flags of the kind used to build the voter files' include/exclude columns
+FLAG_PATTERNS = [
+    "teach",
+    "educ",
+    "professor",
+    "nurse",
+    "doctor",
+    "physician",
+    "social work",
+    "counsel",
+    "librar",
+    "principal",
+    "tutor",
+    "therap",
+    "pastor",
+    "minister",
+    "rabbi",
+    "bank",
+    "financ",
+    "invest",
+    "broker",
+    "trader",
+]
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+@click.command()
+@click.option("--n", default=1_000_000, show_default=True)
+def main(n):
+    rng = np.random.default_rng(0)
+    county_fp = pd.Series(rng.integers(1, 840, n))
+    occupation = pd.Series(rng.choice(OCCUPATIONS, n))
+    # free-text occupations: a few thousand distinct titles, and mostly distinct text
+    titles = (
+        occupation + " at employer " + pd.Series(rng.integers(0, 1_000, n)).astype(str)
+    )
+    free_text = (
+        occupation + " at employer " + pd.Series(rng.integers(0, n, n)).astype(str)
+    )
+    matcher = TextMatcher(FLAG_PATTERNS)
+    print(f"{n} values")
+
+    cases = [
+        (
+            "zero_pad",
+            lambda: [zero_pad(x, max_string_length=3) for x in county_fp],
+            lambda: zero_pad_array(county_fp, max_string_length=3),
+        ),
+        (
+            "contains_text",
+            lambda: [contains_text(s, ["teach", "educ"]) for s in occupation],
+            lambda: contains_text_array(occupation, ["teach", "educ"]),
+        ),
+        (
+            "TextMatcher",
+            lambda: [contains_text(s, FLAG_PATTERNS) for s in titles],
+            lambda: matcher.contains_array(titles),
+        ),
+        (
+            "  (free text)",
+            lambda: [contains_text(s, FLAG_PATTERNS) for s in free_text],
+            lambda: matcher.contains_array(free_text),
+        ),
+    ]
+    for name, scalar, vectorized in cases:
+        expected, t_scalar = timed(scalar)
+        result, t_vectorized = timed(vectorized)
+        assert list(result) == list(expected), f"{name} results differ"
+        print(
+            f"  {name:14s}: scalar {t_scalar:6.2f} s ({1e9 * t_scalar / n:5.0f} ns/row),"
+            f" array {t_vectorized:6.2f} s ({1e9 * t_vectorized / n:5.0f} ns/row)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark: bytes sent to the browser after an export, full figure vs. Patch
+
+The full figure is plotly's own (base64-packed) figure. The map is first drawn with
+plain-list marker arrays so that a Patch can delete single points, which makes the
+initial figure larger; that growth is reported too.
+
+Run from the repository root:
+    python -m benchmarks.map_patch --n-voters 50000
+"""
+
+import time
+
+import click
+import numpy as np
+import plotly.io as pio
+
+from benchmarks.synthetic import synthetic_voters
+from voters.figures import MapTraces, voter_map, with_plain_marker_arrays
+from voters.state import VoterState
+
+
+@click.command()
+@click.option("--n-voters", default=50_000, show_default=True)
+def main(n_voters):
+    voter_df = synthetic_voters(n_voters)
+    voter_df["uid"] = voter_df.index
+    config = {"hover_name": "fullname"}
+    rng = np.random.default_rng(0)
+
+    # the initial figure, as plotly would send it and as the app sends it
+    fig = voter_map(voter_df, config)
+    packed = len(pio.to_json(fig))
+    plain = len(pio.to_json(with_plain_marker_arrays(fig)))
+    print(f"{n_voters}-point ward")
+    print(
+        f"  initial figure: {packed:,d} B packed, {plain:,d} B with plain-list arrays"
+        f" (+{plain - packed:,d} B, {plain / packed - 1:+.0%})"
+    )
+    print(
+        f"  {'exported':>8s} {'full figure':>14s} {'patch':>14s} {'full s':>8s} {'patch s':>8s}"
+    )
+    for n_exported in [10, 100, 1_000, 10_000]:
+        state = VoterState(voter_df)
+        state.map_view = MapTraces(voter_map(state.remaining(), config))
+        state.mark_exported(rng.choice(voter_df.uid, n_exported, replace=False))
+
+        t0 = time.perf_counter()
+        full = pio.to_json(voter_map(state.remaining(), config))
+        t_full = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        patch = pio.to_json(state.map_view.remove(state.is_exported))
+        t_patch = time.perf_counter() - t0
+        print(
+            f"  {n_exported:8d} {len(full):12,d} B {len(patch):12,d} B"
+            f" {t_full:8.3f} {t_patch:8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark: serial geopy reverse lookups vs. the concurrent bulk pipeline, both
+against a local mock Nominatim /reverse service with fixed latency
+
+Run from the repository root:
+    python -m benchmarks.reverse_geocoding --n-points 500 --latency 0.05
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import click
+import numpy as np
+from geopy.geocoders import Nominatim
+
+from utils.geocoding import reverse_geocode_bulk
+
+
+def mock_reverse_server(latency: float, failure_rate: float) -> ThreadingHTTPServer:
+    """Starts a mock /reverse endpoint that answers after `latency` seconds and
+    returns 503 for a random `failure_rate` of requests"""
+    rng = np.random.default_rng(0)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            time.sleep(latency)
+            if rng.random() < failure_rate:
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = {
+                "lat": query["lat"][0],
+                "lon": query["lon"][0],
+                "display_name": "mock address",
+                "address": {"town": f"town{float(query['lat'][0]) * 100:.0f}"},
+            }
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@click.command()
+@click.option("--n-points", default=500, show_default=True)
+@click.option("--latency", default=0.05, show_default=True, help="seconds per request")
+@click.option("--failure-rate", default=0.02, show_default=True)
+def main(n_points, latency, failure_rate):
+    rng = np.random.default_rng(1)
+    lat = 42.33 + rng.normal(0, 0.02, n_points)
+    lon = -71.21 + rng.normal(0, 0.02, n_points)
+    server = mock_reverse_server(latency, failure_rate)
+    host = f"127.0.0.1:{server.server_port}"
+    print(f"{n_points} points, {latency * 1000:.0f} ms per request")
+
+    # the old path: one blocking geopy request per point; any failure aborts the loop
+    geolocator = Nominatim(user_agent="benchmark", domain=host, scheme="http")
+    t0 = time.perf_counter()
+    n_done = 0
+    try:
+        for point in zip(lat, lon):
+            geolocator.reverse(point).raw["address"]["town"]
+            n_done += 1
+    except Exception as e:  # pylint: disable=broad-except
+        print(f"  serial loop stopped after {n_done} points: {type(e).__name__}")
+    elapsed = time.perf_counter() - t0
+    print(f"  {'serial geopy':16s}: {elapsed:6.2f} s for {n_done} points")
+
+    for concurrency in [1, 4, 16, 32]:
+        t0 = time.perf_counter()
+        result = reverse_geocode_bulk(
+            lat,
+            lon,
+            "town",
+            url=f"http://{host}/reverse",
+            concurrency=concurrency,
+            rate_per_second=None,
+            backoff_seconds=0.05,
+        )
+        elapsed = time.perf_counter() - t0
+        print(
+            f"  {f'bulk, {concurrency:2d} in flight':16s}: {elapsed:6.2f} s, "
+            f"{result.town.notna().sum()} geocoded, {result.error.notna().sum()} errors"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark: per-row convert_to_int loop vs. vectorized normalize_street_numbers
+
+Run from the repository root:
+    python -m benchmarks.street_numbers --n-voters 1000000
+"""
+
+import time
+
+import click
+import numpy as np
+
+from benchmarks.synthetic import synthetic_voters
+from voters.streets import normalize_street_numbers
+
+
+def convert_to_int(x):
+    """The per-row parser canvass.py used before normalize_street_numbers"""
+    try:
+        return int(float(x))
+    except:  # noqa: E722
+        return np.nan
+
+
+@click.command()
+@click.option("--n-voters", default=1_000_000, show_default=True)
+def main(n_voters):
+    raw = synthetic_voters(n_voters)["number"]
+
+    t0 = time.perf_counter()
+    looped = raw.__class__([convert_to_int(x) for x in raw]).fillna(-1)
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vectorized, n_missing = normalize_street_numbers(raw)
+    t_vec = time.perf_counter() - t0
+
+    # the loop cannot read "58A" or "12-14"; everything it did parse must agree
+    parsed = looped != -1
+    assert (looped[parsed] == vectorized[parsed]).all()
+
+    print(f"{n_voters} street numbers")
+    print(f"  convert_to_int loop : {t_loop:7.3f} s, {int((~parsed).sum())} set to -1")
+    print(f"  vectorized          : {t_vec:7.3f} s, {n_missing} set to -1")
+    print(f"  speedup             : {t_loop / t_vec:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
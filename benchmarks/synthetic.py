@@ -0,0 +1,98 @@
+"""Synthetic voter files for benchmarking the voters/ tools without real voter data"""
+
+import numpy as np
+import pandas as pd
+
+POLITICS = ["left", "right", "middle/unclear"]
+OCCUPATIONS = ["TEACHER", "NURSE", "RETIRED", "ENGINEER", "STUDENT", "ATTORNEY", " "]
+SUFFIXES = ["ST", "RD", "AVE", "PL", "TER", "WAY"]
+
+
+def synthetic_voters(
+    n_voters: int = 500_000,
+    n_streets: int = 2_000,
+    seed: int = 0,
+    center: tuple = (42.33, -71.21),
+    spread: float = 0.03,
+) -> pd.DataFrame:
+    """Builds a voter dataframe with the columns used by canvass.py and voter.py
+    Args:
+        n_voters: number of rows (voters)
+        n_streets: number of distinct street names
+        seed: random seed
+        center: (lat, lon) around which voters are scattered
+        spread: standard deviation, in degrees, of voter locations around center
+    Returns:
+        dataframe with one row per voter
+    """
+    rng = np.random.default_rng(seed)
+    streets = np.array(
+        [f"STREET{i} {SUFFIXES[i % len(SUFFIXES)]}" for i in range(n_streets)]
+    )
+    street = streets[rng.integers(0, n_streets, n_voters)]
+    number = rng.integers(1, 1500, n_voters).astype(object)
+    # sprinkle in the messy house numbers found in real files
+    messy = rng.random(n_voters)
+    number[messy < 0.01] = "58A"
+    number[(messy >= 0.01) & (messy < 0.015)] = "12-14"
+    number[(messy >= 0.015) & (messy < 0.02)] = " "
+    number = number.astype(str)
+
+    # voters on the same street live near each other
+    street_lat = center[0] + rng.normal(0, spread, n_streets)
+    street_lon = center[1] + rng.normal(0, spread, n_streets)
+    street_code = pd.factorize(street)[0]
+    lat = street_lat[street_code] + rng.normal(0, spread / 20, n_voters)
+    lon = street_lon[street_code] + rng.normal(0, spread / 20, n_voters)
+
+    return pd.DataFrame(
+        {
+            "voter_id_number": [f"V{i:09d}" for i in range(n_voters)],
+            "form_id": rng.integers(1, 5_000, n_voters),
+            "fullname": [f"VOTER {i}" for i in range(n_voters)],
+            "number": number,
+            "fullstname": street,
+            "address": np.char.add(np.char.add(number, " "), street),
+            "apt": rng.choice([" ", "1", "2", "3"], n_voters, p=[0.7, 0.1, 0.1, 0.1]),
+            "age_on_election_day": rng.integers(18, 100, n_voters),
+            "occupation": rng.choice(OCCUPATIONS, n_voters),
+            "ward": rng.integers(1, 9, n_voters),
+            "precinct": rng.integers(1, 5, n_voters),
+            "politics": rng.choice(POLITICS, n_voters),
+            "educator": rng.integers(0, 2, n_voters),
+            "helping": rng.integers(0, 2, n_voters),
+            "finance": (rng.random(n_voters) < 0.05).astype(int),
+            "lat": lat,
+            "lon": lon,
+        }
+    )
+
+
+def synthetic_roads(
+    voters_df: pd.DataFrame,
+    n_turfs: int = 300,
+    streets_per_turf: int = 6,
+    seed: int = 0,
+) -> dict:
+    """Builds a canvass 'roads' config section over the streets in voters_df
+    Args:
+        voters_df: dataframe produced by synthetic_voters
+        n_turfs: number of turfs
+        streets_per_turf: number of road entries per turf
+        seed: random seed
+    Returns:
+        dictionary of turf name -> list of road entries (some with number ranges)
+    """
+    rng = np.random.default_rng(seed)
+    streets = voters_df.fullstname.unique()
+    roads = {}
+    for t in range(n_turfs):
+        roadlist = []
+        for s in rng.choice(streets, streets_per_turf, replace=False):
+            if rng.random() < 0.3:
+                low = int(rng.integers(1, 1000))
+                roadlist.append({str(s): [low, low + int(rng.integers(0, 500))]})
+            else:
+                roadlist.append(str(s))
+        roads[f"T{t}"] = roadlist
+    return roads
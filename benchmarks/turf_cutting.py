@@ -0,0 +1,89 @@
+"""Benchmark: cutting a whole city into balanced turfs
+
+Run from the repository root:
+    python -m benchmarks.turf_cutting --n-doors 100000 --doors-per-turf 60
+"""
+
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from voters.doors import DoorTable
+from voters.streets import StreetIndex
+from voters.turfs import cut_turfs
+
+
+def synthetic_city(n_doors: int, voters_per_door: float = 2.0, seed: int = 0):
+    """Voters at doors on a grid of streets about 100 m apart, numbered along each
+    street (odd on one side, even on the other)"""
+    rng = np.random.default_rng(seed)
+    n_streets = max(int(np.sqrt(n_doors / 40)), 2)
+    street = rng.integers(0, 2 * n_streets, n_doors)
+    # house numbers run 1-1000 along each street, which is 100 * n_streets m long
+    number = rng.integers(1, 1000, n_doors)
+    along = number * n_streets / 10 + rng.normal(0, 1, n_doors)
+    across = 100 * (street % n_streets) + np.where(number % 2, 8, -8)
+    east_west = street < n_streets
+    x = np.where(east_west, along, across)
+    y = np.where(east_west, across, along)
+
+    # a third of the doors are apartments
+    apt = pd.Series(rng.integers(1, 6, n_doors)).astype(str)
+    apt[rng.random(n_doors) > 1 / 3] = None
+    streets = np.array([f"STREET{s} ST" for s in range(2 * n_streets)])[street]
+
+    door = rng.integers(0, n_doors, int(n_doors * voters_per_door))
+    return pd.DataFrame(
+        {
+            "fullstname": streets[door],
+            "number": number[door],
+            "address": (pd.Series(number).astype(str) + " " + streets)[door].to_numpy(),
+            "apt": apt[door].to_numpy(),
+            "lat": 42.33 + y[door] / 111_195,
+            "lon": -71.2 + x[door] / (111_195 * np.cos(np.radians(42.33))),
+        }
+    )
+
+
+@click.command()
+@click.option("--n-doors", default=100_000, show_default=True)
+@click.option("--doors-per-turf", default=60, show_default=True)
+def main(n_doors, doors_per_turf):
+    voters_df = synthetic_city(n_doors)
+    config = {
+        "street_col": "fullstname",
+        "street_number_col": "number",
+        "cut_turfs": {"doors_per_turf": doors_per_turf},
+    }
+    t0 = time.perf_counter()
+    door_table = DoorTable(voters_df)
+    names, turf_positions, roads = cut_turfs(voters_df, config, door_table)
+    elapsed = time.perf_counter() - t0
+
+    doors = np.array([door_table.count_doors(p) for p in turf_positions])
+    entries = np.array([len(roads[name]) for name in names])
+    print(
+        f"{len(voters_df)} voters at {door_table.n_doors} doors -> {len(names)} "
+        f"turfs in {elapsed:.2f} s"
+    )
+    print(
+        f"  doors per turf: min {doors.min()}, median {np.median(doors):.0f}, "
+        f"max {doors.max()}"
+    )
+    print(
+        f"  road entries per turf: median {np.median(entries):.0f}, "
+        f"max {entries.max()}"
+    )
+
+    # the generated roads select the same voters as the turfs
+    street_index = StreetIndex(voters_df, "fullstname", "number")
+    for name, positions in zip(names, turf_positions):
+        found = np.unique(np.concatenate(street_index.lookup_roads(roads[name])))
+        assert np.array_equal(found, np.sort(positions)), name
+    print("  generated roads reproduce every turf")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: route length and runtime of alphabetical vs walk-order turf lists
+
+Run from the repository root:
+    python -m benchmarks.walk_order --n-doors 500 --n-doors 2000 --n-doors 5000
+"""
+
+import time
+
+import click
+import numpy as np
+
+from voters.routing import (
+    nearest_neighbour_order,
+    path_length,
+    project_m,
+    two_opt,
+    walk_order,
+)
+
+
+def synthetic_turf(n_doors: int, seed: int = 0):
+    """Doors on a grid of streets about 100 m apart, with street names and numbers
+    that sort alphabetically in a different order than they lie on the ground"""
+    rng = np.random.default_rng(seed)
+    n_streets = max(int(np.sqrt(n_doors / 20)), 2)
+    street = rng.integers(0, 2 * n_streets, n_doors)
+    along = rng.uniform(0, 100 * n_streets, n_doors)
+    across = 100 * (street % n_streets) + rng.normal(0, 5, n_doors)
+    east_west = street < n_streets
+    x = np.where(east_west, along, across)
+    y = np.where(east_west, across, along)
+    lat = 42.33 + y / 111_195
+    lon = -71.2 + x / (111_195 * np.cos(np.radians(42.33)))
+    names = rng.permutation(2 * n_streets)[street]
+    numbers = np.round(along).astype(int)
+    return lat, lon, names, numbers
+
+
+@click.command()
+@click.option("--n-doors", multiple=True, default=[500, 2000, 5000], type=int)
+def main(n_doors):
+    for n in n_doors:
+        lat, lon, names, numbers = synthetic_turf(n)
+        x, y = project_m(lat, lon)
+        alphabetical = np.lexsort([numbers, names])
+        t0 = time.perf_counter()
+        greedy = nearest_neighbour_order(x, y)
+        t1 = time.perf_counter()
+        improved = two_opt(x, y, greedy)
+        t2 = time.perf_counter()
+        routed = walk_order(lat, lon)
+        t3 = time.perf_counter()
+        print(f"{n} doors:")
+        for label, order, elapsed in [
+            ("alphabetical", alphabetical, None),
+            ("nearest neighbour", greedy, t1 - t0),
+            ("+ 2-opt", improved, t2 - t1),
+            ("walk_order", routed, t3 - t2),
+        ]:
+            length = f"{path_length(x, y, order) / 1000:8.1f} km"
+            timing = f"{elapsed * 1000:8.1f} ms" if elapsed is not None else ""
+            print(f"  {label:18s}: {length} {timing}")
+
+
+if __name__ == "__main__":
+    main()
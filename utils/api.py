@@ -1,5 +1,50 @@
 """utility functions for working with apis"""
+import threading
+from typing import Iterator, List, Optional
+from urllib.parse import urljoin
+
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# responses worth retrying: rate limited, or a temporary server failure
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# responses meaning the session's login has expired
+AUTH_EXPIRED_STATUS = (401, 419)
+
+
+def pooled_session(
+    pool_maxsize: int = 16, max_retries: int = 3, backoff_factor: float = 0.5
+) -> requests.Session:
+    """returns a keep-alive session with a connection pool sized for concurrent pulls
+    that retries idempotent requests (GET, PUT, DELETE, ...) on connection errors and
+    RETRY_STATUS responses with exponential backoff; POSTs are never retried
+    Args:
+        pool_maxsize: connections kept open per host
+        max_retries: retries per request
+        backoff_factor: wait backoff_factor * 2 ** (retry - 1) seconds between retries
+            (a Retry-After header takes precedence)
+    Returns:
+        requests session
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        # hand the last response back so raise_for_status reports its status
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 def api_authenticate(
@@ -8,11 +53,22 @@ def api_authenticate(
     apikey,
     username_key="username",
     password_key="password",
+    session: Optional[requests.Session] = None,
 ):
-    """logs in to the api using provided authentication endpoint and credentials"""
-    authenticated_session = requests.Session()
+    """logs in to the api using provided authentication endpoint and credentials
+    Args:
+        authentication_endpoint: url to which the credentials are posted
+        username: api user name
+        apikey: api key (sent as the password)
+        username_key: json key of the user name
+        password_key: json key of the api key
+        session: session to log in (defaults to a new pooled_session())
+    Returns:
+        authenticated session; raises requests.HTTPError if the login was refused
+    """
+    authenticated_session = session if session is not None else pooled_session()
 
-    authenticated_session.post(
+    response = authenticated_session.post(
         authentication_endpoint,
         json={
             username_key: username,
@@ -20,5 +76,146 @@ def api_authenticate(
         },
         timeout=60,
     )
+    response.raise_for_status()
 
     return authenticated_session
+
+
+class APIClient:
+    """Authenticated client for a JSON api: pooled keep-alive connections, retries on
+    idempotent calls, and a fresh login whenever the api reports an expired session
+    Args:
+        base_url: url that request paths are relative to
+        authentication_endpoint: url to which the credentials are posted
+        username: api user name
+        apikey: api key (sent as the password)
+        username_key: json key of the user name
+        password_key: json key of the api key
+        pool_maxsize: connections kept open per host
+        max_retries: retries per idempotent request
+        backoff_factor: base of the exponential backoff between retries (seconds)
+        timeout: seconds to wait for each response
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        authentication_endpoint: str,
+        username: str,
+        apikey: str,
+        username_key: str = "username",
+        password_key: str = "password",
+        pool_maxsize: int = 16,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 60,
+    ):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.timeout = timeout
+        self._login = dict(
+            authentication_endpoint=authentication_endpoint,
+            username=username,
+            apikey=apikey,
+            username_key=username_key,
+            password_key=password_key,
+        )
+        self._session_kwargs = dict(
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+        )
+        self._lock = threading.Lock()
+        self.session = self._authenticate()
+
+    def _authenticate(self) -> requests.Session:
+        """logs in with a new pooled session"""
+        return api_authenticate(
+            **self._login, session=pooled_session(**self._session_kwargs)
+        )
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """sends a request, logging in again once if the session has expired
+        Args:
+            method: http method
+            path: path relative to base_url (or an absolute url)
+            kwargs: passed on to requests.Session.request
+        Returns:
+            response; raises requests.HTTPError for error statuses
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        url = urljoin(self.base_url, path)
+        session = self.session
+        response = session.request(method, url, **kwargs)
+        if response.status_code in AUTH_EXPIRED_STATUS:
+            with self._lock:
+                # another thread may already have logged in again
+                if self.session is session:
+                    self.session = self._authenticate()
+            response = self.session.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def get(self, path: str, params: Optional[dict] = None):
+        """GETs a path and returns the decoded json body"""
+        return self.request("GET", path, params=params).json()
+
+    def fetch_pages(
+        self,
+        path: str,
+        params: Optional[dict] = None,
+        records_key: Optional[str] = None,
+        next_key: Optional[str] = None,
+        page_param: str = "page",
+        start_page: int = 1,
+        max_pages: Optional[int] = None,
+    ) -> Iterator[List[dict]]:
+        """yields the records of a paginated endpoint one page at a time
+        Args:
+            path: path of the first page, relative to base_url
+            params: query parameters sent with every page
+            records_key: key of the records in each json body (None if the body is
+                the list of records)
+            next_key: key holding the url of the next page, for apis that link their
+                pages; otherwise pages are requested by number until one is empty
+            page_param: query parameter holding the page number
+            start_page: number of the first page
+            max_pages: stop after this many pages (None: no limit)
+        Returns:
+            iterator over lists of records (dictionaries)
+        """
+        params = dict(params or {})
+        url, page, n_pages = path, start_page, 0
+        while url is not None and (max_pages is None or n_pages < max_pages):
+            if next_key is None:
+                params[page_param] = page
+            body = self.get(url, params)
+            records = body if records_key is None else body[records_key]
+            if not records:
+                return
+            yield records
+            n_pages += 1
+            if next_key is not None:
+                # the next-page url already carries the query parameters
+                url, params = body.get(next_key), None
+            else:
+                page += 1
+
+    def fetch_frame(
+        self, path: str, columns: Optional[List[str]] = None, **kwargs
+    ) -> pd.DataFrame:
+        """collects a paginated endpoint into a dataframe, keeping only the columns
+        asked for from each page as it arrives
+        Args:
+            path: path of the first page, relative to base_url
+            columns: fields to keep (all fields if None)
+            kwargs: passed on to fetch_pages
+        Returns:
+            dataframe with one row per record
+        """
+        frames = [
+            pd.DataFrame.from_records(records, columns=columns)
+            for records in self.fetch_pages(path, **kwargs)
+        ]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
@@ -1,7 +1,11 @@
 """functions to calculate stuff."""
 
 from statsmodels.stats.contingency_tables import Table2x2
-from typing import Union, Tuple, List
+from typing import Optional, Union, Tuple, List
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
 
 
 def odds_ratio(
@@ -32,3 +36,94 @@ def odds_ratio(
     t = Table2x2([condition1_yes_no, condition2_yes_no])
     upper_lower = t.oddsratio_confint((1 - ci))
     return t.oddsratio, upper_lower[0], upper_lower[1]
+
+
+def odds_ratios(
+    tables: np.ndarray,
+    ci: float = 0.95,
+    continuity_correction: float = 0.5,
+    correct_all_cells: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Computes odds_ratio for many 2x2 tables at once (e.g., one per precinct x
+    demographic stratum), with the same log-scale (Woolf) confidence interval
+    Args:
+        tables: (N, 2, 2) counts; tables[i] is [condition1_yes_no, condition2_yes_no]
+        ci: float b/w 0 and 1 (confidence interval) = (1- alpha)
+        continuity_correction: value given to the zero cells (the default 0.5 is
+            what Table2x2, and so odds_ratio, uses); with 0, tables holding a zero
+            get infinite or NaN results
+        correct_all_cells: add continuity_correction to every cell of the tables
+            that hold a zero (the Haldane-Anscombe correction) instead
+    Returns:
+        tuple: arrays of odds ratios, lower bounds and upper bounds (length N)
+    """
+    if (ci < 0) | (ci > 1):
+        raise ValueError("Confidence interval value must be between 0 and 1")
+    tables = np.asarray(tables, dtype=float)
+    if tables.ndim != 3 or tables.shape[1:] != (2, 2):
+        raise TypeError("Argument tables should be an (N, 2, 2) array of counts")
+
+    if continuity_correction:
+        if correct_all_cells:
+            has_zero = (tables == 0).any(axis=(1, 2))
+            tables = tables + continuity_correction * has_zero[:, None, None]
+        else:
+            tables = np.where(tables == 0, continuity_correction, tables)
+    a, b = tables[:, 0, 0], tables[:, 0, 1]
+    c, d = tables[:, 1, 0], tables[:, 1, 1]
+    z = norm.ppf(1 - (1 - ci) / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_or = np.log(a) + np.log(d) - np.log(b) - np.log(c)
+        log_or_se = np.sqrt((1 / tables).sum(axis=(1, 2)))
+        return (
+            np.exp(log_or),
+            np.exp(log_or - z * log_or_se),
+            np.exp(log_or + z * log_or_se),
+        )
+
+
+def odds_ratio_table(
+    df: pd.DataFrame,
+    by: Union[str, List[str]],
+    condition: str,
+    outcome: str,
+    count: Optional[str] = None,
+    condition_levels: Tuple = (True, False),
+    outcome_levels: Tuple = (True, False),
+    ci: float = 0.95,
+    continuity_correction: float = 0.5,
+    correct_all_cells: bool = False,
+) -> pd.DataFrame:
+    """Computes the odds ratio of an outcome between two conditions within every
+    group of a frame (e.g., turnout of one demographic vs. another, per precinct)
+    Args:
+        df: one row per person (or per cell, with counts in count)
+        by: column(s) defining the strata
+        condition: column holding the two conditions compared
+        outcome: column holding whether the event happened
+        count: column of counts to sum (rows are counted if None)
+        condition_levels: values of condition for table rows 1 and 2
+        outcome_levels: values of outcome for 'with event' and 'without event'
+        ci: float b/w 0 and 1 (confidence interval) = (1- alpha)
+        continuity_correction: see odds_ratios
+        correct_all_cells: see odds_ratios
+    Returns:
+        dataframe indexed by stratum with the four counts, odds_ratio, lower and upper
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    grouped = df.groupby(by + [condition, outcome], observed=True)
+    counts = grouped[count].sum() if count is not None else grouped.size()
+    cells = [(cond, out) for cond in condition_levels for out in outcome_levels]
+    # one row per stratum, one column per cell of its 2x2 table (missing cells are 0)
+    wide = counts.unstack([condition, outcome]).reindex(columns=cells).fillna(0)
+    wide.columns = [
+        "condition1_yes",
+        "condition1_no",
+        "condition2_yes",
+        "condition2_no",
+    ]
+
+    ratio, lower, upper = odds_ratios(
+        wide.to_numpy().reshape(-1, 2, 2), ci, continuity_correction, correct_all_cells
+    )
+    return wide.assign(odds_ratio=ratio, lower=lower, upper=upper)
@@ -1,6 +1,9 @@
 """Assorted functions for manipuling data, strings, etc."""
 
-from typing import Literal, List, Union
+from typing import Literal, List, Optional, Union
+import re
+
+import numpy as np
 import pandas as pd
 from itertools import compress
 
@@ -39,6 +42,53 @@ def get_smarties(
     raise TypeError("get_smarties argument 'row' must be a Pandas Series or a list")
 
 
+def get_smarties_frame(
+    df: pd.DataFrame,
+    names: List[str],
+    output: Literal["labels", "bitmask", "categorical"] = "labels",
+    sep: str = "|",
+) -> Union[pd.Series, np.ndarray]:
+    """get_smarties for every row of a frame in one pass over its boolean block
+    Args:
+        df: frame holding the dummy columns
+        names: dummy columns to read (values are taken as truthy/falsy)
+        output: 'labels' for a column of lists of names (as get_smarties returns),
+            'bitmask' for one integer per row whose bit i is set when names[i] is
+            true, or 'categorical' for the names joined by sep, as a categorical
+        sep: separator of the names in the 'categorical' output
+    Returns:
+        Series aligned with df; with 'bitmask' and more than 64 names, an
+        (n_rows, ceil(len(names) / 8)) uint8 array of little-endian packed bits
+    """
+    if output not in ("labels", "bitmask", "categorical"):
+        raise ValueError(
+            f"output must be 'labels', 'bitmask' or 'categorical', not {output!r}"
+        )
+    matrix = df[names].to_numpy(dtype=bool)
+    if output == "bitmask" and len(names) > 64:
+        return np.packbits(matrix, axis=1, bitorder="little")
+    if len(names) <= 64:
+        bits = np.arange(len(names), dtype=np.uint64)
+        masks = matrix.astype(np.uint64) @ (np.uint64(1) << bits)
+        if output == "bitmask":
+            return pd.Series(masks, index=df.index, dtype=np.uint64)
+        codes, uniques = pd.factorize(masks)
+        combos = ((uniques[:, None] >> bits) & np.uint64(1)).astype(bool)
+    else:
+        combos, codes = np.unique(matrix, axis=0, return_inverse=True)
+        codes = codes.reshape(-1)
+
+    # build the labels of each distinct combination of names once
+    labels = [list(compress(names, combo)) for combo in combos]
+    if output == "categorical":
+        categories = [sep.join(label) for label in labels]
+        return pd.Series(
+            pd.Categorical.from_codes(codes, categories=pd.Index(categories)),
+            index=df.index,
+        )
+    return pd.Series([list(labels[c]) for c in codes], index=df.index, dtype=object)
+
+
 def zero_pad(
     x, front_or_back: Literal["front", "back"] = "front", max_string_length: int = 5
 ):
@@ -60,6 +110,43 @@ def zero_pad(
     return str(x) + "0" * (max_string_length - len(str(x)))
 
 
+def zero_pad_array(
+    x: Union[pd.Series, np.ndarray, List],
+    front_or_back: Literal["front", "back"] = "front",
+    max_string_length: int = 5,
+) -> Union[pd.Series, np.ndarray]:
+    """zero_pad for a whole array of numbers or strings at once
+    Args:
+        x: Series, array or list of integers or strings to be zero-padded
+        front_or_back: append zeros before each value ('front') or after it ('back')
+        max_string_length: desired length of the output strings
+    Returns:
+        Series (keeping x's index) if x is a Series, otherwise an object array, of
+        strings of length max_string_length
+    """
+    # pad each distinct value once: codes, wards and the like repeat a lot
+    if isinstance(x, pd.Series):
+        values = x.to_numpy()
+    else:
+        # keep the elements of a list as they are (no int -> float coercion)
+        values = x if isinstance(x, np.ndarray) else np.asarray(x, dtype=object)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    strings = [str(u) for u in uniques]
+    for u in strings:
+        if len(u) > max_string_length:
+            raise ValueError(f"{u} has more than {max_string_length} digits")
+    if front_or_back == "front":
+        padded = [u.rjust(max_string_length, "0") for u in strings]
+    else:
+        padded = [u.ljust(max_string_length, "0") for u in strings]
+    padded = np.array(padded, dtype=object)[codes]
+    return (
+        pd.Series(padded, index=x.index, name=x.name)
+        if isinstance(x, pd.Series)
+        else padded
+    )
+
+
 def contains_text(s: str, text_list: List[str], match_case: bool = False) -> bool:
     """Returns true if text string contains any of the substrings in a list
     Args:
@@ -83,3 +170,96 @@ def contains_text(s: str, text_list: List[str], match_case: bool = False) -> boo
             if t.lower() in s.lower():
                 return True
     return False
+
+
+def contains_text_array(
+    s: Union[pd.Series, np.ndarray, List[str]],
+    text_list: List[str],
+    match_case: bool = False,
+) -> np.ndarray:
+    """contains_text for a whole array of strings at once
+    Args:
+        s: Series, array or list of strings within which to search for substrings
+        text_list: list of substrings
+        match_case: set to True if you want it to match case when searching
+    Returns:
+        boolean array, True where one of the text_list substrings is in the string
+    """
+    values = s.to_numpy() if isinstance(s, pd.Series) else np.asarray(s, dtype=object)
+    if pd.api.types.infer_dtype(values, skipna=False) not in ("string", "empty"):
+        raise TypeError("First argument must contain only strings.")
+    if not isinstance(text_list, list):
+        raise TypeError("Second argument must be a list of strings (it is not a list)")
+    for t in text_list:
+        if not isinstance(t, str):
+            raise TypeError(f"All list members must be strings. {t} is not a string.")
+    return TextMatcher(text_list, match_case).contains_array(values)
+
+
+class TextMatcher:
+    """Precompiled substring matcher: the patterns are joined into one alternation
+    regex, built once and reused on any number of strings or columns; matches
+    whatever contains_text matches
+    Args:
+        patterns: substrings to look for (e.g., ['TEACHER', 'NURSE'])
+        match_case: set to True if you want it to match case when searching
+    """
+
+    def __init__(self, patterns: List[str], match_case: bool = False):
+        self.patterns = list(dict.fromkeys(patterns))
+        self.match_case = match_case
+        # case-insensitive matching lowercases the patterns here and each string once
+        # when it is searched (much faster than re.IGNORECASE), so matched text maps
+        # straight back to the pattern it came from
+        self._by_text = {}
+        for p in self.patterns:
+            self._by_text.setdefault(self._fold(p), p)
+        # longest first, so that of two patterns matching at the same place
+        # (e.g., 'teacher aide' and 'teacher') the longer one is reported
+        ordered = sorted(self._by_text, key=len, reverse=True)
+        self._regex = (
+            re.compile("|".join(re.escape(p) for p in ordered)) if ordered else None
+        )
+
+    def _fold(self, text: str) -> str:
+        return text if self.match_case else text.lower()
+
+    def match(self, s) -> Optional[str]:
+        """Returns the pattern found in s (the leftmost one; None if there is none or
+        s is not a string)"""
+        if self._regex is None or not isinstance(s, str):
+            return None
+        found = self._regex.search(self._fold(s))
+        return None if found is None else self._by_text[found.group()]
+
+    def contains(self, s) -> bool:
+        """Returns True if s contains any of the patterns"""
+        return self.match(s) is not None
+
+    def match_array(
+        self, values: Union[pd.Series, np.ndarray, List]
+    ) -> Union[pd.Series, np.ndarray]:
+        """Applies match to a whole column, searching each distinct value once
+        Args:
+            values: Series, array or list of strings (missing values never match)
+        Returns:
+            Series (keeping the index) if values is a Series, otherwise an object
+            array, holding the matched pattern or None
+        """
+        codes, uniques = pd.factorize(
+            (
+                values.to_numpy()
+                if isinstance(values, pd.Series)
+                else np.asarray(values, dtype=object)
+            ),
+            use_na_sentinel=False,
+        )
+        matched = np.array([self.match(u) for u in uniques], dtype=object)[codes]
+        if isinstance(values, pd.Series):
+            return pd.Series(matched, index=values.index, name=values.name)
+        return matched
+
+    def contains_array(self, values: Union[pd.Series, np.ndarray, List]) -> np.ndarray:
+        """Returns a boolean array, True where the value contains any of the patterns"""
+        matched = self.match_array(values)
+        return pd.notna(np.asarray(matched, dtype=object))
@@ -1,12 +1,24 @@
 """this file contains functions that obtain and/or lightly process commonly used datasets"""
+
+import hashlib
+import os
+from functools import lru_cache
+from pathlib import Path, PosixPath
+from typing import List, Optional, Union
+
+import numpy as np
 import pandas as pd
 
-from utils.data import zero_pad
+from utils.data import zero_pad_array
+from utils.io import DEFAULT_CACHE_DIR
 
 US_CENSUS_COUNTY_DATA_WEB_ADDRESS = (
     "http://www2.census.gov/geo/docs/reference/codes/files/national_county.txt"
 )
 
+# bump when get_county_df changes the columns it derives, so stale caches are rebuilt
+COUNTY_TABLE_VERSION = 1
+
 
 def get_us_state_to_abbr_dict():
     """returns conversion dictionary. Credit/thanks to Roger Allen: https://gist.github.com/rogerallen/1583593"""
@@ -71,32 +83,156 @@ def get_us_state_to_abbr_dict():
     }
 
 
-def get_county_df(web_location_of_file: str = US_CENSUS_COUNTY_DATA_WEB_ADDRESS):
-    """download and assemble a pandas dataframe containing FIPS codes and names for all US counties"""
+def get_county_df(
+    web_location_of_file: str = US_CENSUS_COUNTY_DATA_WEB_ADDRESS,
+    cache_dir: Optional[Union[str, PosixPath]] = None,
+    refresh: bool = False,
+) -> pd.DataFrame:
+    """download and assemble a pandas dataframe containing FIPS codes and names for all
+    US counties; the assembled table is kept in a versioned parquet file, so only the
+    first call downloads and parses the census file
+    Args:
+        web_location_of_file: url (or path) of the census county file
+        cache_dir: directory holding the parquet copy (defaults to ~/.cache/newton)
+        refresh: download and rebuild the table even if a cached copy exists
+    Returns:
+        dataframe with state_abbr, state_fp, county_fp, county_name, fips and state
+    """
+    cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+    source_key = hashlib.sha1(web_location_of_file.encode()).hexdigest()[:16]
+    cache_filepath = (
+        cache_dir / f"us_counties_v{COUNTY_TABLE_VERSION}_{source_key}.parquet"
+    )
+    if cache_filepath.exists() and not refresh:
+        return pd.read_parquet(cache_filepath)
+
     # download text data
-    county_df = pd.read_csv(web_location_of_file, header=None)
+    county_df = pd.read_csv(web_location_of_file, header=None, dtype=str)
     county_df.columns = ["state_abbr", "state_fp", "county_fp", "county_name", "h"]
 
     # convert two-digit state code and three-digit county code into zero-padded strings
-    county_df["state_fp"] = [
-        zero_pad(x, max_string_length=2) for x in county_df.state_fp
-    ]
-    county_df["county_fp"] = [
-        zero_pad(x, max_string_length=3) for x in county_df.county_fp
-    ]
+    county_df["state_fp"] = zero_pad_array(county_df.state_fp, max_string_length=2)
+    county_df["county_fp"] = zero_pad_array(county_df.county_fp, max_string_length=3)
 
     # assemble fips
-    county_df["fips"] = [s + c for s, c in zip(county_df.state_fp, county_df.county_fp)]
+    county_df["fips"] = county_df.state_fp + county_df.county_fp
 
     # delete the word 'County' from all of the county names
-    county_df["county_name"] = [x.replace(" County", "") for x in county_df.county_name]
+    county_df["county_name"] = county_df.county_name.str.replace(
+        " County", "", regex=False
+    )
 
     us_state_to_abbr = get_us_state_to_abbr_dict()
     abbr_to_us_state = {a: s for s, a in us_state_to_abbr.items()}
     # expand the state abbreviation for easier merging
-    county_df["state"] = [abbr_to_us_state[x] for x in county_df.state_abbr]
+    county_df["state"] = county_df.state_abbr.map(abbr_to_us_state)
+    unknown = county_df.state_abbr[county_df.state.isna()].unique()
+    if len(unknown):
+        raise ValueError(
+            f"Unrecognised state abbreviation(s) in {web_location_of_file}: "
+            f"{', '.join(map(str, unknown))}"
+        )
 
     # housecleaning
     county_df.drop("h", inplace=True, axis=1)
 
+    # write-then-rename so an interrupted run never leaves a truncated cache
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_filepath = cache_filepath.with_suffix(f".{os.getpid()}.tmp")
+    county_df.to_parquet(tmp_filepath)
+    os.replace(tmp_filepath, cache_filepath)
+
     return county_df
+
+
+class CountyLookup:
+    """Hash-indexed view of the county table for repeated joins: maps FIPS codes to
+    county and state names, and (state, county name) pairs to FIPS codes, for single
+    values (dictionary lookups) or whole columns at a time (index lookups)
+    Args:
+        county_df: table from get_county_df (loaded through its cache if None)
+    """
+
+    def __init__(self, county_df: Optional[pd.DataFrame] = None):
+        county_df = county_df if county_df is not None else get_county_df()
+        self.columns = [c for c in county_df.columns if c != "fips"]
+        self._arrays = {c: county_df[c].to_numpy(dtype=object) for c in county_df}
+        self._fips_index = pd.Index(county_df.fips)
+        self._rows = county_df.set_index("fips")[self.columns].to_dict("index")
+        # counties are keyed by full state name and by abbreviation
+        self._name_index = pd.MultiIndex.from_arrays(
+            [
+                np.concatenate([county_df.state, county_df.state_abbr]),
+                np.concatenate([county_df.county_name, county_df.county_name]),
+            ]
+        )
+        self._name_fips = np.concatenate([county_df.fips, county_df.fips])
+        self._fips_by_name = dict(zip(self._name_index, self._name_fips))
+
+    def _take(self, column: str, positions: np.ndarray) -> np.ndarray:
+        """Values of a column at row positions (None where the position is -1)"""
+        values = self._arrays[column][np.where(positions >= 0, positions, 0)]
+        values[positions < 0] = None
+        return values
+
+    def county(self, fips: str) -> Optional[dict]:
+        """Returns the county with a FIPS code as a dictionary (None if unknown)"""
+        return self._rows.get(fips)
+
+    def lookup(self, fips) -> pd.DataFrame:
+        """Returns the county rows for a sequence of FIPS codes
+        Args:
+            fips: five-digit FIPS strings
+        Returns:
+            dataframe indexed by fips (None values for unknown codes)
+        """
+        positions = self._fips_index.get_indexer(fips)
+        return pd.DataFrame(
+            {c: self._take(c, positions) for c in self.columns},
+            index=pd.Index(fips, name="fips"),
+        )
+
+    def fips_for(self, state, county_name):
+        """Returns the FIPS code(s) of counties given by state and county name
+        Args:
+            state: state name or two-letter abbreviation (or a sequence of them)
+            county_name: county name without the word 'County' (or a sequence)
+        Returns:
+            FIPS string, or array of them for sequences (None where nothing matches)
+        """
+        if isinstance(state, str):
+            return self._fips_by_name.get((state, county_name))
+        keys = pd.MultiIndex.from_arrays([np.asarray(state), np.asarray(county_name)])
+        positions = self._name_index.get_indexer(keys)
+        fips = self._name_fips[np.where(positions >= 0, positions, 0)].astype(object)
+        fips[positions < 0] = None
+        return fips
+
+    def join(
+        self,
+        df: pd.DataFrame,
+        fips_col: str = "fips",
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Returns a copy of df with county columns looked up from its FIPS column
+        Args:
+            df: frame with a column of FIPS codes
+            fips_col: name of that column
+            columns: county columns to add (default: county_name and state)
+        Returns:
+            copy of df with the county columns appended (None for unknown codes)
+        """
+        positions = self._fips_index.get_indexer(df[fips_col])
+        return df.assign(
+            **{
+                c: self._take(c, positions)
+                for c in (columns or ["county_name", "state"])
+            }
+        )
+
+
+@lru_cache(maxsize=None)
+def county_lookup() -> CountyLookup:
+    """Returns a CountyLookup over the cached census county table, built once per
+    process"""
+    return CountyLookup()
@@ -0,0 +1,426 @@
+"""Geocoding through a persistent on-disk cache, with batch lookups that only send
+the queries the cache cannot answer to the (rate-limited) geocoder"""
+
+import asyncio
+import contextlib
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PosixPath
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import requests
+from geopy.extra.rate_limiter import RateLimiter
+from geopy.geocoders import Nominatim
+
+from utils.io import DEFAULT_CACHE_DIR
+
+DEFAULT_GEOCODE_CACHE = DEFAULT_CACHE_DIR / "geocode.sqlite"
+DEFAULT_TTL_DAYS = 90
+DEFAULT_MAX_ENTRIES = 500_000
+
+# Nominatim's usage policy allows at most one request per second
+DEFAULT_MIN_DELAY_SECONDS = 1.0
+
+NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+
+# responses worth retrying: rate limited, or a temporary server failure
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# sqlite limits the number of parameters in one statement
+SQLITE_BATCH = 500
+
+
+def normalize_query(query: str) -> str:
+    """Cache key of a forward-geocoding query: lower case, single spaces"""
+    return " ".join(str(query).lower().split())
+
+
+def latlon_key(lat: float, lon: float) -> str:
+    """Cache key of a reverse-geocoding query (rounded to ~0.1 m)"""
+    return f"{float(lat):.6f},{float(lon):.6f}"
+
+
+class GeocodeCache:
+    """SQLite store of raw geocoder responses keyed by (kind, query). Entries older
+    than the TTL are ignored and purged, and the oldest entries are evicted once the
+    store holds more than max_entries. Queries the geocoder could not resolve are
+    cached too (as None), so they are not retried until they expire.
+    Args:
+        path: sqlite file (created if needed; defaults to ~/.cache/newton/geocode.sqlite)
+        ttl_days: days an entry stays valid
+        max_entries: maximum number of entries kept
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, PosixPath]] = None,
+        ttl_days: float = DEFAULT_TTL_DAYS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = Path(path) if path is not None else DEFAULT_GEOCODE_CACHE
+        self.ttl_seconds = ttl_days * 86_400
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS geocodes (kind TEXT, query TEXT, "
+                "result TEXT, created REAL, PRIMARY KEY (kind, query))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS geocodes_created ON geocodes (created)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Opens a connection for one transaction, which is committed (or rolled back
+        on error) before the connection is closed"""
+        with contextlib.closing(sqlite3.connect(self.path, timeout=30)) as connection:
+            with connection:
+                yield connection
+
+    def get_many(self, kind: str, queries: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """Returns the unexpired cached results for the queries that have one
+        Args:
+            kind: 'geocode' or 'reverse'
+            queries: cache keys
+        Returns:
+            dictionary mapping each cached query to its raw result (None if the
+            geocoder found nothing)
+        """
+        queries = list(queries)
+        oldest = time.time() - self.ttl_seconds
+        found = {}
+        with self._connect() as connection:
+            for i in range(0, len(queries), SQLITE_BATCH):
+                batch = queries[i : i + SQLITE_BATCH]
+                rows = connection.execute(
+                    "SELECT query, result FROM geocodes WHERE kind = ? AND created >= ? "
+                    f"AND query IN ({','.join('?' * len(batch))})",
+                    [kind, oldest, *batch],
+                )
+                found.update((query, json.loads(result)) for query, result in rows)
+        return found
+
+    def put_many(self, kind: str, results: Dict[str, Optional[dict]]):
+        """Stores raw results, then purges expired entries and enforces the size cap
+        Args:
+            kind: 'geocode' or 'reverse'
+            results: dictionary mapping cache keys to raw results (or None)
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)",
+                [(kind, q, json.dumps(r), now) for q, r in results.items()],
+            )
+            connection.execute(
+                "DELETE FROM geocodes WHERE created < ?", [now - self.ttl_seconds]
+            )
+            (n_entries,) = connection.execute(
+                "SELECT COUNT(*) FROM geocodes"
+            ).fetchone()
+            if n_entries > self.max_entries:
+                connection.execute(
+                    "DELETE FROM geocodes WHERE rowid IN (SELECT rowid FROM geocodes "
+                    "ORDER BY created LIMIT ?)",
+                    [n_entries - self.max_entries],
+                )
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+
+class CachedGeocoder:
+    """Wraps a geopy geocoder with a GeocodeCache. Batch lookups dedupe their queries,
+    answer what they can from the cache and rate-limit only the remaining requests.
+    Args:
+        geocoder: object with geopy's geocode(query) and reverse((lat, lon)) methods,
+            returning objects with a 'raw' dict (defaults to Nominatim)
+        cache: GeocodeCache to use (defaults to one at the default location)
+        min_delay_seconds: minimum time between requests sent to the geocoder
+        user_agent: user agent of the default Nominatim geocoder
+    """
+
+    def __init__(
+        self,
+        geocoder=None,
+        cache: Optional[GeocodeCache] = None,
+        min_delay_seconds: float = DEFAULT_MIN_DELAY_SECONDS,
+        user_agent: str = "newton-geocoding",
+    ):
+        self.geocoder = (
+            geocoder if geocoder is not None else Nominatim(user_agent=user_agent)
+        )
+        self.cache = cache if cache is not None else GeocodeCache()
+        self._geocode = RateLimiter(
+            self.geocoder.geocode,
+            min_delay_seconds=min_delay_seconds,
+            error_wait_seconds=max(min_delay_seconds, 1.0),
+            swallow_exceptions=False,
+        )
+        self._reverse = RateLimiter(
+            self.geocoder.reverse,
+            min_delay_seconds=min_delay_seconds,
+            error_wait_seconds=max(min_delay_seconds, 1.0),
+            swallow_exceptions=False,
+        )
+
+    def _lookup(
+        self, kind: str, keys: List[str], queries: Dict[str, object]
+    ) -> List[Optional[dict]]:
+        """Resolves cache keys, sending each distinct miss to the geocoder once
+        Args:
+            kind: 'geocode' or 'reverse'
+            keys: cache key of every query (may repeat)
+            queries: dictionary mapping each distinct key to the geocoder argument
+        Returns:
+            raw result (or None) for each key
+        """
+        results = self.cache.get_many(kind, queries)
+        misses = [key for key in queries if key not in results]
+        send = self._geocode if kind == "geocode" else self._reverse
+        fetched = {}
+        try:
+            for key in misses:
+                location = send(queries[key])
+                fetched[key] = location.raw if location is not None else None
+        finally:
+            # keep what was fetched even if a later request fails
+            if fetched:
+                self.cache.put_many(kind, fetched)
+        results.update(fetched)
+        return [results[key] for key in keys]
+
+    def geocode(self, query: str) -> Optional[dict]:
+        """Returns the raw geocoder result for an address or place name (None if not found)"""
+        return self.geocode_many([query])[0]
+
+    def reverse(self, latlon: Tuple[float, float]) -> Optional[dict]:
+        """Returns the raw geocoder result for a (lat, lon) point (None if not found)"""
+        return self.reverse_many([latlon[0]], [latlon[1]])[0]
+
+    def geocode_many(self, queries: Iterable[str]) -> List[Optional[dict]]:
+        """Returns the raw geocoder result (or None) for each query, in order"""
+        queries = list(queries)
+        keys = [normalize_query(q) for q in queries]
+        distinct = {}
+        for key, query in zip(keys, queries):
+            # the first spelling of each distinct query is the one sent
+            distinct.setdefault(key, query)
+        return self._lookup("geocode", keys, distinct)
+
+    def reverse_many(
+        self, lat: Iterable[float], lon: Iterable[float]
+    ) -> List[Optional[dict]]:
+        """Returns the raw geocoder result (or None) for each point, in order"""
+        points = list(zip(lat, lon))
+        keys = [latlon_key(*point) for point in points]
+        return self._lookup("reverse", keys, dict(zip(keys, points)))
+
+    def geocode_batch(self, queries: Union[pd.Series, pd.DataFrame]) -> pd.DataFrame:
+        """Geocodes a column of queries, or the rows of a frame of address parts
+        Args:
+            queries: Series of query strings, or DataFrame whose non-null values in
+                each row (e.g., city, state, zipcode, country) form the query
+        Returns:
+            DataFrame aligned with queries, with 'lat' and 'lon' (NaN if not found)
+        """
+        if isinstance(queries, pd.DataFrame):
+            queries = queries.apply(
+                lambda row: " ".join(str(x) for x in row if pd.notna(x)), axis=1
+            )
+        results = self.geocode_many(queries.astype(str))
+        return pd.DataFrame(
+            {
+                "lat": [float(r["lat"]) if r else np.nan for r in results],
+                "lon": [float(r["lon"]) if r else np.nan for r in results],
+            },
+            index=queries.index,
+        )
+
+    def reverse_batch(
+        self,
+        lat: Union[pd.Series, np.ndarray],
+        lon: Union[pd.Series, np.ndarray],
+        loc_part: str,
+    ) -> pd.Series:
+        """Returns one part of the address (e.g., 'town', 'county', 'postcode') of
+        each point, aligned with lat (None where the point or the part is unknown)"""
+        index = lat.index if isinstance(lat, pd.Series) else None
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        parts = np.full(len(lat), None, dtype=object)
+        results = self.reverse_many(lat[valid], lon[valid])
+        parts[valid] = [(r or {}).get("address", {}).get(loc_part) for r in results]
+        return pd.Series(parts, index=index, name=loc_part)
+
+
+_default_geocoder = None
+
+
+def default_geocoder() -> CachedGeocoder:
+    """Returns a CachedGeocoder around Nominatim, shared by the functions in
+    utils.location"""
+    global _default_geocoder
+    if _default_geocoder is None:
+        _default_geocoder = CachedGeocoder()
+    return _default_geocoder
+
+
+class AsyncRateLimiter:
+    """Spaces out the starts of requests made by concurrent asyncio tasks
+    Args:
+        rate_per_second: maximum number of request starts per second (None: no limit)
+    """
+
+    def __init__(self, rate_per_second: Optional[float]):
+        self.interval = 1 / rate_per_second if rate_per_second else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        """Sleeps until the caller may start its request"""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RetryableResponse(Exception):
+    """Raised for responses that should be retried (see RETRY_STATUS)"""
+
+    def __init__(self, status_code: int, retry_after: Optional[str] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.retry_after = float(retry_after) if str(retry_after).isdigit() else None
+
+
+def _get_json(session: requests.Session, url: str, params: dict, timeout: float):
+    """Blocking GET returning the decoded json body"""
+    response = session.get(url, params=params, timeout=timeout)
+    if response.status_code in RETRY_STATUS:
+        raise RetryableResponse(
+            response.status_code, response.headers.get("Retry-After")
+        )
+    response.raise_for_status()
+    return response.json()
+
+
+async def reverse_geocode_bulk_async(
+    lat: Union[pd.Series, np.ndarray],
+    lon: Union[pd.Series, np.ndarray],
+    loc_part: str,
+    url: str = NOMINATIM_REVERSE_URL,
+    concurrency: int = 4,
+    rate_per_second: Optional[float] = DEFAULT_MIN_DELAY_SECONDS,
+    max_retries: int = 3,
+    backoff_seconds: float = 1.0,
+    timeout: float = 30,
+    user_agent: str = "newton-geocoding",
+    cache: Optional[GeocodeCache] = None,
+) -> pd.DataFrame:
+    """Reverse-geocodes many points against a Nominatim-style /reverse endpoint, with
+    up to `concurrency` requests in flight. Failed requests are retried with
+    exponential backoff; a point that still fails gets an error message instead of
+    stopping the run. Identical points are requested once.
+    Args:
+        lat: latitudes (degrees N)
+        lon: longitudes (degrees E)
+        loc_part: part of the address to return (e.g., 'town', 'county', 'postcode')
+        url: reverse-geocoding endpoint taking lat, lon and format=jsonv2
+        concurrency: maximum number of requests in flight
+        rate_per_second: maximum request rate (None for no limit); Nominatim's
+            public server allows 1 per second
+        max_retries: retries per point after timeouts, connection errors and
+            429/5xx responses
+        backoff_seconds: wait before the first retry, doubled for each later one
+            (a numeric Retry-After header takes precedence)
+        timeout: seconds to wait for each response
+        user_agent: User-Agent header sent with each request
+        cache: GeocodeCache answering (and storing) raw results, if given
+    Returns:
+        DataFrame aligned with lat, with columns loc_part (None where unknown) and
+        'error' (None, or why the point could not be geocoded)
+    """
+    index = lat.index if isinstance(lat, pd.Series) else None
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    keys = [latlon_key(y, x) if ok else None for y, x, ok in zip(lat, lon, valid)]
+    points = {key: (y, x) for key, y, x in zip(keys, lat, lon) if key is not None}
+
+    results = cache.get_many("reverse", points) if cache is not None else {}
+    errors = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = AsyncRateLimiter(rate_per_second)
+    loop = asyncio.get_running_loop()
+
+    async def fetch(key, session, executor):
+        params = {"lat": points[key][0], "lon": points[key][1], "format": "jsonv2"}
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                await limiter.wait()
+                try:
+                    raw = await loop.run_in_executor(
+                        executor, _get_json, session, url, params, timeout
+                    )
+                except (
+                    RetryableResponse,
+                    requests.ConnectionError,
+                    requests.Timeout,
+                ) as e:
+                    if attempt == max_retries:
+                        errors[key] = f"{type(e).__name__}: {e}"
+                        return
+                    retry_after = getattr(e, "retry_after", None)
+                    await asyncio.sleep(
+                        retry_after
+                        if retry_after is not None
+                        else backoff_seconds * 2**attempt
+                    )
+                except Exception as e:  # pylint: disable=broad-except
+                    errors[key] = f"{type(e).__name__}: {e}"
+                    return
+                else:
+                    # Nominatim answers points it cannot place with an 'error' field
+                    results[key] = None if "error" in raw else raw
+                    return
+
+    misses = [key for key in points if key not in results]
+    with requests.Session() as session, ThreadPoolExecutor(concurrency) as executor:
+        session.headers["User-Agent"] = user_agent
+        session.mount(url, requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+        await asyncio.gather(*(fetch(key, session, executor) for key in misses))
+    if cache is not None:
+        fetched = {key: results[key] for key in misses if key in results}
+        if fetched:
+            cache.put_many("reverse", fetched)
+
+    return pd.DataFrame(
+        {
+            loc_part: [
+                (results.get(key) or {}).get("address", {}).get(loc_part)
+                for key in keys
+            ],
+            "error": [
+                "missing lat/lon" if key is None else errors.get(key) for key in keys
+            ],
+        },
+        index=index,
+    )
+
+
+def reverse_geocode_bulk(*args, **kwargs) -> pd.DataFrame:
+    """Blocking wrapper around reverse_geocode_bulk_async (same arguments). Inside a
+    running event loop, such as a notebook's, await reverse_geocode_bulk_async
+    instead."""
+    return asyncio.run(reverse_geocode_bulk_async(*args, **kwargs))
@@ -1,15 +1,24 @@
 """ Utility functions for input/output of data"""
 
+import hashlib
 import logging
-from pathlib import PosixPath
-from typing import Union
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PosixPath
+from typing import List, Optional, Union
 
+import numpy as np
+import pandas as pd
 import yaml
 
 logging.basicConfig()
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "newton"
+
 
 def yaml_to_dict(yaml_filepath: Union[str, PosixPath]) -> dict:
     """One-line function to read a yml config at a path into a dictionary
@@ -51,3 +60,135 @@ def dict_to_yaml(dictionary: dict, yaml_filepath: Union[str, PosixPath]):
         )
     with open(yaml_filepath, "w", encoding="utf8") as outfile:
         yaml.dump(dictionary, outfile, default_flow_style=False)
+
+
+def concatenate_csv_files(
+    csv_filepaths: List[Union[str, PosixPath]], out_filepath: Union[str, PosixPath]
+):
+    """streams csv files that share a header into one csv without parsing them
+    Args:
+        csv_filepaths: csv files to be concatenated, in order; all must have the same header
+        out_filepath: location to which the combined csv will be written
+    Returns:
+        None
+    """
+    with open(out_filepath, "wb") as outfile:
+        for i, csv_filepath in enumerate(csv_filepaths):
+            with open(csv_filepath, "rb") as infile:
+                header = infile.readline()
+                if i == 0:
+                    outfile.write(header)
+                shutil.copyfileobj(infile, outfile)
+
+
+def read_csv_cached(
+    csv_filepath: Union[str, PosixPath],
+    columns: Optional[List[str]] = None,
+    categorical_cols: Optional[List[str]] = None,
+    cache_dir: Optional[Union[str, PosixPath]] = None,
+) -> pd.DataFrame:
+    """reads a csv through a parquet copy that is rebuilt only when the csv changes
+    Args:
+        csv_filepath: path to the csv file
+        columns: columns to load (all columns if None)
+        categorical_cols: columns stored as pandas categoricals (skipped if absent)
+        cache_dir: directory holding the parquet copies (defaults to ~/.cache/newton)
+    Returns:
+        dataframe with the requested columns and the csv's original (range) index
+    """
+    csv_filepath = Path(csv_filepath).resolve()
+    cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+    categorical_cols = sorted(categorical_cols or [])
+
+    # one cache file per source path; its name also encodes the csv's mtime and size
+    # (and the categorical columns), so an edited csv never matches a stale copy
+    stat = csv_filepath.stat()
+    path_key = hashlib.sha1(str(csv_filepath).encode()).hexdigest()[:16]
+    version_key = hashlib.sha1(
+        f"{stat.st_mtime_ns}|{stat.st_size}|{','.join(categorical_cols)}".encode()
+    ).hexdigest()[:16]
+    cache_filepath = cache_dir / f"{csv_filepath.stem}_{path_key}_{version_key}.parquet"
+
+    if not cache_filepath.exists():
+        logging.info(f" --- Building columnar cache of {csv_filepath}")
+        df = pd.read_csv(csv_filepath, low_memory=False)
+        for col in categorical_cols:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob(f"{csv_filepath.stem}_{path_key}_*.parquet"):
+            stale.unlink()
+        # write-then-rename so an interrupted run never leaves a truncated cache
+        tmp_filepath = cache_filepath.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(tmp_filepath)
+        os.replace(tmp_filepath, cache_filepath)
+        if columns is not None:
+            df = df[columns]
+        return df
+
+    return pd.read_parquet(cache_filepath, columns=columns)
+
+
+def write_csv_chunks(
+    df: pd.DataFrame,
+    out_dir: Union[str, PosixPath],
+    prefix: str,
+    chunk_length: int,
+    order: Optional[np.ndarray] = None,
+    columns: Optional[List[str]] = None,
+    workers: int = 1,
+    combined: Optional[str] = None,
+) -> List[Path]:
+    """writes the rows of a frame to numbered csv files of at most chunk_length rows,
+    taking each file's rows straight from the frame rather than from a sorted copy
+    Args:
+        df: frame holding the rows to write
+        out_dir: directory to which the files are written
+        prefix: files are named {prefix}_1.csv, {prefix}_2.csv, ...
+        chunk_length: maximum number of rows per file
+        order: row positions of df to write, in order (all rows, in frame order, if None)
+        columns: columns to write (all columns if None); a KeyError is raised,
+            before any file is written, if one of them is not in df
+        workers: number of files written concurrently
+        combined: also write every row to {prefix}.csv ('csv') or bundle the numbered
+            files into {prefix}.zip ('zip'); None writes only the numbered files
+    Returns:
+        paths of the numbered files, followed by the combined file if one was written
+    """
+    if combined not in (None, "csv", "zip"):
+        raise ValueError(f"combined should be None, 'csv' or 'zip', not {combined!r}")
+    out_dir = Path(out_dir)
+    order = np.arange(len(df)) if order is None else np.asarray(order)
+    columns = list(df.columns) if columns is None else columns
+    col_positions = df.columns.get_indexer(columns)
+    if (col_positions < 0).any():
+        missing = [col for col, i in zip(columns, col_positions) if i < 0]
+        raise KeyError(f"{missing} not in index")
+
+    # chunk i holds order[i * chunk_length:(i + 1) * chunk_length]
+    starts = range(0, len(order), chunk_length)
+    chunk_paths = [out_dir / f"{prefix}_{i + 1}.csv" for i in range(len(starts))]
+
+    def write_chunk(start: int, path: Path):
+        rows = order[start : start + chunk_length]
+        df.iloc[rows, col_positions].to_csv(path, index=False)
+        logging.info(f" --- >>> Wrote {len(rows)} rows to {path}")
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(write_chunk, starts, chunk_paths))
+    else:
+        for start, path in zip(starts, chunk_paths):
+            write_chunk(start, path)
+
+    if combined == "csv" and chunk_paths:
+        combined_path = out_dir / f"{prefix}.csv"
+        concatenate_csv_files(chunk_paths, combined_path)
+        return chunk_paths + [combined_path]
+    if combined == "zip" and chunk_paths:
+        combined_path = out_dir / f"{prefix}.zip"
+        with zipfile.ZipFile(combined_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for path in chunk_paths:
+                archive.write(path, arcname=path.name)
+        return chunk_paths + [combined_path]
+    return chunk_paths
@@ -1,19 +1,27 @@
 """Assorted functions for manipulating location/geographic data"""
 
-from typing import Optional, Tuple
+from pathlib import PosixPath
+from typing import Dict, List, Optional, Tuple, Union
 from math import isnan
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
 from utils.io import yaml_to_dict
-from geopy.geocoders import Nominatim
+from utils.geocoding import CachedGeocoder, default_geocoder
 
 
 def location_name(
     latlon: Tuple[float, float],
     loc_part: str,
+    geocoder: Optional[CachedGeocoder] = None,
 ):
     """Given a tuple a location's latitutde and longitude, returns location descripton
     Args:
         latlon: two-member tuple with latitude (in degrees N) and longitude (in degrees E
         loc_part: desired part of location description (e.g., 'town','county','state','country','postcode')
+        geocoder: cached geocoder to use (defaults to the shared Nominatim one)
     Returns:
         String corresponding to the desired component of the geolocated address
     """
@@ -27,8 +35,8 @@ def location_name(
     if (isnan(latlon[0])) | (isnan(latlon[1])):
         return "Provided latitude and/or longitude are NaN"
 
-    # Set up geolocator and get the location object the given lat-lon tuple
-    geolocator = Nominatim(user_agent="http")
+    # Get the (cached) raw location for the given lat-lon tuple
+    geolocator = geocoder if geocoder is not None else default_geocoder()
     try:
         location = geolocator.reverse(latlon)
     except:
@@ -37,13 +45,13 @@ def location_name(
         )
     else:
         # Parse the location object
-        if "address" not in location.raw:
+        if location is None or "address" not in location:
             return "Address information not found in location object"
-        if loc_part not in location.raw["address"]:
-            loc_descriptors = list(location.raw["address"].keys())
+        if loc_part not in location["address"]:
+            loc_descriptors = list(location["address"].keys())
             exception_string = f"For location ({latlon[0]},{latlon[1]}), descriptor 'loc_part' argument must be one of {*loc_descriptors,}"
             raise Exception(exception_string)
-        return location.raw["address"][loc_part]
+        return location["address"][loc_part]
 
 
 def get_state_fips(
@@ -61,13 +69,16 @@ def city_lat_lon(
     state: Optional[str] = None,
     zipcode: Optional[str] = None,
     country: Optional[str] = None,
+    geocoder: Optional[CachedGeocoder] = None,
 ):
-    """Returns (lat, lon) coordinates for a string descriptor of a location
+    """Returns (lat, lon) coordinates for a string descriptor of a location. For many
+    locations at once, use CachedGeocoder.geocode_batch.
     Args:
         city: string specifying city, if available
         state: string specifying state, if available
         zipcode: string specfiying zip code (US) if available
         country: sptring specifying country, if available
+        geocoder: cached geocoder to use (defaults to the shared Nominatim one)
     Returns:
         tuple with the latitude and longitude coordinates (in degrees N and E)
     """
@@ -78,7 +89,112 @@ def city_lat_lon(
     location_string = " ".join(
         [x for x in [city, state, zipcode, country] if x is not None]
     )
-    geolocator = Nominatim(user_agent="myapplication")
+    geolocator = geocoder if geocoder is not None else default_geocoder()
 
     location = geolocator.geocode(location_string)
-    return (float(location.raw["lat"]), float(location.raw["lon"]))
+    return (float(location["lat"]), float(location["lon"]))
+
+
+class BoundaryLookup:
+    """Offline counterpart of location_name for geographies we hold boundaries for
+    (e.g., county, ward, precinct, postcode): assigns points to the polygons that
+    contain them through the layers' spatial indexes instead of a remote geocoder
+    Args:
+        layers: dictionary mapping each loc_part to (boundaries, column), where
+            boundaries is a shapefile/GeoJSON path or a GeoDataFrame and column holds
+            the name or code to return for each polygon
+    """
+
+    def __init__(
+        self,
+        layers: Dict[str, Tuple[Union[str, PosixPath, gpd.GeoDataFrame], str]],
+    ):
+        self.layers = {}
+        for loc_part, (boundaries, column) in layers.items():
+            if not isinstance(boundaries, gpd.GeoDataFrame):
+                boundaries = gpd.read_file(boundaries)
+            if boundaries.crs is not None and not boundaries.crs.equals("EPSG:4326"):
+                boundaries = boundaries.to_crs("EPSG:4326")
+            layer = boundaries[[column, "geometry"]].reset_index(drop=True)
+            # accessing sindex builds the spatial index now, rather than on the
+            # first lookup
+            _ = layer.sindex
+            self.layers[loc_part] = (layer, column)
+
+    @property
+    def loc_parts(self) -> List[str]:
+        """Geographies this lookup can assign"""
+        return list(self.layers)
+
+    def lookup(
+        self,
+        lat: Union[pd.Series, np.ndarray],
+        lon: Union[pd.Series, np.ndarray],
+        loc_part: str,
+    ) -> pd.Series:
+        """Returns the loc_part of every point in one vectorized spatial join
+        Args:
+            lat: latitudes (degrees N)
+            lon: longitudes (degrees E)
+            loc_part: geography to assign (one of self.loc_parts)
+        Returns:
+            Series aligned with lat holding each point's name or code (None for NaN
+            points and points outside every polygon; a point on a shared boundary
+            gets the first polygon's)
+        """
+        if loc_part not in self.layers:
+            raise ValueError(f"loc_part must be one of {*self.loc_parts,}")
+        layer, column = self.layers[loc_part]
+        index = lat.index if isinstance(lat, pd.Series) else None
+        points = gpd.points_from_xy(
+            np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+        )
+
+        point_idx, polygon_idx = layer.sindex.query(points, predicate="intersects")
+        # keep the first polygon of points that fall on (or in) more than one
+        order = np.lexsort((polygon_idx, point_idx))
+        point_idx, polygon_idx = point_idx[order], polygon_idx[order]
+        first = np.ones(len(point_idx), dtype=bool)
+        first[1:] = point_idx[1:] != point_idx[:-1]
+
+        names = np.full(len(points), None, dtype=object)
+        names[point_idx[first]] = layer[column].to_numpy()[polygon_idx[first]]
+        return pd.Series(names, index=index, name=loc_part)
+
+    def annotate(
+        self,
+        df: pd.DataFrame,
+        loc_parts: Optional[List[str]] = None,
+        lat_col: str = "lat",
+        lon_col: str = "lon",
+    ) -> pd.DataFrame:
+        """Returns a copy of df with one column per geography
+        Args:
+            df: frame of points
+            loc_parts: geographies to add (all of self.loc_parts if None)
+            lat_col: column of df holding latitudes
+            lon_col: column of df holding longitudes
+        Returns:
+            copy of df with the loc_parts appended as columns
+        """
+        return df.assign(
+            **{
+                loc_part: self.lookup(df[lat_col], df[lon_col], loc_part)
+                for loc_part in (loc_parts or self.loc_parts)
+            }
+        )
+
+    def location_name(self, latlon: Tuple[float, float], loc_part: str):
+        """Same call as location_name, answered from the boundary layers
+        Args:
+            latlon: two-member tuple with latitude (in degrees N) and longitude (in degrees E)
+            loc_part: geography to return (one of self.loc_parts)
+        Returns:
+            name or code of the polygon holding the point (None if there is none)
+        """
+        error_string = "Argument latlon must be a two-member tuple of floats of the form (latitude [degrees N],longitude [degrees E])"
+        if not isinstance(latlon, tuple) or len(latlon) != 2:
+            raise ValueError(error_string)
+        if (isnan(latlon[0])) | (isnan(latlon[1])):
+            return "Provided latitude and/or longitude are NaN"
+        return self.lookup(np.array([latlon[0]]), np.array([latlon[1]]), loc_part)[0]
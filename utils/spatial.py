@@ -0,0 +1,154 @@
+"""Spatial indexing of lat/lon points for polygon and distance queries"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in metres between points given in degrees (broadcasts)"""
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def points_in_polygon(
+    x: np.ndarray, y: np.ndarray, polygon: Sequence[Tuple[float, float]]
+) -> np.ndarray:
+    """Even-odd (ray casting) point-in-polygon test, vectorized over the points
+    Args:
+        x: point x coordinates (e.g., longitude)
+        y: point y coordinates (e.g., latitude)
+        polygon: sequence of (x, y) vertices; the ring is closed automatically
+    Returns:
+        boolean array, True for points inside the polygon
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    vertices = np.asarray(polygon, dtype=float)
+    inside = np.zeros(x.shape, dtype=bool)
+    if len(vertices) < 3:
+        return inside
+    xj, yj = vertices[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for xi, yi in vertices:
+            # does a ray running from the point toward +x cross edge (i, j)?
+            crosses = ((yi > y) != (yj > y)) & (
+                x < (xj - xi) * (y - yi) / (yj - yi) + xi
+            )
+            inside ^= crosses
+            xj, yj = xi, yi
+    return inside
+
+
+class GridIndex:
+    """Buckets lat/lon points into square cells of a local metric grid, so that polygon
+    and radius queries only test the points in the cells they overlap
+    Args:
+        lat: point latitudes (degrees N); NaN points are never returned
+        lon: point longitudes (degrees E)
+        cell_size_m: edge length of a grid cell in metres
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_size_m: float = 100):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        valid = np.isfinite(self.lat) & np.isfinite(self.lon)
+
+        # equirectangular projection about the points' mean latitude
+        lat0 = np.nanmean(self.lat[valid]) if valid.any() else 0.0
+        self.m_per_deg_lat = np.radians(1) * EARTH_RADIUS_M
+        self.m_per_deg_lon = self.m_per_deg_lat * np.cos(np.radians(lat0))
+        self.cell_size_m = cell_size_m
+
+        ix, iy = self._cells(self.lat[valid], self.lon[valid])
+        if valid.any():
+            self.ix_min, self.ix_max = ix.min(), ix.max()
+            self.iy_min, self.iy_max = iy.min(), iy.max()
+        else:
+            self.ix_min, self.ix_max, self.iy_min, self.iy_max = 0, -1, 0, -1
+        self.n_iy = self.iy_max - self.iy_min + 1
+        keys = (ix - self.ix_min) * self.n_iy + (iy - self.iy_min)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.positions = np.flatnonzero(valid)[order]
+
+    def _cells(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Grid cell column (ix) and row (iy) of each point"""
+        ix = np.floor(lon * self.m_per_deg_lon / self.cell_size_m).astype(np.int64)
+        iy = np.floor(lat * self.m_per_deg_lat / self.cell_size_m).astype(np.int64)
+        return ix, iy
+
+    def _candidates(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float
+    ) -> np.ndarray:
+        """Positions of the points in every cell overlapping a lat/lon box"""
+        (ix0, ix1), (iy0, iy1) = self._cells(
+            np.array([lat_min, lat_max]), np.array([lon_min, lon_max])
+        )
+        ix0, ix1 = max(ix0, self.ix_min), min(ix1, self.ix_max)
+        iy0, iy1 = max(iy0, self.iy_min), min(iy1, self.iy_max)
+        if ix0 > ix1 or iy0 > iy1:
+            return np.empty(0, dtype=np.intp)
+
+        # within one grid column the cells iy0..iy1 are a contiguous run of keys
+        columns = np.arange(ix0, ix1 + 1) - self.ix_min
+        starts = np.searchsorted(self.keys, columns * self.n_iy + (iy0 - self.iy_min))
+        ends = np.searchsorted(
+            self.keys, columns * self.n_iy + (iy1 - self.iy_min), side="right"
+        )
+        return np.concatenate(
+            [self.positions[s:e] for s, e in zip(starts, ends)]
+            + [np.empty(0, dtype=np.intp)]
+        )
+
+    def within_polygon(self, polygon: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """Positions of the points inside a polygon
+        Args:
+            polygon: sequence of (lon, lat) vertices, as in a map's lasso selection
+        Returns:
+            sorted array of point positions
+        """
+        vertices = np.asarray(polygon, dtype=float).reshape(-1, 2)
+        if len(vertices) < 3:
+            return np.empty(0, dtype=np.intp)
+        lon_min, lat_min = vertices.min(axis=0)
+        lon_max, lat_max = vertices.max(axis=0)
+        candidates = self._candidates(lat_min, lon_min, lat_max, lon_max)
+        inside = points_in_polygon(self.lon[candidates], self.lat[candidates], vertices)
+        return np.sort(candidates[inside])
+
+    def within_distance(self, lat: float, lon: float, metres: float) -> np.ndarray:
+        """Positions of the points within a great-circle distance of (lat, lon)
+        Args:
+            lat: latitude of the query point (degrees N)
+            lon: longitude of the query point (degrees E)
+            metres: search radius
+        Returns:
+            array of point positions, nearest first
+        """
+        # pad the box a little: the grid's metric scale is exact only at its latitude
+        dlat = 1.01 * metres / self.m_per_deg_lat
+        dlon = 1.01 * metres / (self.m_per_deg_lat * np.cos(np.radians(lat)))
+        candidates = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        distance = haversine_m(lat, lon, self.lat[candidates], self.lon[candidates])
+        near = distance <= metres
+        return candidates[near][np.argsort(distance[near], kind="stable")]
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> np.ndarray:
+        """Positions of the k points nearest to (lat, lon), nearest first"""
+        k = min(k, len(self.positions))
+        metres = self.cell_size_m
+        while True:
+            found = self.within_distance(lat, lon, metres)
+            # stop once the radius covers k points (or the whole grid)
+            if len(found) >= k or metres > 4e7:
+                return found[:k]
+            metres *= 2
@@ -0,0 +1,113 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from utils.api import APIClient, api_authenticate
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a voter-data api. Logins hand out a numbered token; the
+    server can expire tokens and fail the next GETs with 503."""
+
+    protocol_version = "HTTP/1.1"
+    state = {}
+
+    def send_json(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        credentials = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if credentials != {"username": "newton", "password": "secret"}:
+            self.send_json(403, {"error": "bad credentials"})
+            return
+        self.state["logins"] += 1
+        token = f"token{self.state['logins']}"
+        self.state["valid_token"] = token
+        self.send_json(200, {}, {"Set-Cookie": f"session={token}; Path=/"})
+
+    def do_GET(self):
+        self.state["gets"] += 1
+        if self.headers.get("Cookie") != f"session={self.state['valid_token']}":
+            self.send_json(401, {"error": "session expired"})
+            return
+        if self.state["fail_next"] > 0:
+            self.state["fail_next"] -= 1
+            self.send_json(503, {"error": "try again"})
+            return
+        url = urlparse(self.path)
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        records = [
+            {"voter_id": i, "ward": i % 3, "name": f"v{i}"}
+            for i in range(10 * (page - 1), min(10 * page, 25))
+        ]
+        if url.path == "/linked":
+            next_url = f"/linked?page={page + 1}" if page < 3 else None
+            self.send_json(200, {"results": records, "next": next_url})
+        else:
+            self.send_json(200, records)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    StubAPIHandler.state = {"logins": 0, "valid_token": None, "gets": 0, "fail_next": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def make_client(base_url):
+    return APIClient(
+        base_url, f"{base_url}/login", "newton", "secret", backoff_factor=0
+    )
+
+
+def test_api_authenticate_checks_the_login(base_url):
+    with pytest.raises(requests.HTTPError):
+        api_authenticate(f"{base_url}/login", "newton", "wrong")
+
+
+def test_retries_and_reauthentication(base_url):
+    client = make_client(base_url)
+    state = StubAPIHandler.state
+
+    # transient 5xx responses to idempotent calls are retried
+    state["fail_next"] = 2
+    assert len(client.get("/voters")) == 10
+    assert state["gets"] == 3
+
+    # an expired session logs in again and repeats the call
+    state["valid_token"] = "expired"
+    assert len(client.get("/voters", {"page": 3})) == 5
+    assert state["logins"] == 2
+
+    state["fail_next"] = 10
+    with pytest.raises(requests.HTTPError):
+        client.get("/voters")
+
+
+def test_fetch_frame(base_url):
+    client = make_client(base_url)
+
+    df = client.fetch_frame("/voters", columns=["voter_id", "ward"])
+    assert df.voter_id.tolist() == list(range(25))
+    assert list(df.columns) == ["voter_id", "ward"]
+
+    linked = client.fetch_frame("/linked", records_key="results", next_key="next")
+    assert linked.voter_id.tolist() == list(range(25))
+
+    assert len(client.fetch_frame("/voters", max_pages=2)) == 20
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+from statsmodels.stats.contingency_tables import Table2x2
+
+from utils.calcs import odds_ratio, odds_ratio_table, odds_ratios
+
+
+def test_odds_ratios_match_table2x2():
+    rng = np.random.default_rng(0)
+    tables = rng.integers(1, 200, (50, 2, 2))
+
+    ratio, lower, upper = odds_ratios(tables, ci=0.9)
+    for i, table in enumerate(tables):
+        expected = odds_ratio(table[0].tolist(), table[1].tolist(), ci=0.9)
+        assert_allclose([ratio[i], lower[i], upper[i]], expected, rtol=1e-10)
+
+
+def test_odds_ratios_continuity_correction():
+    tables = np.array([[[0, 10], [5, 7]], [[3, 10], [5, 7]]])
+
+    ratio, lower, upper = odds_ratios(tables, continuity_correction=0)
+    assert ratio[0] == 0 and lower[0] == 0 and np.isnan(upper[0])
+
+    # by default zero cells are shifted to 0.5, as Table2x2 does
+    ratio, lower, upper = odds_ratios(tables)
+    for i, table in enumerate(tables):
+        t = Table2x2(table)
+        assert_allclose(
+            [ratio[i], lower[i], upper[i]], [t.oddsratio, *t.oddsratio_confint()]
+        )
+
+    ratio, _, _ = odds_ratios(tables, correct_all_cells=True)
+    assert_allclose(ratio, [(0.5 * 7.5) / (10.5 * 5.5), (3 * 7) / (10 * 5)])
+
+
+def test_odds_ratio_table():
+    voters = pd.DataFrame(
+        {
+            "precinct": ["1A"] * 6 + ["1B"] * 4,
+            "over_60": [
+                True,
+                True,
+                True,
+                False,
+                False,
+                False,
+                True,
+                True,
+                False,
+                False,
+            ],
+            "voted": [True, True, False, True, False, False, True, True, True, False],
+        }
+    )
+
+    result = odds_ratio_table(voters, "precinct", "over_60", "voted")
+    assert result.index.tolist() == ["1A", "1B"]
+    assert result.loc["1A", ["condition1_yes", "condition1_no"]].tolist() == [2, 1]
+    # precinct 1B has no over-60 non-voters
+    assert result.loc["1B", "condition1_no"] == 0
+    assert_allclose(result.loc["1A", "odds_ratio"], (2 * 2) / (1 * 1))
+
+    counted = (
+        voters.groupby(["precinct", "over_60", "voted"])
+        .size()
+        .rename("n")
+        .reset_index()
+    )
+    pd.testing.assert_frame_equal(
+        odds_ratio_table(counted, "precinct", "over_60", "voted", count="n"), result
+    )
@@ -1,6 +1,16 @@
+import numpy as np
+import pandas as pd
 import pytest
 
-from utils.data import zero_pad
+from utils.data import (
+    TextMatcher,
+    contains_text,
+    contains_text_array,
+    get_smarties,
+    get_smarties_frame,
+    zero_pad,
+    zero_pad_array,
+)
 
 
 def test_zero_pad():
@@ -27,3 +37,83 @@ def test_zero_pad():
         raise AssertionError(
             "Expected ValueError for crappy input to zero_pad, but no exception was raised"
         )
+
+
+def test_zero_pad_array():
+    values = [7, 7, 9944, "12"]
+    expected_front = [zero_pad(x, "front", 4) for x in values]
+    expected_back = [zero_pad(x, "back", 4) for x in values]
+
+    assert zero_pad_array(values, "front", 4).tolist() == expected_front
+    assert zero_pad_array(np.array([7, 7, 9944, 12]), "back", 4).tolist() == (
+        expected_back
+    )
+    padded = zero_pad_array(pd.Series(values, index=[3, 2, 1, 0]), "front", 4)
+    assert padded.index.tolist() == [3, 2, 1, 0]
+    assert padded.tolist() == expected_front
+
+    with pytest.raises(ValueError, match="99440 has more than 4 digits"):
+        zero_pad_array([1, 99440], "front", 4)
+
+
+def test_contains_text_array():
+    strings = ["Retired teacher", "BANKER", "nurse", ""]
+    for text_list, match_case in [
+        (["teach", "bank"], False),
+        (["teach", "bank"], True),
+        (["a.c"], False),
+        ([], False),
+    ]:
+        assert contains_text_array(strings, text_list, match_case).tolist() == [
+            contains_text(s, text_list, match_case) for s in strings
+        ]
+
+    with pytest.raises(TypeError):
+        contains_text_array(["teacher", None], ["teach"])
+
+
+def test_text_matcher():
+    matcher = TextMatcher(["TEACHER", "teacher aide", "NURSE"])
+    occupations = pd.Series(
+        ["Retired Teacher", "teacher aide", "nurse", "banker", np.nan],
+        index=list("abcde"),
+    )
+
+    matched = matcher.match_array(occupations)
+    assert matched.index.tolist() == list("abcde")
+    assert matched.tolist() == ["TEACHER", "teacher aide", "NURSE", None, None]
+    assert matcher.contains_array(occupations).tolist() == [True] * 3 + [False] * 2
+    assert matcher.match("NURSE PRACTITIONER AND TEACHER") == "NURSE"
+
+    case_sensitive = TextMatcher(["TEACHER"], match_case=True)
+    assert case_sensitive.contains_array(["TEACHER", "teacher"]).tolist() == [
+        True,
+        False,
+    ]
+    assert not TextMatcher([]).contains("teacher")
+
+
+def test_get_smarties_frame():
+    names = ["educator", "helping", "women"]
+    df = pd.DataFrame(
+        {"educator": [1, 0, 1, 0], "helping": [1, 0, 0, 0], "women": [0, 0, 1, 1]},
+        index=[4, 3, 2, 1],
+    )
+    expected = [get_smarties(row, names) for _, row in df.iterrows()]
+
+    labels = get_smarties_frame(df, names)
+    assert labels.index.tolist() == [4, 3, 2, 1]
+    assert labels.tolist() == expected
+    # rows with the same labels do not share one list
+    labels.iloc[1].append("x")
+    assert labels.iloc[3] == ["women"]
+
+    assert get_smarties_frame(df, names, "bitmask").tolist() == [3, 0, 5, 4]
+    categorical = get_smarties_frame(df, names, "categorical")
+    assert categorical.dtype == "category"
+    assert categorical.tolist() == ["educator|helping", "", "educator|women", "women"]
+
+    wide = pd.DataFrame(np.eye(70, dtype=bool)[[0, 69, 69]], columns=range(70))
+    assert get_smarties_frame(wide, list(range(70))).tolist() == [[0], [69], [69]]
+    packed = get_smarties_frame(wide, list(range(70)), "bitmask")
+    assert packed.shape == (3, 9) and packed[1, 8] == 1 << 5
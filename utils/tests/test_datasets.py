@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from utils.datasets import CountyLookup, get_county_df
+
+NATIONAL_COUNTY_TXT = """MA,25,17,Middlesex County,H4
+MA,25,25,Suffolk County,H4
+AL,01,001,Autauga County,H1
+"""
+
+
+def test_get_county_df_is_cached(tmp_path):
+    source = tmp_path / "national_county.txt"
+    source.write_text(NATIONAL_COUNTY_TXT)
+    cache_dir = tmp_path / "cache"
+
+    county_df = get_county_df(str(source), cache_dir=cache_dir)
+    assert county_df.fips.tolist() == ["25017", "25025", "01001"]
+    assert county_df.county_name.tolist() == ["Middlesex", "Suffolk", "Autauga"]
+    assert county_df.state.tolist() == ["Massachusetts", "Massachusetts", "Alabama"]
+    assert "h" not in county_df.columns
+
+    with patch("utils.datasets.pd.read_csv") as read_csv:
+        cached = get_county_df(str(source), cache_dir=cache_dir)
+        read_csv.assert_not_called()
+    pd.testing.assert_frame_equal(cached, county_df)
+
+
+def test_get_county_df_rejects_unknown_states(tmp_path):
+    source = tmp_path / "national_county.txt"
+    source.write_text(NATIONAL_COUNTY_TXT + "XX,99,001,Nowhere County,H1\n")
+    with pytest.raises(ValueError, match="XX"):
+        get_county_df(str(source), cache_dir=tmp_path / "cache")
+    assert not list((tmp_path / "cache").glob("*.parquet"))
+
+
+def test_county_lookup(tmp_path):
+    source = tmp_path / "national_county.txt"
+    source.write_text(NATIONAL_COUNTY_TXT)
+    lookup = CountyLookup(get_county_df(str(source), cache_dir=tmp_path))
+
+    assert lookup.county("25025")["county_name"] == "Suffolk"
+    assert lookup.county("99999") is None
+    assert lookup.lookup(["25025", "99999"]).county_name.tolist() == ["Suffolk", None]
+    assert lookup.fips_for("MA", "Suffolk") == "25025"
+    assert lookup.fips_for(
+        ["Massachusetts", "AL", "MA"], ["Middlesex", "Autauga", "Nowhere"]
+    ).tolist() == ["25017", "01001", None]
+
+    df = pd.DataFrame({"fips": ["01001", "99999", "25017"], "voters": [1, 2, 3]})
+    joined = lookup.join(df)
+    assert joined.county_name.tolist() == ["Autauga", None, "Middlesex"]
+    assert joined.voters.tolist() == [1, 2, 3]
@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import pytest
+
+from utils.geocoding import CachedGeocoder, GeocodeCache, reverse_geocode_bulk
+from utils.location import city_lat_lon, location_name
+
+
+class StubGeocoder:
+    """Offline stand-in for a geopy geocoder that counts the requests it answers"""
+
+    def __init__(self):
+        self.calls = []
+
+    def geocode(self, query):
+        self.calls.append(query)
+        if "nowhere" in query.lower():
+            return None
+        return SimpleNamespace(raw={"lat": "42.33", "lon": str(-71.2 - len(query))})
+
+    def reverse(self, latlon):
+        self.calls.append(latlon)
+        return SimpleNamespace(
+            raw={"address": {"town": f"town{latlon[0]:.0f}", "postcode": "02459"}}
+        )
+
+
+def make_geocoder(tmp_path, **cache_kwargs):
+    stub = StubGeocoder()
+    cache = GeocodeCache(tmp_path / "geocode.sqlite", **cache_kwargs)
+    return stub, CachedGeocoder(stub, cache, min_delay_seconds=0)
+
+
+def test_geocode_batch_dedupes_and_caches(tmp_path):
+    stub, geocoder = make_geocoder(tmp_path)
+    queries = pd.Series(
+        ["Newton MA", "newton  ma", "Nowhere", "Boston MA"], index=[5, 6, 7, 8]
+    )
+
+    result = geocoder.geocode_batch(queries)
+    assert result.index.tolist() == [5, 6, 7, 8]
+    assert result.lat.iloc[0] == result.lat.iloc[1] == 42.33
+    assert np.isnan(result.lat.loc[7])
+    assert stub.calls == ["Newton MA", "Nowhere", "Boston MA"]
+
+    # a second run (through a new cache object on the same file) makes no requests
+    stub, geocoder = make_geocoder(tmp_path)
+    frame = pd.DataFrame({"city": ["Newton", "Boston"], "state": ["MA", "MA"]})
+    assert geocoder.geocode_batch(frame).lat.tolist() == [42.33, 42.33]
+    assert city_lat_lon("Newton", "MA", geocoder=geocoder)[0] == 42.33
+    assert stub.calls == []
+
+
+def test_reverse_batch_and_location_name(tmp_path):
+    stub, geocoder = make_geocoder(tmp_path)
+    lat = pd.Series([42.0, np.nan, 42.0, 43.0])
+    lon = pd.Series([-71.0, -71.0, -71.0, -71.0])
+
+    towns = geocoder.reverse_batch(lat, lon, "town")
+    assert towns.tolist() == ["town42", None, "town42", "town43"]
+    assert len(stub.calls) == 2
+    assert location_name((42.0, -71.0), "postcode", geocoder=geocoder) == "02459"
+    assert len(stub.calls) == 2
+
+
+def test_cache_ttl_and_size_cap(tmp_path):
+    cache = GeocodeCache(tmp_path / "geocode.sqlite", max_entries=3)
+    for i in range(5):
+        cache.put_many("geocode", {f"q{i}": {"i": i}})
+        time.sleep(0.01)
+    assert len(cache) == 3
+    assert cache.get_many("geocode", ["q0", "q4"]) == {"q4": {"i": 4}}
+
+    expired = GeocodeCache(tmp_path / "geocode.sqlite", ttl_days=0)
+    assert expired.get_many("geocode", ["q4"]) == {}
+
+
+def test_cache_closes_its_connections(tmp_path, monkeypatch):
+    opened = []
+    real_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        opened.append(real_connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr("utils.geocoding.sqlite3.connect", connect)
+    cache = GeocodeCache(tmp_path / "geocode.sqlite")
+    cache.put_many("geocode", {"q": {"i": 1}})
+    assert cache.get_many("geocode", ["q"]) == {"q": {"i": 1}}
+    assert len(cache) == 1
+    assert len(opened) == 4
+    for connection in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+class StubReverseHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a Nominatim /reverse endpoint: lat 0 always fails, lat 1
+    fails on its first request, lat 2 cannot be placed"""
+
+    requests_seen = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        lat = float(query["lat"][0])
+        self.requests_seen.append(lat)
+        if lat == 0 or (lat == 1 and self.requests_seen.count(1.0) == 1):
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = (
+            {"error": "Unable to geocode"}
+            if lat == 2
+            else {"address": {"town": f"town{lat:.0f}"}}
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def reverse_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubReverseHandler)
+    StubReverseHandler.requests_seen = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/reverse"
+    server.shutdown()
+
+
+def test_reverse_geocode_bulk_collects_errors_per_row(tmp_path, reverse_url):
+    lat = pd.Series([5.0, 0.0, 1.0, np.nan, 2.0, 5.0], index=list("abcdef"))
+    lon = pd.Series([-71.0] * 6, index=list("abcdef"))
+    cache = GeocodeCache(tmp_path / "geocode.sqlite")
+
+    result = reverse_geocode_bulk(
+        lat,
+        lon,
+        "town",
+        url=reverse_url,
+        concurrency=3,
+        rate_per_second=None,
+        max_retries=2,
+        backoff_seconds=0.01,
+        cache=cache,
+    )
+    assert result.index.tolist() == list("abcdef")
+    assert result.town.tolist() == ["town5", None, "town1", None, None, "town5"]
+    assert result.error.notna().tolist() == [False, True, False, True, False, False]
+    assert "503" in result.error["b"]
+    # the repeated point is requested once; the failing one 1 + max_retries times
+    assert sorted(StubReverseHandler.requests_seen) == [0, 0, 0, 1, 1, 2, 5]
+
+    # successes (including 'not found') are cached, failures are retried next time
+    StubReverseHandler.requests_seen = []
+    again = reverse_geocode_bulk(
+        lat,
+        lon,
+        "town",
+        url=reverse_url,
+        rate_per_second=None,
+        max_retries=0,
+        cache=cache,
+    )
+    assert again.town.tolist() == result.town.tolist()
+    assert StubReverseHandler.requests_seen == [0]
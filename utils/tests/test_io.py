@@ -1,6 +1,17 @@
+import os
+import zipfile
 from unittest.mock import mock_open, patch
 
-from utils.io import yaml_to_dict
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.io import (
+    concatenate_csv_files,
+    read_csv_cached,
+    write_csv_chunks,
+    yaml_to_dict,
+)
 
 
 def test_yaml_to_dict():
@@ -12,3 +23,89 @@ def test_yaml_to_dict():
 
         # does the result match what we expect?
         assert result == {"yams": "tasty"}
+
+
+def test_concatenate_csv_files(tmp_path):
+    # header-only files (empty turfs) first and in the middle
+    df = pd.DataFrame({"name": ["A", "B", "C"], "number": [1, 2, 3]})
+    frames = [df.iloc[:0], df.iloc[:2], df.iloc[:0], df.iloc[2:]]
+    paths = []
+    for i, frame in enumerate(frames):
+        paths.append(tmp_path / f"part_{i}.csv")
+        frame.to_csv(paths[-1], index=False)
+
+    concatenate_csv_files(paths, tmp_path / "all.csv")
+    pd.concat(frames).to_csv(tmp_path / "expected.csv", index=False)
+    combined = (tmp_path / "all.csv").read_text()
+    assert combined.count("name,number") == 1
+    assert combined == (tmp_path / "expected.csv").read_text()
+
+
+def test_read_csv_cached(tmp_path):
+    csv_path = tmp_path / "voters.csv"
+    cache_dir = tmp_path / "cache"
+    pd.DataFrame(
+        {"politics": ["left", "right", "left"], "number": [1, 2, 3], "x": [0, 0, 0]}
+    ).to_csv(csv_path, index=False)
+
+    df = read_csv_cached(csv_path, ["politics", "number"], ["politics"], cache_dir)
+    assert df.politics.dtype == "category"
+    assert list(df.columns) == ["politics", "number"]
+    assert len(list(cache_dir.glob("*.parquet"))) == 1
+
+    # second read is served from the parquet copy without touching the csv parser
+    with patch("utils.io.pd.read_csv") as read_csv:
+        cached = read_csv_cached(csv_path, ["number"], ["politics"], cache_dir)
+        read_csv.assert_not_called()
+    assert cached.number.tolist() == [1, 2, 3]
+
+    # editing the csv invalidates (and replaces) the cached copy
+    pd.DataFrame({"politics": ["middle"], "number": [9], "x": [0]}).to_csv(
+        csv_path, index=False
+    )
+    os.utime(csv_path, ns=(0, 0))
+    assert read_csv_cached(
+        csv_path, ["number"], ["politics"], cache_dir
+    ).number.tolist() == [9]
+    assert len(list(cache_dir.glob("*.parquet"))) == 1
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_write_csv_chunks_keeps_every_row(tmp_path, workers):
+    df = pd.DataFrame({"name": [f"v{i}" for i in range(23)], "number": range(23)})
+    order = np.arange(23)[::-1]
+
+    paths = write_csv_chunks(
+        df, tmp_path, "extract1", 5, order=order, columns=["name"], workers=workers
+    )
+    assert [p.name for p in paths] == [f"extract1_{i}.csv" for i in range(1, 6)]
+    chunks = [pd.read_csv(p) for p in paths]
+    assert [len(c) for c in chunks] == [5, 5, 5, 5, 3]
+    written = pd.concat(chunks, ignore_index=True)
+    assert list(written.columns) == ["name"]
+    assert written.name.tolist() == df.name.iloc[order].tolist()
+
+
+def test_write_csv_chunks_combined(tmp_path):
+    df = pd.DataFrame({"number": range(10)})
+
+    paths = write_csv_chunks(df, tmp_path, "all", 4, combined="csv")
+    assert paths[-1].name == "all.csv"
+    assert pd.read_csv(paths[-1]).number.tolist() == list(range(10))
+
+    paths = write_csv_chunks(df, tmp_path / ".", "zipped", 4, combined="zip")
+    with zipfile.ZipFile(paths[-1]) as archive:
+        assert archive.namelist() == ["zipped_1.csv", "zipped_2.csv", "zipped_3.csv"]
+        assert (
+            sum(len(pd.read_csv(archive.open(name))) for name in archive.namelist())
+            == 10
+        )
+
+    assert write_csv_chunks(df.iloc[:0], tmp_path, "none", 4, combined="zip") == []
+
+
+def test_write_csv_chunks_rejects_missing_columns(tmp_path):
+    df = pd.DataFrame({"name": ["a", "b"], "number": [1, 2]})
+    with pytest.raises(KeyError, match="nmber"):
+        write_csv_chunks(df, tmp_path, "typo", 4, columns=["name", "nmber"])
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,42 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+
+from utils.location import BoundaryLookup
+
+
+def make_lookup(tmp_path):
+    wards = gpd.GeoDataFrame(
+        {"WARD": ["1", "2"]},
+        geometry=[box(-71.2, 42.3, -71.1, 42.4), box(-71.1, 42.3, -71.0, 42.4)],
+        crs="EPSG:4326",
+    )
+    # a layer in another projection, read back from a GeoJSON file
+    counties = gpd.GeoDataFrame(
+        {"NAME": ["Middlesex"]}, geometry=[box(-72, 42, -71, 43)], crs="EPSG:4326"
+    ).to_crs("EPSG:3857")
+    counties.to_file(tmp_path / "counties.geojson", driver="GeoJSON")
+    return BoundaryLookup(
+        {"ward": (wards, "WARD"), "county": (tmp_path / "counties.geojson", "NAME")}
+    )
+
+
+def test_boundary_lookup(tmp_path):
+    lookup = make_lookup(tmp_path)
+    df = pd.DataFrame(
+        {
+            "lat": [42.35, 42.35, 42.35, 45.0, np.nan],
+            "lon": [-71.15, -71.05, -71.1, -71.05, -71.05],
+        },
+        index=[10, 11, 12, 13, 14],
+    )
+
+    annotated = lookup.annotate(df)
+    # the point on the ward 1/ward 2 boundary goes to the first ward
+    assert annotated.ward.tolist() == ["1", "2", "1", None, None]
+    assert annotated.county.tolist() == ["Middlesex"] * 3 + [None, None]
+    assert annotated.index.tolist() == df.index.tolist()
+
+    assert lookup.location_name((42.35, -71.05), "ward") == "2"
+    assert lookup.location_name((np.nan, -71.05), "ward").endswith("NaN")
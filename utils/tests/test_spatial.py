@@ -0,0 +1,42 @@
+import numpy as np
+
+from utils.spatial import GridIndex, haversine_m, points_in_polygon
+
+
+def test_haversine_m():
+    # one degree of latitude is about 111.2 km
+    assert abs(haversine_m(42, -71, 43, -71) - 111_195) < 1
+
+
+def test_points_in_polygon():
+    square = [(0, 0), (2, 0), (2, 2), (0, 2)]
+    x = np.array([1, 3, 0.5, -1])
+    y = np.array([1, 1, 1.9, 1])
+    assert points_in_polygon(x, y, square).tolist() == [True, False, True, False]
+
+
+def test_grid_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    lat = 42.33 + rng.normal(0, 0.02, 20_000)
+    lon = -71.21 + rng.normal(0, 0.02, 20_000)
+    lat[:5] = np.nan
+    grid_index = GridIndex(lat, lon, cell_size_m=150)
+
+    polygon = [(-71.22, 42.32), (-71.19, 42.33), (-71.2, 42.35), (-71.23, 42.34)]
+    expected = np.flatnonzero(points_in_polygon(lon, lat, polygon))
+    assert np.array_equal(grid_index.within_polygon(polygon), expected)
+
+    distance = haversine_m(42.33, -71.21, lat, lon)
+    near = grid_index.within_distance(42.33, -71.21, 300)
+    assert set(near) == set(np.flatnonzero(distance <= 300))
+    assert np.all(np.diff(distance[near]) >= 0)
+
+    assert (
+        grid_index.nearest(42.5, -71.0, 3).tolist()
+        == np.argsort(np.nan_to_num(haversine_m(42.5, -71.0, lat, lon), nan=np.inf))[
+            :3
+        ].tolist()
+    )
+
+    # queries away from every point come back empty
+    assert len(grid_index.within_distance(10, 10, 1_000)) == 0
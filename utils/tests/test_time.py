@@ -1,4 +1,5 @@
 import datetime as dt
+import io
 
 import numpy as np
 import pandas as pd
@@ -6,8 +7,14 @@ import pytest
 from numpy.testing import assert_almost_equal
 
 from utils.time import (
+    convert_multiple_formats_to_datetime,
+    convert_multiple_formats_to_datetime_array,
     convert_to_datetime,
+    convert_to_datetime_array,
     convert_to_decimal_year,
+    convert_to_decimal_year_array,
+    days_in_month,
+    days_in_month_array,
     first_day_of_next_month,
 )
 
@@ -64,3 +71,92 @@ def test_convert_to_decimal_year():
         raise AssertionError(
             "Expected ValueError for crappy input to convert_to_decimal_year, but no exception was raised"
         )
+
+
+def test_days_in_month_array():
+    months = np.array([1, 2, 2, 2, 4, 12])
+    years = np.array([2021, 2020, 1900, 2000, 2021, 2021])
+    assert days_in_month_array(months, years).tolist() == [
+        days_in_month(int(m), int(y)) for m, y in zip(months, years)
+    ]
+    with pytest.raises(ValueError):
+        days_in_month_array(np.array([1.5]), np.array([2020]))
+    for month in [0, -1, 13]:
+        with pytest.raises(ValueError):
+            days_in_month_array(np.array([1, month]), 2020)
+
+
+def test_convert_to_datetime_array():
+    values = pd.Series(
+        [
+            "1919-06-04",
+            pd.Timestamp("1848-07-19"),
+            np.datetime64("1973-01-22"),
+            dt.date(1972, 6, 23),
+            dt.datetime(1963, 6, 10),
+        ],
+        index=list("abcde"),
+    )
+    result = convert_to_datetime_array(values)
+    assert result.index.tolist() == list("abcde")
+    assert result.tolist() == [convert_to_datetime(x) for x in values]
+
+    with pytest.raises(ValueError):
+        convert_to_datetime_array(["1919-06-04", "RIP RBG"])
+    assert convert_to_datetime_array(["RIP RBG"], errors="coerce").isna().all()
+
+    # pd.read_csv types a column of dates like 19991231 as int64
+    dates = pd.read_csv(io.StringIO("date\n19991231\n20030102\n"))["date"]
+    assert dates.dtype == "int64"
+    assert convert_to_datetime_array(dates, fmt="%Y%m%d").tolist() == [
+        pd.Timestamp("1999-12-31"),
+        pd.Timestamp("2003-01-02"),
+    ]
+    with pytest.raises(ValueError):
+        convert_to_datetime_array(dates)
+
+
+def test_convert_multiple_formats_to_datetime_array():
+    formats = ["%Y-%m-%d", "%m/%d/%Y", "%Y%m%d"]
+    values = [
+        "1999-12-31",
+        "12/31/1999",
+        "19991231",
+        "1/2/2003",
+        "12/31/1999",
+        dt.date(1972, 6, 23),
+        "not a date",
+        None,
+    ]
+    result = convert_multiple_formats_to_datetime_array(values, formats)
+    expected = [convert_multiple_formats_to_datetime(x, formats) for x in values[:6]]
+    assert result[:6].tolist() == expected
+    # the scalar version hands back what it cannot parse; the array version uses NaT
+    assert result[6:].isna().all()
+
+    # pd.read_csv types a column of dates like 19991231 as int64 (float64 if some
+    # are missing); the numbers are read as their digits, not as epoch nanoseconds
+    for text in ["date\n19991231\n20030102\n", "date\n19991231\n\n20030102\n"]:
+        dates = pd.read_csv(io.StringIO(text), skip_blank_lines=False)["date"]
+        assert dates.dtype.kind in "if"
+        result = convert_multiple_formats_to_datetime_array(dates, formats)
+        assert result.dropna().tolist() == [
+            pd.Timestamp("1999-12-31"),
+            pd.Timestamp("2003-01-02"),
+        ]
+    result = convert_multiple_formats_to_datetime_array(
+        pd.Series([19991231, 1999.5]), ["%Y-%m-%d"]
+    )
+    assert result.isna().all()
+
+
+def test_convert_to_decimal_year_array():
+    dates = [dt.datetime(2020, 1, 1), dt.date(1947, 1, 24), dt.date(2020, 2, 2)]
+    assert_almost_equal(
+        convert_to_decimal_year_array(dates),
+        [convert_to_decimal_year(d) for d in dates],
+        decimal=7,
+    )
+    assert np.isnan(convert_to_decimal_year_array(pd.Series([pd.NaT, dates[0]]))[0])
+    with pytest.raises(ValueError):
+        convert_to_decimal_year_array(["1944-01-24"])
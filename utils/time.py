@@ -77,3 +77,131 @@ def convert_to_decimal_year(d: dt.datetime):
     days_in_this_year = 365 + int(isleap(d.year))
     day_of_year = d.timetuple().tm_yday - 1  # January 1 is day 0
     return d.year + (day_of_year / days_in_this_year)
+
+
+def _is_leap_year(year: np.ndarray) -> np.ndarray:
+    """Vectorized calendar.isleap"""
+    return (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+
+
+def days_in_month_array(month, year) -> np.ndarray:
+    """days_in_month for arrays of months and years
+    Args:
+        month: integer month numbers (1-12)
+        year: integer years (broadcast against month)
+    Returns:
+        integer array of the number of days in each month
+    """
+    month = np.asarray(month)
+    year = np.asarray(year)
+    if month.dtype.kind not in "iu" or year.dtype.kind not in "iu":
+        raise ValueError(" Input arguments for month and year must be integers.")
+    if np.any((month < 1) | (month > 12)):
+        raise ValueError(" Input argument for month must be between 1 and 12.")
+    days = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[month]
+    return days + ((month == 2) & _is_leap_year(year))
+
+
+def _numbers_as_strings(values: pd.Series) -> pd.Series:
+    """Returns values with each number written out as the digits of its whole part
+    (e.g. 19991231 or 19991231.0 -> '19991231'), as when pd.read_csv types a column of
+    dates like 19991231 as int64 (or float64, if some are missing); numbers with a
+    fractional part become None, and all other values are left as they are"""
+    if values.dtype.kind in "iu":
+        return values.astype(str).astype(object)
+    if values.dtype.kind not in "fO":
+        return values
+    is_number = values.map(
+        lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool)
+    ).to_numpy()
+    if not is_number.any():
+        return values
+    numbers = values[is_number].astype(float)
+    whole = numbers.notna() & (numbers % 1 == 0)
+    text = pd.Series(None, index=numbers.index, dtype=object)
+    text[whole] = numbers[whole].astype("int64").astype(str)
+    values = values.astype(object)
+    values[is_number] = text
+    return values
+
+
+def convert_to_datetime_array(
+    x, fmt: str = "%Y-%m-%d", errors: str = "raise"
+) -> pd.Series:
+    """convert_to_datetime for a whole column: strings are parsed with fmt, while
+    timestamps, datetime64 values, dates and datetimes are converted as they are.
+    Numbers (e.g. an int64 column of dates like 19991231) are parsed with fmt as the
+    digits they are written with, rather than read as epoch nanoseconds
+    Args:
+        x: Series, array or list of dates
+        fmt: strptime format of the string values
+        errors: 'raise' (like convert_to_datetime, a ValueError for unparseable
+            strings) or 'coerce' (NaT instead)
+    Returns:
+        datetime64 Series (keeping x's index if x is a Series)
+    """
+    values = _numbers_as_strings(x if isinstance(x, pd.Series) else pd.Series(x))
+    if pd.api.types.is_string_dtype(values.dtype):
+        # object columns may mix strings with dates, timestamps, ...
+        is_string = values.map(type).eq(str).to_numpy()
+        parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+        parsed[is_string] = pd.to_datetime(values[is_string], format=fmt, errors=errors)
+        parsed[~is_string] = pd.to_datetime(values[~is_string], errors=errors)
+        return parsed
+    return pd.to_datetime(values, errors=errors)
+
+
+def convert_multiple_formats_to_datetime_array(x, formats: List[str]) -> pd.Series:
+    """convert_multiple_formats_to_datetime for a whole column: each format is tried
+    only on the values that no earlier format could parse, and each distinct value is
+    parsed once. Numbers (e.g. an int64 column of dates like 19991231) are tried
+    against the formats as the digits they are written with
+    Args:
+        x: Series, array or list of dates (typically strings in mixed formats)
+        formats: strptime formats to try, in order
+    Returns:
+        datetime64 Series (keeping x's index if x is a Series); unlike the scalar
+        version, values that no format parses become NaT rather than being returned
+        unchanged
+    """
+    values = x if isinstance(x, pd.Series) else pd.Series(x)
+    codes, uniques = pd.factorize(_numbers_as_strings(values).to_numpy(dtype=object))
+    uniques = pd.Series(uniques, dtype=object)
+    is_string = uniques.map(type).eq(str).to_numpy()
+
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+    parsed[~is_string] = pd.to_datetime(uniques[~is_string], errors="coerce")
+    unparsed = is_string.copy()
+    for fmt in formats:
+        if not unparsed.any():
+            break
+        attempt = pd.to_datetime(uniques[unparsed], format=fmt, errors="coerce")
+        parsed[unparsed] = attempt
+        unparsed[unparsed] = attempt.isna().to_numpy()
+
+    result = parsed.to_numpy()[codes]
+    result[codes < 0] = np.datetime64("NaT")
+    return pd.Series(result, index=values.index)
+
+
+def convert_to_decimal_year_array(d) -> np.ndarray:
+    """convert_to_decimal_year for a whole column of dates or datetimes
+    Args:
+        d: Series, array or list of datetimes, dates or datetime64 values
+    Returns:
+        float array of decimal years (NaN for missing dates)
+    """
+    values = d if isinstance(d, pd.Series) else pd.Series(d)
+    if values.dtype.kind != "M" and pd.api.types.infer_dtype(values) not in (
+        "datetime",
+        "datetime64",
+        "date",
+        "empty",
+    ):
+        raise ValueError(
+            "convert_to_decimal_year_array requires python datetime.datetime or datetime.date objects, or datetime64 values."
+        )
+    dates = pd.DatetimeIndex(pd.to_datetime(values))
+    days_in_this_year = 365 + dates.is_leap_year.astype(int)
+    day_of_year = dates.dayofyear - 1  # January 1 is day 0
+    return np.asarray(dates.year + day_of_year / days_in_this_year, dtype=float)
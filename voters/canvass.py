@@ -1,71 +1,342 @@
 import click
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from math import ceil
+import numpy as np
 import pandas as pd
+import tempfile
 import warnings
 from pathlib import Path
-from utils.io import yaml_to_dict
-import numpy as np
+from typing import Dict, List, Optional, Tuple
+from utils.io import concatenate_csv_files, dict_to_yaml, yaml_to_dict
+from voters.doors import DOOR_COLS, DoorTable
+from voters.manifest import (
+    CanvassManifest,
+    roads_hash,
+    row_hashes,
+    rows_hash,
+    settings_hash,
+)
+from voters.routing import door_walk_rank
+from voters.streaming import read_spilled_turf, spill_turfs
+from voters.streets import RoadLookup, StreetIndex, normalize_street_numbers
+from voters.turfs import CUT_TURF_FILTER_COLS, cut_turfs
+from voters.voter_file import read_voter_file
 
 warnings.filterwarnings("ignore")
 
 logging.basicConfig(level=logging.INFO)
 
+# voter frame, door table and config shared by the turf writers (set once per worker
+# process)
+_turf_source = {}
+
+# voter locations used to route each turf when the config turns walk_order on, and
+# to cut turfs when it has a cut_turfs section
+LOCATION_COLS = ["lat", "lon"]
+
+
+def turf_writer_columns(config: dict) -> list:
+    """Returns the voter frame columns write_turf needs to sort and write a turf (the
+    door columns are read from the door table)"""
+    columns = config["groupby_cols"] + config["write_out_cols"]
+    if config.get("walk_order", False):
+        street_cols = [config["street_col"], config["street_number_col"]]
+        columns = columns + LOCATION_COLS + street_cols
+    return [c for c in dict.fromkeys(columns) if c not in DOOR_COLS]
+
+
+def canvass_columns(config: dict) -> list:
+    """Returns the voter-file columns used to build and write canvass turfs"""
+    street_cols = [config["street_col"], config["street_number_col"]] + DOOR_COLS
+    if "cut_turfs" in config:
+        street_cols += LOCATION_COLS
+        street_cols += [c for c in CUT_TURF_FILTER_COLS if c in config["cut_turfs"]]
+    return street_cols + turf_writer_columns(config)
+
+
+def init_turf_writer(voters_df: pd.DataFrame, doors: DoorTable, config: dict):
+    """Makes the voter frame, door table and canvass config available to write_turf"""
+    _turf_source["voters_df"] = voters_df
+    _turf_source["doors"] = doors
+    _turf_source["config"] = config
 
-def convert_to_int(x):
-    try:
-        return int(float(x))
-    except:
-        return np.nan
+
+def write_turf(name: str, positions: np.ndarray) -> Path:
+    """Sorts one turf's voters and writes them to the turf's csv
+    Args:
+        name: turf name (key in config['roads'])
+        positions: row positions of the turf's voters in the shared voter frame
+    Returns:
+        path of the csv that was written
+    """
+    config = _turf_source["config"]
+    doors = _turf_source["doors"]
+    out_df = _turf_source["voters_df"].iloc[positions]
+    sort_keys = doors.sort_keys(out_df, positions, config["groupby_cols"])
+    by = config["groupby_cols"]
+    if config.get("walk_order", False):
+        # addresses (or, without one, street and house number) along a walking
+        # route; voters at the same stop by groupby_cols
+        sort_keys["_walk_rank"] = door_walk_rank(
+            doors.stop_ids(
+                positions,
+                out_df[config["street_col"]].to_numpy(),
+                out_df[config["street_number_col"]].to_numpy(dtype=np.int64),
+            ),
+            out_df["lat"].to_numpy(),
+            out_df["lon"].to_numpy(),
+        )
+        by = ["_walk_rank"] + by
+    order = sort_keys.sort_values(by=by, ascending=True).index.to_numpy()
+    out_df = doors.attach(
+        out_df.iloc[order], positions[order], config["write_out_cols"]
+    )
+    out_df["canvass_list"] = name
+    n = doors.count_addresses(positions)
+    out_path = Path(config["output_dir"]) / Path(name + f"_{n}_addresses.csv")
+    out_df.to_csv(out_path, index=False)
+    return out_path
+
+
+def write_spilled_turf(
+    name: str,
+    spill_path: Optional[Path],
+    rows_before: Optional[str],
+    dtypes: Dict[str, str],
+    config: dict,
+):
+    """Loads one turf's spilled rows and, unless they are the rows its previous file
+    was written from, sorts and writes them like write_turf
+    Args:
+        name: turf name (key in config['roads'])
+        spill_path: the turf's spill file (None if no voter was routed to it)
+        rows_before: rows hash of the turf's previous file, if that file can be kept
+        dtypes: type of each spilled column over the whole voter file
+        config: canvass config
+    Returns:
+        tuple: rows hash of the turf, path of the csv that was written (None if the
+            previous file was kept)
+    """
+    turf_df, positions = read_spilled_turf(spill_path, dtypes)
+    rows = rows_hash(row_hashes(turf_df), positions)
+    if rows == rows_before:
+        return rows, None
+    init_turf_writer(turf_df[turf_writer_columns(config)], DoorTable(turf_df), config)
+    return rows, write_turf(name, positions)
+
+
+def write_loaded_turfs(
+    config: dict,
+    workers: int,
+    manifest: CanvassManifest,
+    previous: Optional[CanvassManifest],
+) -> Tuple[List[str], List[str]]:
+    """Loads the whole voter file, resolves (or cuts) the turfs, and writes the turfs
+    whose road spec or voter rows changed since the previous run
+    Returns:
+        tuple: turf names in turf order, names of the turfs that were written
+    """
+    logging.info(f" --- Reading voters from {config['voter_file']}")
+    voters_df = read_voter_file(config["voter_file"], canvass_columns(config), config)
+    voters_df[config["street_number_col"]], n_missing = normalize_street_numbers(
+        voters_df[config["street_number_col"]]
+    )
+    logging.info(
+        f" --- {n_missing} of {len(voters_df)} street numbers could not be parsed (set to -1)"
+    )
+    # hash every voter row once, to tell which turfs' inputs changed since the last run
+    hashes = row_hashes(voters_df)
+    # hash each address and apartment once; from here on doors are integers
+    doors = DoorTable(voters_df)
+    logging.info(f" --- {len(voters_df)} voters live at {doors.n_doors} doors")
+
+    if "cut_turfs" in config:
+        # split the selected voters' doors into turfs, and save the turfs as a
+        # canvass config that can be edited by hand and run again
+        names, turf_positions, roads = cut_turfs(voters_df, config, doors)
+        cut_config = {k: v for k, v in config.items() if k != "cut_turfs"}
+        cut_config["roads"] = roads
+        roads_path = Path(config["output_dir"]) / Path(
+            config["list_generation_id"] + "_roads.yml"
+        )
+        dict_to_yaml(cut_config, str(roads_path))
+        logging.info(f" --- Cut {len(names)} turfs; their roads are in {roads_path}")
+    else:
+        # sort by street and house number once; each road entry is then a lookup
+        street_index = StreetIndex(
+            voters_df, config["street_col"], config["street_number_col"]
+        )
+        roads = config["roads"]
+        names = list(roads.keys())
+        turf_positions = [
+            np.concatenate(street_index.lookup_roads(roads[name])) for name in names
+        ]
+
+    # only turfs whose road spec or voter rows changed since the last run (as recorded
+    # in the manifest) are sorted and written again
+    output_dir = Path(config["output_dir"])
+    for name, positions in zip(names, turf_positions):
+        manifest.add(name, roads_hash(roads[name]), rows_hash(hashes, positions))
+    changed = [
+        i
+        for i, name in enumerate(names)
+        if not manifest.unchanged(previous, name, output_dir)
+    ]
+    logging.info(
+        f" --- {len(changed)} of {len(names)} turfs changed since the last run"
+    )
+
+    # the writers only need the columns that are sorted on or written out; the
+    # address and apartment strings are kept once per door in the door table
+    voters_df = voters_df[turf_writer_columns(config)]
+    changed_names = [names[i] for i in changed]
+    changed_positions = [turf_positions[i] for i in changed]
+    if workers > 1 and len(changed) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_turf_writer,
+            initargs=(voters_df, doors, config),
+        ) as executor:
+            turf_paths = list(
+                executor.map(write_turf, changed_names, changed_positions)
+            )
+    else:
+        init_turf_writer(voters_df, doors, config)
+        turf_paths = [
+            write_turf(n, p) for n, p in zip(changed_names, changed_positions)
+        ]
+    for name, turf_path in zip(changed_names, turf_paths):
+        logging.info(f" --- Wrote canvass path {name} to {turf_path}")
+        manifest.turfs[name]["file"] = turf_path.name
+    return names, changed_names
+
+
+def write_streamed_turfs(
+    config: dict,
+    workers: int,
+    chunk_size: int,
+    manifest: CanvassManifest,
+    previous: Optional[CanvassManifest],
+) -> Tuple[List[str], List[str]]:
+    """Streams the voter file through the turfs' road entries into per-turf spill
+    files, then loads, sorts and writes one turf at a time (one per worker), skipping
+    turfs whose road spec and voter rows are unchanged since the previous run
+    Returns:
+        tuple: turf names in turf order, names of the turfs that were written
+    """
+    lookup = RoadLookup(config["roads"])
+    names = lookup.names
+    output_dir = Path(config["output_dir"])
+    for name in names:
+        # the rows hash is known once the turf's rows are loaded
+        manifest.add(name, roads_hash(config["roads"][name]), None)
+    rows_before = [manifest.previous_rows(previous, n, output_dir) for n in names]
+
+    logging.info(f" --- Streaming voters from {config['voter_file']}")
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=".spill_") as spill_dir:
+        spill_paths, dtypes, n_voters, n_missing = spill_turfs(
+            config["voter_file"],
+            canvass_columns(config),
+            config["street_col"],
+            config["street_number_col"],
+            lookup,
+            spill_dir,
+            chunk_size,
+        )
+        logging.info(
+            f" --- {n_missing} of {n_voters} street numbers could not be parsed (set to -1)"
+        )
+        args = (names, spill_paths, rows_before, repeat(dtypes), repeat(config))
+        if workers > 1 and len(names) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                written = list(executor.map(write_spilled_turf, *args))
+        else:
+            written = list(map(write_spilled_turf, *args))
+
+    for name, (rows, turf_path) in zip(names, written):
+        manifest.turfs[name]["rows"] = rows
+        if turf_path is not None:
+            logging.info(f" --- Wrote canvass path {name} to {turf_path}")
+            manifest.turfs[name]["file"] = turf_path.name
+    changed_names = [n for n, (_, path) in zip(names, written) if path is not None]
+    logging.info(
+        f" --- {len(changed_names)} of {len(names)} turfs changed since the last run"
+    )
+    return names, changed_names
 
 
 @click.command()
 @click.argument("config_path", type=click.Path(exists=True))
-def canvass(config_path):
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    help="Number of processes used to sort and write the turf files",
+)
+@click.option(
+    "--rebuild",
+    is_flag=True,
+    help="Rewrite every turf file, even those the manifest says are up to date",
+)
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=None,
+    help="Stream the voter file in chunks of this many rows and hold one turf (per "
+    "worker) in memory at a time, instead of loading the whole file",
+)
+def canvass(config_path, workers, rebuild, chunk_size):
 
     config = yaml_to_dict(config_path)
 
     logging.info(f" --- Configuration file read from {config_path}")
-    print(config["voter_file"])
-    voters_df = pd.read_csv(config["voter_file"])
-    voters_df[config["street_number_col"]] = [
-        convert_to_int(x) for x in voters_df[config["street_number_col"]]
-    ]
-    voters_df[config["street_number_col"]].fillna(-1, inplace=True)
-    df_list = []
-    for name, roadlist in config["roads"].items():
-        out_list = []
-        for s in roadlist:
-            if isinstance(s, dict):
-                streetname = list(s.keys())[0]
-                numbers = list(s.values())[0]
-                out_list.append(
-                    voters_df.loc[
-                        (voters_df[config["street_col"]] == streetname)
-                        & (
-                            (voters_df[config["street_number_col"]] >= numbers[0])
-                            & (voters_df[config["street_number_col"]] <= numbers[1])
-                            | (voters_df[config["street_number_col"]] == -1)
-                        )
-                    ]
-                )
-            else:
-                out_list.append(voters_df.loc[(voters_df[config["street_col"]] == s)])
-        out_df = pd.concat(out_list)
-        out_df.sort_values(by=config["groupby_cols"], ascending=True, inplace=True)
-        out_df = out_df[config["write_out_cols"]]
-        out_df["canvass_list"] = name
-        n = out_df.address.nunique()
-        out_df.to_csv(
-            Path(config["output_dir"]) / Path(name + f"_{n}_addresses.csv"), index=False
+    output_dir = Path(config["output_dir"])
+    manifest_path = output_dir / Path(config["list_generation_id"] + "_manifest.json")
+    previous = None if rebuild else CanvassManifest.load(manifest_path)
+    manifest = CanvassManifest(settings_hash(config))
+    if chunk_size is not None:
+        if "cut_turfs" in config:
+            raise click.UsageError(
+                "--chunk-size needs a roads section: cutting turfs takes every "
+                "voter's location at once"
+            )
+        names, changed = write_streamed_turfs(
+            config, workers, chunk_size, manifest, previous
         )
-        logging.info(f" --- Wrote canvass path {name}")
-        df_list.append(out_df.copy())
+    else:
+        names, changed = write_loaded_turfs(config, workers, manifest, previous)
+    for name in names:
+        if manifest.turfs[name]["file"] is None:
+            manifest.turfs[name]["file"] = previous.turfs[name]["file"]
 
-    pd.concat(df_list).to_csv(
-        Path(config["output_dir"]) / Path(config["list_generation_id"] + ".csv"),
-        index=False,
+    # turf files of the last run that no longer belong to any turf (the turf was
+    # dropped, or its file name changed with its address count)
+    if previous is not None:
+        current_files = {entry["file"] for entry in manifest.turfs.values()}
+        for entry in previous.turfs.values():
+            stale = output_dir / entry["file"]
+            if entry["file"] not in current_files and stale.exists():
+                logging.info(f" --- Removing stale turf file {stale}")
+                stale.unlink()
+
+    # the master list is the turf files back to back; stream them rather than
+    # holding every turf in memory a second time, and only when a turf changed
+    manifest.master = config["list_generation_id"] + ".csv"
+    master_current = (
+        previous is not None
+        and previous.master == manifest.master
+        and (output_dir / manifest.master).exists()
+        and [(n, e["file"]) for n, e in previous.turfs.items()]
+        == [(n, e["file"]) for n, e in manifest.turfs.items()]
     )
+    if changed or not master_current:
+        concatenate_csv_files(
+            [output_dir / manifest.turfs[name]["file"] for name in names],
+            output_dir / manifest.master,
+        )
+    manifest.save(manifest_path)
 
 
 if __name__ == "__main__":
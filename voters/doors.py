@@ -0,0 +1,165 @@
+"""Household (door) table shared by the canvass and export paths: each voter's
+address and apartment are hashed once into an integer door ID, and the address and
+apartment strings are kept once per door instead of once per voter"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# columns that together identify a door
+DOOR_COLS = ["address", "apt"]
+
+
+def _sorted_codes(values: pd.Series) -> np.ndarray:
+    """Factorizes values into codes that sort like the values themselves, with
+    missing values last (as in sort_values)"""
+    codes, uniques = pd.factorize(values, sort=True)
+    codes[codes < 0] = len(uniques)
+    return codes
+
+
+class DoorTable:
+    """Voters grouped by door (address + apartment): the voters at door d are
+    voters[offsets[d]:offsets[d + 1]] (CSR layout), in voter frame order.
+    Args:
+        voters_df: dataframe with one row per voter, holding the DOOR_COLS
+        address_col: column holding the street address
+        apt_col: column holding the apartment (missing for a single-family house)
+    """
+
+    def __init__(
+        self,
+        voters_df: pd.DataFrame,
+        address_col: str = DOOR_COLS[0],
+        apt_col: str = DOOR_COLS[1],
+    ):
+        self.columns = [address_col, apt_col]
+        # hash the strings without sorting them (missing values get code -1)
+        address_codes, _ = pd.factorize(voters_df[address_col])
+        apt_codes, apt_uniques = pd.factorize(voters_df[apt_col])
+        # one integer key per (address, apartment)
+        keys = (address_codes.astype(np.int64) + 1) * (len(apt_uniques) + 1)
+        keys += apt_codes + 1
+        door_keys, door = np.unique(keys, return_inverse=True)
+        self.door = door.astype(np.int32)
+
+        counts = np.bincount(self.door, minlength=len(door_keys))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.voters = np.argsort(self.door, kind="stable")
+
+        # per door: its address (shared by the apartments there), and the strings
+        first_voter = self.voters[self.offsets[:-1]]
+        self.address = address_codes[first_voter]
+        self.frame = voters_df[self.columns].iloc[first_voter].reset_index(drop=True)
+        self._codes = None
+
+    @property
+    def codes(self) -> Dict[str, np.ndarray]:
+        """Per door, codes that sort like its address and its apartment (computed on
+        first use, over one string per door)"""
+        if self._codes is None:
+            self._codes = {col: _sorted_codes(self.frame[col]) for col in self.columns}
+        return self._codes
+
+    @property
+    def n_doors(self) -> int:
+        return len(self.offsets) - 1
+
+    def voters_at(self, doors: np.ndarray) -> np.ndarray:
+        """Returns the row positions of the voters at the given doors, door by door"""
+        doors = np.asarray(doors, dtype=np.int64)
+        starts = self.offsets[doors]
+        lengths = self.offsets[doors + 1] - starts
+        # each door's voters are a contiguous run of the CSR voters array
+        run_starts = np.cumsum(lengths) - lengths
+        index = np.arange(lengths.sum()) + np.repeat(starts - run_starts, lengths)
+        return self.voters[index]
+
+    def doors_of(self, positions: np.ndarray) -> np.ndarray:
+        """Returns the sorted door IDs of the voters at the given row positions"""
+        return np.unique(self.door[positions])
+
+    def count_doors(self, positions: np.ndarray) -> int:
+        """Returns the number of distinct doors among the given voters"""
+        return len(self.doors_of(positions))
+
+    def address_ids(self, positions: np.ndarray) -> np.ndarray:
+        """Returns an integer ID of each given voter's address, shared by all the
+        apartments at the address"""
+        return self.address[self.door[positions]]
+
+    def stop_ids(
+        self, positions: np.ndarray, streets: np.ndarray, numbers: np.ndarray
+    ) -> np.ndarray:
+        """Returns an integer ID of the stop at which each given voter is visited: the
+        voter's address, or, for a voter without one, their street and house number
+        (so that voters without an address are not all pooled into one stop)
+        Args:
+            positions: row positions of the voters in the voter frame
+            streets: street of each given voter
+            numbers: integer house number of each given voter
+        Returns:
+            integer array aligned with positions (address IDs, followed by one ID
+            per distinct street and house number of the voters without an address)
+        """
+        ids = self.address_ids(positions).astype(np.int64)
+        unaddressed = ids < 0
+        if unaddressed.any():
+            street_codes, _ = pd.factorize(
+                np.asarray(streets, dtype=object)[unaddressed]
+            )
+            numbers = np.asarray(numbers, dtype=np.int64)[unaddressed]
+            numbers = numbers - numbers.min()
+            # one integer key per (street, number)
+            keys = street_codes.astype(np.int64) * (numbers.max() + 1) + numbers
+            _, pairs = np.unique(keys, return_inverse=True)
+            ids[unaddressed] = self.address.max(initial=-1) + 1 + pairs
+        return ids
+
+    def count_addresses(self, positions: np.ndarray) -> int:
+        """Returns the number of distinct (known) addresses among the given voters, as
+        voters_df[address_col].nunique() would"""
+        addresses = self.address[self.doors_of(positions)]
+        return len(np.unique(addresses[addresses >= 0]))
+
+    def sort_keys(
+        self, df: pd.DataFrame, positions: np.ndarray, by: List[str]
+    ) -> pd.DataFrame:
+        """Returns the columns to sort rows of the voter frame by, with any door
+        columns among them replaced by integer codes that sort the same way
+        Args:
+            df: rows of the voter frame, at the given row positions
+            positions: row positions of df's rows in the voter frame
+            by: columns to sort by
+        Returns:
+            dataframe with a RangeIndex (so sort_values(...).index gives positions
+            into df)
+        """
+        keys = df[[col for col in by if col not in self.codes]].reset_index(drop=True)
+        door = self.door[positions]
+        for col in by:
+            if col in self.codes:
+                keys[col] = self.codes[col][door]
+        return keys[by]
+
+    def attach(
+        self,
+        df: pd.DataFrame,
+        positions: np.ndarray,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Adds the door columns to rows taken from the voter frame
+        Args:
+            df: rows of the voter frame, at the given row positions
+            positions: row positions of df's rows in the voter frame
+            columns: order of the returned columns (default: df's columns followed by
+                the door columns)
+        Returns:
+            copy of df with the door columns filled in
+        """
+        door_df = self.frame.iloc[self.door[positions]].set_index(df.index)
+        out_df = pd.concat(
+            [df.drop(columns=self.columns, errors="ignore"), door_df], axis=1
+        )
+        return out_df if columns is None else out_df[columns]
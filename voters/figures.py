@@ -0,0 +1,304 @@
+"""Map figures for the voter Dash app"""
+
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from dash import Patch
+
+# per-point arrays of a scatter_map trace that must shrink when points are removed
+MARKER_ARRAYS = ["lat", "lon", "customdata", "hovertext"]
+
+# when an export removes more than this fraction of a trace's points, resend the
+# trace's arrays rather than deleting the points one at a time
+MAX_DELETE_FRACTION = 0.1
+
+# map_mode 'aggregate': draw individual voters only when the viewport holds at most
+# max_points of them; otherwise bin them into a grid of aggregate_bins x aggregate_bins
+DEFAULT_MAX_POINTS = 20_000
+DEFAULT_AGGREGATE_BINS = 80
+
+# viewport size assumed when a relayout event carries a center and zoom but no corners
+ASSUMED_MAP_WIDTH_PX = 1600
+MAP_HEIGHT_PX = 900
+
+
+def voter_map(df: pd.DataFrame, config: dict) -> go.Figure:
+    """Plots one marker per voter, colored by politics
+    Args:
+        df: voters to plot (with lat, lon, politics, uid, voter_id_number, fullname)
+        config: app configuration (uses 'hover_name')
+    Returns:
+        plotly figure; each point's customdata holds [voter_id_number, uid, ...]
+    """
+    fig = px.scatter_map(
+        df,
+        lat="lat",
+        lon="lon",
+        hover_name=config["hover_name"],
+        hover_data={"voter_id_number": True, "uid": True, "fullname": False},
+        zoom=12,
+        height=MAP_HEIGHT_PX,
+        color="politics",
+    )
+    fig.update_layout(mapbox_style="basic")
+    fig.update_traces(marker=dict(size=5))
+    fig.update_layout(clickmode="event+select", dragmode="lasso")
+    return fig
+
+
+def with_plain_marker_arrays(fig: go.Figure) -> dict:
+    """Returns the figure as a dict whose per-point arrays are plain lists. Recent
+    plotly versions base64-encode numeric arrays, and a Patch cannot delete single
+    elements from an encoded array once it is in the browser. The plain lists make
+    the figure larger (about a fifth for a 50,000-voter map; see
+    benchmarks/map_patch.py).
+    Args:
+        fig: plotly figure
+    Returns:
+        figure dictionary, ready to be returned from a Dash callback
+    """
+    fig_dict = fig.to_dict()
+    for trace_dict, trace in zip(fig_dict["data"], fig.data):
+        for key in MARKER_ARRAYS:
+            if getattr(trace, key) is not None:
+                trace_dict[key] = np.asarray(getattr(trace, key)).tolist()
+    return fig_dict
+
+
+class MapTraces:
+    """Server-side copy of the per-point arrays drawn in each trace of a voter map, so
+    that later removals can be sent to the browser as a partial (Patch) update
+    Args:
+        fig: figure produced by voter_map, as sent to the browser
+    """
+
+    def __init__(self, fig: go.Figure):
+        self.arrays = [
+            {
+                key: np.asarray(getattr(trace, key))
+                for key in MARKER_ARRAYS
+                if getattr(trace, key) is not None
+            }
+            for trace in fig.data
+        ]
+        self.uids = [
+            (
+                np.asarray(trace.customdata)[:, 1].astype(np.int64)
+                if trace.customdata is not None
+                else np.empty(0, dtype=np.int64)
+            )
+            for trace in fig.data
+        ]
+
+    def selected_uids(self, points: List[dict]) -> list:
+        """Returns the uids of the points in a selectedData event"""
+        return [
+            p["customdata"][1] if "customdata" in p else p["hoverdata"]["uid"]
+            for p in points
+        ]
+
+    def remove(self, is_removed: Callable[[np.ndarray], np.ndarray]) -> Patch:
+        """Builds a Patch that drops points from the drawn figure
+        Args:
+            is_removed: function mapping an array of uids to a boolean array that is
+                True where the voter should no longer be drawn
+        Returns:
+            dash Patch touching only the traces that lost points
+        """
+        patch = Patch()
+        for t, uids in enumerate(self.uids):
+            gone = is_removed(uids)
+            if not gone.any():
+                continue
+            keep = ~gone
+            if gone.sum() > MAX_DELETE_FRACTION * len(uids):
+                for key, values in self.arrays[t].items():
+                    patch["data"][t][key] = values[keep].tolist()
+            else:
+                # delete from the end so earlier indices stay valid in the browser
+                for i in np.flatnonzero(gone)[::-1]:
+                    for key in self.arrays[t]:
+                        del patch["data"][t][key][int(i)]
+            self.arrays[t] = {key: v[keep] for key, v in self.arrays[t].items()}
+            self.uids[t] = uids[keep]
+            # the lasso selection indexes points that have moved
+            patch["data"][t]["selectedpoints"] = None
+        return patch
+
+
+class GridBins:
+    """Voters binned into a regular lat/lon grid over a viewport, drawn as one marker
+    per occupied cell (sized and colored by voter count)
+    Args:
+        df: voters to bin (with lat, lon, uid)
+        bounds: (lon_min, lat_min, lon_max, lat_max) of the grid
+        n_bins: number of cells along each side of the grid
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        bounds: Tuple[float, float, float, float],
+        n_bins: int = DEFAULT_AGGREGATE_BINS,
+    ):
+        lon_min, lat_min, lon_max, lat_max = bounds
+        lat = df["lat"].to_numpy(dtype=float)
+        lon = df["lon"].to_numpy(dtype=float)
+        ix = (n_bins * (lon - lon_min) / max(lon_max - lon_min, 1e-9)).astype(int)
+        iy = (n_bins * (lat - lat_min) / max(lat_max - lat_min, 1e-9)).astype(int)
+        cell = np.clip(iy, 0, n_bins - 1) * n_bins + np.clip(ix, 0, n_bins - 1)
+
+        _, inverse, self.counts = np.unique(
+            cell, return_inverse=True, return_counts=True
+        )
+        self.lat = np.bincount(inverse, weights=lat) / self.counts
+        self.lon = np.bincount(inverse, weights=lon) / self.counts
+
+        # uids grouped by cell: those of bin i are uids[offsets[i]:offsets[i + 1]]
+        self.uids = df["uid"].to_numpy()[np.argsort(inverse, kind="stable")]
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def figure(self) -> go.Figure:
+        """Plots one marker per occupied grid cell"""
+        size = 6 + 24 * np.sqrt(self.counts / max(self.counts.max(initial=1), 1))
+        fig = go.Figure(
+            go.Scattermap(
+                lat=self.lat,
+                lon=self.lon,
+                mode="markers",
+                marker=dict(size=size, color=self.counts, showscale=True),
+                customdata=np.arange(len(self.counts)),
+                hovertext=[f"{c} voters" for c in self.counts],
+                hoverinfo="text",
+                name="voters",
+            )
+        )
+        fig.update_layout(
+            height=MAP_HEIGHT_PX,
+            map=dict(
+                center=dict(
+                    lat=float(np.mean(self.lat)) if len(self.lat) else 0,
+                    lon=float(np.mean(self.lon)) if len(self.lon) else 0,
+                ),
+                zoom=12,
+            ),
+            clickmode="event+select",
+            dragmode="lasso",
+        )
+        return fig
+
+    def selected_uids(self, points: List[dict]) -> list:
+        """Returns the uids of every voter in the bins of a selectedData event"""
+        bins = [p["customdata"] for p in points if "customdata" in p]
+        return [
+            int(uid)
+            for i in bins
+            for uid in self.uids[self.offsets[i] : self.offsets[i + 1]]
+        ]
+
+
+def selection_polygon(selection: Optional[dict]) -> Optional[List[List[float]]]:
+    """Extracts the selection outline from a map selectedData event
+    Args:
+        selection: selectedData (or the lassoPoints/range part of it)
+    Returns:
+        [[lon, lat], ...] polygon of a lasso or box selection, or None for selections
+        made by clicking points
+    """
+    if not selection:
+        return None
+    for prefix in ["map", "mapbox"]:
+        lasso = (selection.get("lassoPoints") or {}).get(prefix)
+        if lasso:
+            return lasso
+        box = (selection.get("range") or {}).get(prefix)
+        if box:
+            (lon0, lat0), (lon1, lat1) = box
+            return [[lon0, lat0], [lon1, lat0], [lon1, lat1], [lon0, lat1]]
+    return None
+
+
+def map_camera(relayout_data: Optional[dict]) -> Optional[dict]:
+    """Extracts the viewport from a map relayoutData event
+    Args:
+        relayout_data: relayoutData of a dcc.Graph holding a map subplot
+    Returns:
+        dict with 'bounds' (lon_min, lat_min, lon_max, lat_max), 'center' and 'zoom',
+        or None if the event did not move the map
+    """
+    if not relayout_data:
+        return None
+    for prefix in ["map", "mapbox"]:
+        center = relayout_data.get(f"{prefix}.center")
+        zoom = relayout_data.get(f"{prefix}.zoom")
+        derived = relayout_data.get(f"{prefix}._derived") or {}
+        if "coordinates" in derived:
+            corners = np.asarray(derived["coordinates"], dtype=float)
+            bounds = (*corners.min(axis=0), *corners.max(axis=0))
+        elif center is not None and zoom is not None:
+            # web mercator with 512 px tiles: 360 degrees of longitude per 512 * 2^zoom px
+            half_lon = 180 * ASSUMED_MAP_WIDTH_PX / (512 * 2**zoom)
+            half_lat = (
+                half_lon
+                * (MAP_HEIGHT_PX / ASSUMED_MAP_WIDTH_PX)
+                * np.cos(np.radians(center["lat"]))
+            )
+            bounds = (
+                center["lon"] - half_lon,
+                center["lat"] - half_lat,
+                center["lon"] + half_lon,
+                center["lat"] + half_lat,
+            )
+        else:
+            continue
+        return {
+            "bounds": tuple(float(b) for b in bounds),
+            "center": center,
+            "zoom": zoom,
+        }
+    return None
+
+
+def draw_voters(
+    df: pd.DataFrame, config: dict, camera: Optional[dict] = None
+) -> Tuple[dict, Union[MapTraces, GridBins]]:
+    """Draws the voters in view, switching to grid bins when there are too many
+    Args:
+        df: voters that may be drawn
+        config: app configuration; 'map_mode' is 'points' (default: every voter in
+            df, one marker each) or 'aggregate' (only voters inside the camera's
+            bounds, binned when they number more than 'max_points')
+        camera: current viewport as returned by map_camera, if known
+    Returns:
+        tuple: figure dictionary for the browser, MapTraces or GridBins describing it
+    """
+    view = None
+    if config.get("map_mode", "points") == "aggregate":
+        if camera is not None:
+            lon_min, lat_min, lon_max, lat_max = camera["bounds"]
+            df = df.loc[
+                df["lon"].between(lon_min, lon_max)
+                & df["lat"].between(lat_min, lat_max)
+            ]
+        if len(df) > config.get("max_points", DEFAULT_MAX_POINTS):
+            bounds = (
+                camera["bounds"]
+                if camera is not None
+                else (df.lon.min(), df.lat.min(), df.lon.max(), df.lat.max())
+            )
+            view = GridBins(
+                df, bounds, config.get("aggregate_bins", DEFAULT_AGGREGATE_BINS)
+            )
+            fig = view.figure()
+    if view is None:
+        fig = voter_map(df, config)
+        view = MapTraces(fig)
+
+    # keep the user's pan and zoom when the figure is redrawn
+    if camera is not None and camera["center"] is not None:
+        fig.update_layout(map=dict(center=camera["center"], zoom=camera["zoom"]))
+    fig.update_layout(uirevision="voters")
+    return with_plain_marker_arrays(fig), view
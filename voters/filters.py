@@ -0,0 +1,64 @@
+"""Vectorized voter subsetting rules shared by the voter tools"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+class VoterFilter:
+    """Compiles the subsetting rules of a voter config into a single boolean mask. A
+    voter is kept if they live in one of the wards, their politics are not excluded,
+    they are included (by politics or by any include_boolean flag == 1), and no
+    exclude_boolean flag is 1.
+    Args:
+        config: configuration with 'ward', 'include_politics', 'exclude_politics',
+            'include_boolean' and 'exclude_boolean' (missing keys impose no rule,
+            except that without any include rule nobody is included)
+    """
+
+    def __init__(self, config: dict):
+        self.wards = config.get("ward")
+        self.include_politics = config.get("include_politics") or []
+        self.exclude_politics = config.get("exclude_politics") or []
+        self.include_boolean = config.get("include_boolean") or []
+        self.exclude_boolean = config.get("exclude_boolean") or []
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns the rules read"""
+        return (
+            (["ward"] if self.wards is not None else [])
+            + ["politics"]
+            + self.include_boolean
+            + self.exclude_boolean
+        )
+
+    @staticmethod
+    def _any_flag(df: pd.DataFrame, cols: List[str]) -> np.ndarray:
+        """True where any of the flag columns equals 1"""
+        flagged = np.zeros(len(df), dtype=bool)
+        for c in cols:
+            flagged |= df[c].eq(1).to_numpy()
+        return flagged
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Evaluates the rules over a voter frame
+        Args:
+            df: voter frame holding (at least) the columns in self.columns
+        Returns:
+            boolean array aligned with df; True for voters that pass every rule
+        """
+        politics = df["politics"]
+        keep = ~politics.isin(self.exclude_politics).to_numpy()
+        if self.wards is not None:
+            keep &= df["ward"].isin(self.wards).to_numpy()
+        keep &= politics.isin(self.include_politics).to_numpy() | self._any_flag(
+            df, self.include_boolean
+        )
+        keep &= ~self._any_flag(df, self.exclude_boolean)
+        return keep
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Returns the voters in df that pass every rule"""
+        return df.loc[self.mask(df)]
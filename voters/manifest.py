@@ -0,0 +1,140 @@
+"""Manifest of a canvass run, so that a rerun rewrites only the turfs whose road spec
+or voter rows changed"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# bump when the manifest layout or the way turf files are written changes, so that
+# older manifests are ignored and every turf is rewritten once
+MANIFEST_VERSION = 1
+
+# config entries that change how every turf file is written
+SETTINGS_KEYS = [
+    "groupby_cols",
+    "write_out_cols",
+    "walk_order",
+    "street_col",
+    "street_number_col",
+]
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def settings_hash(config: dict) -> str:
+    """Hashes the config entries that every turf file depends on"""
+    settings = {key: config.get(key) for key in SETTINGS_KEYS}
+    return _sha1(json.dumps(settings, sort_keys=True, default=str).encode())
+
+
+def roads_hash(roadlist: List[Union[str, dict]]) -> str:
+    """Hashes one turf's road spec (a list of streets and {street: [low, high]})"""
+    return _sha1(json.dumps(roadlist, sort_keys=True, default=str).encode())
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hashes every row of the voter frame in one vectorized pass
+    Args:
+        df: voter frame, restricted to the columns the turf files depend on
+    Returns:
+        uint64 array with one hash per row
+    """
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def rows_hash(hashes: np.ndarray, positions: np.ndarray) -> str:
+    """Hashes one turf's voter rows, in the order the turf takes them"""
+    return _sha1(np.ascontiguousarray(hashes[positions]).tobytes())
+
+
+class CanvassManifest:
+    """Per-turf record of what each turf file was written from
+    Args:
+        settings: settings_hash of the run's config
+        turfs: turf name -> {'roads': roads hash, 'rows': rows hash, 'file': name of
+            the turf's csv in the output directory}, in turf order
+        master: name of the master csv in the output directory
+    """
+
+    def __init__(
+        self,
+        settings: str,
+        turfs: Optional[Dict[str, dict]] = None,
+        master: Optional[str] = None,
+    ):
+        self.settings = settings
+        self.turfs = turfs if turfs is not None else {}
+        self.master = master
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["CanvassManifest"]:
+        """Reads a manifest; returns None if there is none, or it is unreadable or
+        from an older layout"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                contents = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as excp:
+            logging.warning(f" --- Ignoring unreadable canvass manifest {path}: {excp}")
+            return None
+        if contents.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(contents["settings"], contents["turfs"], contents.get("master"))
+
+    def save(self, path: Union[str, Path]):
+        """Writes the manifest (write-then-rename, so a crash never leaves half of
+        one behind)"""
+        path = Path(path)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "settings": self.settings,
+                    "master": self.master,
+                    "turfs": self.turfs,
+                },
+                f,
+                indent=1,
+            )
+        os.replace(tmp_path, path)
+
+    def add(self, name: str, roads: str, rows: Optional[str]):
+        """Records a turf's input hashes (its file is set once it is written, and its
+        rows hash may be set once its rows are loaded)"""
+        self.turfs[name] = {"roads": roads, "rows": rows, "file": None}
+
+    def previous_rows(
+        self, previous: Optional["CanvassManifest"], name: str, output_dir: Path
+    ) -> Optional[str]:
+        """Returns the rows hash the turf's previous file was written from, if that
+        file is still there and was written from the same settings and road spec
+        (None otherwise)"""
+        if previous is None or previous.settings != self.settings:
+            return None
+        before = previous.turfs.get(name)
+        if (
+            before is None
+            or before["roads"] != self.turfs[name]["roads"]
+            or before["file"] is None
+            or not (output_dir / before["file"]).exists()
+        ):
+            return None
+        return before["rows"]
+
+    def unchanged(
+        self, previous: Optional["CanvassManifest"], name: str, output_dir: Path
+    ) -> bool:
+        """True if the turf's file from the previous run is still there and was
+        written from the same settings, road spec and voter rows"""
+        rows = self.previous_rows(previous, name, output_dir)
+        return rows is not None and rows == self.turfs[name]["rows"]
@@ -0,0 +1,187 @@
+"""Walk-order routing of canvass turfs: orders a turf's doors along a short walking
+path instead of alphabetically"""
+
+from math import hypot
+from typing import Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from utils.spatial import EARTH_RADIUS_M
+
+# number of nearest doors considered as new neighbours by each 2-opt move
+DEFAULT_NEIGHBOURS = 10
+# 2-opt stops after this many passes over the route even if it is still improving
+DEFAULT_MAX_PASSES = 20
+
+
+def project_m(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Projects lat/lon to metres on a local equirectangular plane (accurate over a
+    turf-sized area)"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    m_per_deg = np.radians(1) * EARTH_RADIUS_M
+    x = lon * m_per_deg * np.cos(np.radians(np.nanmean(lat)))
+    y = lat * m_per_deg
+    return x, y
+
+
+def path_length(x: np.ndarray, y: np.ndarray, order: np.ndarray) -> float:
+    """Length of the open path visiting the points in order (in the units of x, y)"""
+    return float(np.hypot(np.diff(x[order]), np.diff(y[order])).sum())
+
+
+def nearest_neighbour_order(x: np.ndarray, y: np.ndarray, start: int = 0) -> np.ndarray:
+    """Greedy route: from start, always walk to the closest unvisited point
+    Args:
+        x: point x coordinates
+        y: point y coordinates
+        start: index of the first point
+    Returns:
+        array of point indices in visiting order
+    """
+    n = len(x)
+    order = np.empty(n, dtype=np.intp)
+    # unvisited points are kept in the first m slots, so each step only measures
+    # distances to the points still to be visited
+    left = np.arange(n)
+    left_x, left_y = np.array(x, dtype=float), np.array(y, dtype=float)
+    current, m = start, n
+    for k in range(n):
+        order[k] = left[current]
+        m -= 1
+        left[current], left_x[current], left_y[current] = left[m], left_x[m], left_y[m]
+        if m == 0:
+            break
+        here_x, here_y = x[order[k]], y[order[k]]
+        current = int(
+            np.argmin((left_x[:m] - here_x) ** 2 + (left_y[:m] - here_y) ** 2)
+        )
+    return order
+
+
+def two_opt(
+    x: np.ndarray,
+    y: np.ndarray,
+    order: np.ndarray,
+    n_neighbours: int = DEFAULT_NEIGHBOURS,
+    max_passes: int = DEFAULT_MAX_PASSES,
+) -> np.ndarray:
+    """Shortens an open route by 2-opt moves (reversing a stretch of the route) that
+    reconnect each point to one of its nearest neighbours
+    Args:
+        x: point x coordinates
+        y: point y coordinates
+        order: starting route (array of point indices); its first point stays first
+        n_neighbours: nearest neighbours tried as the new next point of each point
+        max_passes: maximum number of passes over the route
+    Returns:
+        improved route
+    """
+    n = len(order)
+    order = np.array(order, dtype=np.intp)
+    if n < 4:
+        return order
+    points = np.column_stack([x, y])
+    # distance to each point's nearest neighbours, nearest first (skipping itself)
+    near_dist, near = cKDTree(points).query(points, k=min(n_neighbours + 1, n))
+    near_dist, near = near_dist[:, 1:].tolist(), near[:, 1:].tolist()
+    # moves are tried one point at a time, which is faster on python scalars than on
+    # numpy arrays of a handful of candidates
+    xs, ys = np.asarray(x, dtype=float).tolist(), np.asarray(y, dtype=float).tolist()
+    position = np.empty(n, dtype=np.intp)
+    position[order] = np.arange(n)
+    route = order.tolist()
+
+    def dist(p, q):
+        return hypot(xs[p] - xs[q], ys[p] - ys[q])
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            a, b = route[i], route[i + 1]
+            d_ab = dist(a, b)
+            best_gain, best_j = 1e-9, -1
+            for c, d_ac in zip(near[a], near_dist[a]):
+                # a new edge a-c cannot pay off once it is longer than a-b
+                if d_ac >= d_ab:
+                    break
+                j = position[c]
+                if i - 1 <= j <= i + 1:
+                    continue
+                # with d = route[j + 1], both moves swap edges a-b, c-d for a-c, b-d:
+                # c after b: reverse route[i+1..j] so that a -> c ... b -> d
+                # c before a: reverse route[j+1..i] so that c -> a ... d -> b
+                gain = d_ab - d_ac
+                if j + 1 < n:
+                    d = route[j + 1]
+                    gain += dist(c, d) - dist(b, d)
+                if gain > best_gain:
+                    best_gain, best_j = gain, j
+            if best_j < 0:
+                continue
+            lo, hi = (i + 1, best_j) if best_j > i else (best_j + 1, i)
+            route[lo : hi + 1] = route[lo : hi + 1][::-1]
+            position[route[lo : hi + 1]] = np.arange(lo, hi + 1)
+            improved = True
+        if not improved:
+            break
+    return np.array(route, dtype=np.intp)
+
+
+def walk_order(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    n_neighbours: int = DEFAULT_NEIGHBOURS,
+    max_passes: int = DEFAULT_MAX_PASSES,
+) -> np.ndarray:
+    """Orders points along a short walking path: nearest-neighbour route from the
+    point farthest from the centre (so the walk starts at one end), then 2-opt
+    Args:
+        lat: point latitudes (degrees N)
+        lon: point longitudes (degrees E)
+        n_neighbours: see two_opt
+        max_passes: see two_opt
+    Returns:
+        array of point indices in walking order
+    """
+    x, y = project_m(lat, lon)
+    if len(x) < 3:
+        return np.arange(len(x))
+    start = int(np.argmax((x - x.mean()) ** 2 + (y - y.mean()) ** 2))
+    order = nearest_neighbour_order(x, y, start)
+    return two_opt(x, y, order, n_neighbours, max_passes)
+
+
+def door_walk_rank(door: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Ranks a turf's voters by the walking order of their doors
+    Args:
+        door: integer door ID of each voter
+        lat: latitude of each voter
+        lon: longitude of each voter
+    Returns:
+        integer array aligned with door: the position of each voter's door along the
+        route (doors without coordinates come last)
+    """
+    door_ids, door = np.unique(door, return_inverse=True)
+    n_doors = len(door_ids)
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    # each door sits at the mean location of its voters that have one
+    located = np.isfinite(lat) & np.isfinite(lon)
+    counts = np.bincount(door[located], minlength=n_doors)
+    door_lat, door_lon = (
+        np.bincount(door[located], weights=v[located], minlength=n_doors)
+        / np.maximum(counts, 1)
+        for v in [lat, lon]
+    )
+    has_location = np.flatnonzero(counts > 0)
+    route = np.concatenate(
+        [
+            has_location[walk_order(door_lat[has_location], door_lon[has_location])],
+            np.flatnonzero(counts == 0),
+        ]
+    )
+    rank = np.empty(n_doors, dtype=np.int64)
+    rank[route] = np.arange(n_doors)
+    return rank[door]
@@ -0,0 +1,123 @@
+"""Server-side state for the voter Dash app"""
+
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.spatial import GridIndex
+from voters.doors import DoorTable
+
+# browser sessions whose drawn map is kept on the server; older sessions keep only
+# their exports and viewport
+MAX_SESSIONS = 16
+
+
+class VoterState:
+    """Holds the app's voter frame on the server, indexed by uid, along with which
+    voters one browser session has exported. The browser only keeps uids and the
+    version token, which changes every time voters are exported.
+    Args:
+        voter_df: filtered voter frame whose index holds each voter's uid
+        doors: door table of voter_df (holding the address and apartment columns)
+    """
+
+    def __init__(self, voter_df: pd.DataFrame, doors: Optional[DoorTable] = None):
+        self.voter_df = voter_df
+        self.doors = doors
+        self.exported = np.zeros(len(voter_df), dtype=bool)
+        self.version = 0
+        # what the browser's map currently draws (set when the full figure is built)
+        # and the last viewport reported by the map
+        self.map_view = None
+        self.camera = None
+        # the spatial index is shared with the states forked from this one
+        self._shared = {"lock": threading.Lock(), "spatial_index": None}
+        self._lock = threading.Lock()
+
+    def fork(self) -> "VoterState":
+        """Returns a fresh state (nothing exported, no map drawn) over the same voter
+        frame, door table and spatial index"""
+        state = VoterState(self.voter_df, self.doors)
+        state._shared = self._shared
+        return state
+
+    @property
+    def spatial_index(self) -> GridIndex:
+        """Grid index over the voters' locations for lasso and radius queries, built on
+        first use"""
+        with self._shared["lock"]:
+            if self._shared["spatial_index"] is None:
+                self._shared["spatial_index"] = GridIndex(
+                    self.voter_df["lat"], self.voter_df["lon"]
+                )
+            return self._shared["spatial_index"]
+
+    def positions(self, uids: List[int]) -> np.ndarray:
+        """Returns the sorted row positions of the (known) voters with the given uids"""
+        positions = self.voter_df.index.get_indexer(pd.unique(np.asarray(uids)))
+        return np.sort(positions[positions >= 0])
+
+    def select(self, uids: List[int]) -> pd.DataFrame:
+        """Returns the rows for the given uids, in voter frame order"""
+        return self.voter_df.iloc[self.positions(uids)]
+
+    def remaining(self) -> pd.DataFrame:
+        """Returns the voters that have not been exported yet"""
+        return self.voter_df.loc[~self.exported]
+
+    def in_polygon(self, polygon: List[List[float]]) -> np.ndarray:
+        """Returns the uids of the unexported voters inside a [[lon, lat], ...] polygon"""
+        positions = self.spatial_index.within_polygon(polygon)
+        return self.voter_df.index[positions[~self.exported[positions]]].to_numpy()
+
+    def near(self, lat: float, lon: float, metres: float) -> pd.DataFrame:
+        """Returns the unexported voters within a distance of a point, nearest first"""
+        positions = self.spatial_index.within_distance(lat, lon, metres)
+        return self.voter_df.iloc[positions[~self.exported[positions]]]
+
+    def is_exported(self, uids: np.ndarray) -> np.ndarray:
+        """Returns a boolean array, aligned with uids, that is True for exported voters"""
+        return self.exported[self.voter_df.index.get_indexer(uids)]
+
+    def mark_exported(self, uids: List[int]) -> int:
+        """Flags voters as exported and returns the new version token"""
+        with self._lock:
+            self.exported[self.positions(uids)] = True
+            self.version += 1
+            return self.version
+
+
+class VoterSessions:
+    """One VoterState per browser session (keyed by an ID the page stores when it
+    loads), so that each tab has its own exports and map, over one shared voter frame.
+    Every session keeps its exports (one flag per voter), so a tab that is still open
+    never sees its exported voters again; only the most recently used sessions also
+    keep the map they drew.
+    Args:
+        state: state whose voter frame, door table and spatial index every session
+            shares
+        max_sessions: number of sessions that keep their drawn map; the others have
+            map_view set to None, so their next redraw sends the full figure
+    """
+
+    def __init__(self, state: VoterState, max_sessions: int = MAX_SESSIONS):
+        self.state = state
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> VoterState:
+        """Returns the session's state, starting a fresh one for a new session"""
+        with self._lock:
+            if session_id not in self._sessions:
+                self._sessions[session_id] = self.state.fork()
+            self._sessions.move_to_end(session_id)
+            # the session this pushed out of the most recent max_sessions drops its map
+            if len(self._sessions) > self.max_sessions:
+                stale = next(islice(reversed(self._sessions), self.max_sessions, None))
+                self._sessions[stale].map_view = None
+            return self._sessions[session_id]
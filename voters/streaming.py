@@ -0,0 +1,130 @@
+"""Out-of-core routing of a voter file into canvass turfs: the file is read in chunks,
+each row is appended to a spill file for every turf whose roads it lies on, and each
+turf is then loaded (and sorted) on its own, so memory is bounded by the largest turf
+rather than by the voter file"""
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from voters.streets import RoadLookup, normalize_street_numbers
+
+# spill-file columns recording where each row came from: the position of the road
+# entry it matched in the turf's road list, and its row number in the voter file
+ENTRY_COL = "_road_entry"
+ROW_COL = "_voter_row"
+
+# column types a spilled column can be read back as, narrowest first
+SPILL_DTYPES = ["int64", "float64", "object"]
+
+
+def column_dtype(values: pd.Series) -> str:
+    """Returns the type pd.read_csv would give a column of csv strings: int64 if
+    every value is a whole number, float64 if every non-missing value is a number,
+    object otherwise"""
+    parsed = pd.to_numeric(values, errors="coerce")
+    if parsed.isna().sum() > values.isna().sum():
+        return "object"
+    return "int64" if parsed.dtype.kind in "iu" else "float64"
+
+
+def spill_turfs(
+    voter_file: Union[str, Path],
+    columns: List[str],
+    street_col: str,
+    street_number_col: str,
+    lookup: RoadLookup,
+    spill_dir: Union[str, Path],
+    chunk_size: int,
+) -> Tuple[List[Optional[Path]], Dict[str, str], int, int]:
+    """Reads a voter csv chunk by chunk and appends each row to the spill file of
+    every turf it is routed to, noting the type each column has over the whole file
+    Args:
+        voter_file: path to the voter csv
+        columns: voter-file columns to keep (must include street_col and
+            street_number_col)
+        street_col: column holding the street name
+        street_number_col: column holding the house number (normalized to integers
+            before routing, as in the in-memory path)
+        lookup: compiled road entries of every turf
+        spill_dir: directory to which the spill files are written
+        chunk_size: number of voter rows read at a time
+    Returns:
+        tuple: spill file of each turf in lookup.names order (None for a turf no
+            voter was routed to), column -> type of the column over the whole file
+            (one of SPILL_DTYPES), number of voters read, number of street numbers
+            that could not be parsed
+    """
+    columns = list(dict.fromkeys(columns))
+    spill_paths = [None] * len(lookup.names)
+    dtypes = {col: SPILL_DTYPES[0] for col in columns}
+    n_voters = 0
+    n_missing = 0
+    # values are spilled as the strings in the file, and read back with the type
+    # their column has over the whole file
+    chunks = pd.read_csv(voter_file, usecols=columns, dtype=str, chunksize=chunk_size)
+    for chunk in chunks:
+        chunk = chunk[columns]
+        # a column takes the widest type any chunk needs, as when the whole file is
+        # read at once
+        for col in columns:
+            if col != street_number_col and dtypes[col] != SPILL_DTYPES[-1]:
+                dtypes[col] = max(
+                    dtypes[col], column_dtype(chunk[col]), key=SPILL_DTYPES.index
+                )
+        chunk[street_number_col], missing = normalize_street_numbers(
+            chunk[street_number_col]
+        )
+        rows, turfs, entries = lookup.route(
+            chunk[street_col], chunk[street_number_col].to_numpy()
+        )
+        # group the routed rows by turf, so that each turf's share is one slice
+        order = np.argsort(turfs, kind="stable")
+        rows, turfs, entries = rows[order], turfs[order], entries[order]
+        routed = chunk.iloc[rows].reset_index(drop=True)
+        routed[ENTRY_COL] = entries
+        routed[ROW_COL] = rows + n_voters
+
+        chunk_turfs, starts = np.unique(turfs, return_index=True)
+        ends = np.append(starts[1:], len(turfs))
+        for turf, start, end in zip(chunk_turfs, starts, ends):
+            first = spill_paths[turf] is None
+            if first:
+                spill_paths[turf] = Path(spill_dir) / f"{turf}.csv"
+            routed.iloc[start:end].to_csv(
+                spill_paths[turf], mode="a", header=first, index=False
+            )
+        n_voters += len(chunk)
+        n_missing += missing
+        logging.info(f" --- Routed {n_voters} voters to turfs")
+    return spill_paths, dtypes, n_voters, n_missing
+
+
+def read_spilled_turf(
+    spill_path: Optional[Path], dtypes: Dict[str, str]
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Loads one turf's spilled rows
+    Args:
+        spill_path: the turf's spill file (None if no voter was routed to it)
+        dtypes: spilled column -> its type over the whole voter file (from
+            spill_turfs), so that a turf's values parse as they do in the whole file
+            whichever rows the turf holds
+    Returns:
+        tuple: frame of the turf's rows, and the row positions that put them in the
+            order the in-memory path takes them (road entry by road entry, in file
+            order within each entry)
+    """
+    columns = list(dtypes)
+    read_dtypes = {col: str if t == "object" else t for col, t in dtypes.items()}
+    read_dtypes.update({ENTRY_COL: "int64", ROW_COL: "int64"})
+    if spill_path is None:
+        turf_df = pd.DataFrame(
+            {col: pd.Series(dtype=t) for col, t in read_dtypes.items()}
+        )
+    else:
+        turf_df = pd.read_csv(spill_path, dtype=read_dtypes)
+    positions = np.lexsort((turf_df[ROW_COL].to_numpy(), turf_df[ENTRY_COL].to_numpy()))
+    return turf_df[columns], positions
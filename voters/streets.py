@@ -0,0 +1,198 @@
+"""Street-level indexing of voter records for fast turf extraction"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# house number assigned to voters whose street number could not be parsed
+MISSING_STREET_NUMBER = -1
+
+# leading whole number of a house number such as "58A", "12-14" or "58 1/2"; the
+# lookahead keeps a bare fraction ("1/2") from being read as house number 1
+LEADING_NUMBER_PATTERN = r"^\s*(\d+)(?![\d/])"
+
+
+def normalize_street_numbers(values: pd.Series) -> Tuple[pd.Series, int]:
+    """Converts a column of raw house numbers to integers in one vectorized pass
+    Args:
+        values: series of house numbers as read from a voter file (numbers, numeric
+            strings, or strings such as "58A", "12-14", "58 1/2")
+    Returns:
+        tuple: integer series aligned with values (unparseable entries set to
+            MISSING_STREET_NUMBER), number of entries that fell back to it
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        # copy: for a float column to_numpy returns a view, and the missing
+        # entries are overwritten below
+        numbers = values.to_numpy(dtype=float, na_value=np.nan, copy=True)
+    else:
+        # a voter file has only a few thousand distinct house numbers, so parse
+        # each distinct string once and broadcast back with the factor codes
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Series(uniques, dtype=object)
+        parsed = pd.to_numeric(uniques, errors="coerce").astype(float)
+
+        # only strings that are not plain numbers go through the regex
+        unparsed = parsed.isna()
+        parsed[unparsed] = (
+            uniques[unparsed]
+            .astype(str)
+            .str.extract(LEADING_NUMBER_PATTERN, expand=False)
+            .astype(float)
+        )
+        numbers = np.append(parsed.to_numpy(), np.nan)[codes]
+
+    with np.errstate(invalid="ignore"):
+        numbers[~np.isfinite(numbers) | (np.abs(numbers) >= 2**63)] = np.nan
+    missing = np.isnan(numbers)
+    numbers[missing] = MISSING_STREET_NUMBER
+    return (
+        pd.Series(np.trunc(numbers).astype(np.int64), index=values.index),
+        int(missing.sum()),
+    )
+
+
+class StreetIndex:
+    """Sorts voter rows once by (street, street number) so that each road entry in a
+    canvass config resolves with a dictionary lookup and two binary searches instead
+    of a full-column scan.
+    Args:
+        voters_df: dataframe with one row per voter
+        street_col: name of the column holding the street name
+        street_number_col: name of the (numeric) column holding the house number;
+            unparseable numbers are expected to have been set to MISSING_STREET_NUMBER
+    """
+
+    def __init__(
+        self, voters_df: pd.DataFrame, street_col: str, street_number_col: str
+    ):
+        codes, streets = pd.factorize(voters_df[street_col])
+        numbers = voters_df[street_number_col].to_numpy(dtype=float)
+
+        # lexsort is stable: rows with the same street and number keep file order
+        order = np.lexsort((numbers, codes))
+        sorted_codes = codes[order]
+        starts = np.searchsorted(sorted_codes, np.arange(len(streets)), side="left")
+        ends = np.searchsorted(sorted_codes, np.arange(len(streets)), side="right")
+
+        self.positions = order
+        self.numbers = numbers[order]
+        self.offsets: Dict[str, Tuple[int, int]] = {
+            s: (int(a), int(b)) for s, a, b in zip(streets, starts, ends)
+        }
+
+    def lookup(
+        self, street: str, numbers: Optional[Sequence[Union[int, float]]] = None
+    ) -> np.ndarray:
+        """Returns positional (iloc) indices of the voters living on a street
+        Args:
+            street: street name, exactly as it appears in the street column
+            numbers: optional two-member [low, high] inclusive range of house numbers;
+                voters with a missing house number on the street are always included
+        Returns:
+            sorted array of row positions (i.e., in original file order)
+        """
+        if street not in self.offsets:
+            return np.empty(0, dtype=np.intp)
+        start, end = self.offsets[street]
+        if numbers is None:
+            return np.sort(self.positions[start:end])
+
+        street_numbers = self.numbers[start:end]
+        missing_start = np.searchsorted(street_numbers, MISSING_STREET_NUMBER, "left")
+        missing_end = np.searchsorted(street_numbers, MISSING_STREET_NUMBER, "right")
+        low = np.searchsorted(street_numbers, numbers[0], side="left")
+        high = np.searchsorted(street_numbers, numbers[1], side="right")
+
+        # the missing-number block and the requested range are both contiguous runs
+        # of the sorted street slice; union them, taking care when they overlap
+        selected = np.zeros(end - start, dtype=bool)
+        selected[missing_start:missing_end] = True
+        selected[low:high] = True
+        return np.sort(self.positions[start:end][selected])
+
+    def lookup_roads(self, roadlist: List[Union[str, dict]]) -> List[np.ndarray]:
+        """Resolves every entry of a canvass 'roads' list into row positions
+        Args:
+            roadlist: list whose members are either street names or single-key
+                dictionaries of the form {street name: [low number, high number]}
+        Returns:
+            list of position arrays, one per road entry, in roadlist order
+        """
+        out_list = []
+        for s in roadlist:
+            if isinstance(s, dict):
+                streetname = list(s.keys())[0]
+                out_list.append(self.lookup(streetname, list(s.values())[0]))
+            else:
+                out_list.append(self.lookup(s))
+        return out_list
+
+
+class RoadLookup:
+    """Compiles every turf's road entries into a street -> entries table, so that a
+    chunk of voter rows can be routed to the turfs they belong to without an index
+    over the whole voter file. A row matches an entry under the same rules as
+    StreetIndex.lookup, and is routed once per entry it matches.
+    Args:
+        roads: turf name -> list of street names and {street name: [low, high]}
+            entries (the 'roads' section of a canvass config)
+    """
+
+    def __init__(self, roads: Dict[str, List[Union[str, dict]]]):
+        self.names = list(roads.keys())
+        # (street, turf, position of the entry in the turf's road list, low, high)
+        entries = []
+        for turf, name in enumerate(self.names):
+            for i, s in enumerate(roads[name]):
+                if isinstance(s, dict):
+                    street, (low, high) = list(s.items())[0]
+                    entries.append((street, turf, i, float(low), float(high)))
+                else:
+                    entries.append((s, turf, i, -np.inf, np.inf))
+
+        streets = list(dict.fromkeys(e[0] for e in entries))
+        self.street_ids = {s: i for i, s in enumerate(streets)}
+        # entries sorted by street: street i's are entries[offsets[i]:offsets[i + 1]]
+        entries.sort(key=lambda e: self.street_ids[e[0]])
+        street = np.array([self.street_ids[e[0]] for e in entries], dtype=np.int64)
+        self.offsets = np.searchsorted(street, np.arange(len(streets) + 1))
+        self.turf = np.array([e[1] for e in entries], dtype=np.int64)
+        self.entry = np.array([e[2] for e in entries], dtype=np.int64)
+        self.low = np.array([e[3] for e in entries], dtype=float)
+        self.high = np.array([e[4] for e in entries], dtype=float)
+
+    def route(
+        self, streets: pd.Series, numbers: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Matches a chunk of voter rows against every road entry
+        Args:
+            streets: street name of each row
+            numbers: house number of each row (unparseable numbers set to
+                MISSING_STREET_NUMBER)
+        Returns:
+            tuple of equal-length arrays, one member per (row, matching entry): row
+                position in the chunk, turf index (into self.names), and position of
+                the entry in the turf's road list
+        """
+        # look up each distinct street name once (missing names get code -1)
+        codes, uniques = pd.factorize(streets)
+        ids = np.array([self.street_ids.get(s, -1) for s in uniques] + [-1])
+        street = ids[codes]
+        rows = np.flatnonzero(street >= 0)
+        street = street[rows]
+
+        # pair each row with each entry of its street
+        starts = self.offsets[street]
+        counts = self.offsets[street + 1] - starts
+        rows = np.repeat(rows, counts)
+        run_starts = np.cumsum(counts) - counts
+        entries = np.arange(counts.sum()) + np.repeat(starts - run_starts, counts)
+
+        row_numbers = np.asarray(numbers, dtype=float)[rows]
+        hit = (row_numbers == MISSING_STREET_NUMBER) | (
+            (row_numbers >= self.low[entries]) & (row_numbers <= self.high[entries])
+        )
+        rows, entries = rows[hit], entries[hit]
+        return rows, self.turf[entries], self.entry[entries]
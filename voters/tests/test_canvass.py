@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from voters.canvass import init_turf_writer, turf_writer_columns, write_turf
+from voters.doors import DoorTable
+from voters.tests.test_manifest import make_voters
+
+
+def test_write_turf_sorts_and_names_the_turf(tmp_path):
+    voters_df = make_voters(n=200)
+    config = {
+        "output_dir": str(tmp_path),
+        "groupby_cols": ["form_id", "fullstname", "number", "fullname"],
+        "write_out_cols": ["form_id", "address", "apt", "fullname"],
+    }
+    positions = np.flatnonzero(voters_df.fullstname == "ELM ST")
+    init_turf_writer(
+        voters_df[turf_writer_columns(config)], DoorTable(voters_df), config
+    )
+    out_path = write_turf("T1", positions)
+
+    turf = voters_df.iloc[positions]
+    assert out_path.name == f"T1_{turf.address.nunique()}_addresses.csv"
+    expected = turf.sort_values(by=config["groupby_cols"])[config["write_out_cols"]]
+    expected["canvass_list"] = "T1"
+    expected.to_csv(tmp_path / "expected.csv", index=False)
+    assert out_path.read_text() == (tmp_path / "expected.csv").read_text()
+
+
+def test_walk_order_gives_voters_without_an_address_a_stop_per_house_number(
+    tmp_path,
+):
+    # ELM ST runs east, one house number every 0.0001 degrees; the voters at odd
+    # numbers have no address
+    numbers = np.repeat(np.arange(1, 9), 2)
+    voters_df = pd.DataFrame(
+        {
+            "fullstname": "ELM ST",
+            "number": numbers,
+            "address": [f"{n} ELM ST" if n % 2 == 0 else np.nan for n in numbers],
+            "apt": None,
+            "fullname": [f"VOTER {i}" for i in range(len(numbers))],
+            "lat": 42.0,
+            "lon": -71.0 + 0.0001 * numbers,
+        }
+    ).sample(frac=1, random_state=0)
+    config = {
+        "output_dir": str(tmp_path),
+        "groupby_cols": ["fullname"],
+        "write_out_cols": ["number", "address", "fullname"],
+        "street_col": "fullstname",
+        "street_number_col": "number",
+        "walk_order": True,
+    }
+    init_turf_writer(
+        voters_df[turf_writer_columns(config)], DoorTable(voters_df), config
+    )
+    out_path = write_turf("T1", np.arange(len(voters_df)))
+
+    # one stop per house number, walked from one end of the street to the other
+    walked = pd.read_csv(out_path)["number"].tolist()
+    assert walked in (sorted(walked), sorted(walked, reverse=True))
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from voters.doors import DoorTable
+
+
+def make_voters():
+    return pd.DataFrame(
+        {
+            "address": [
+                "2 ELM ST",
+                "1 ELM ST",
+                "2 ELM ST",
+                np.nan,
+                "1 ELM ST",
+                "2 ELM ST",
+            ],
+            "apt": [np.nan, "1", np.nan, np.nan, "2", "3"],
+            "fullname": ["A", "B", "C", "D", "E", "F"],
+        }
+    )
+
+
+def test_doors_group_voters_by_address_and_apartment():
+    doors = DoorTable(make_voters())
+    assert doors.n_doors == 5
+    assert doors.door.tolist() == [1, 3, 1, 0, 4, 2]
+    assert doors.frame.iloc[1, 0] == "2 ELM ST" and pd.isna(doors.frame.iloc[1, 1])
+    assert doors.frame.iloc[4].tolist() == ["1 ELM ST", "2"]
+    # apartments share their building's address
+    assert doors.address[3] == doors.address[4] != doors.address[1]
+
+
+def test_voters_at_reads_the_csr_layout():
+    doors = DoorTable(make_voters())
+    assert doors.offsets.tolist() == [0, 1, 3, 4, 5, 6]
+    assert doors.voters_at([1, 3]).tolist() == [0, 2, 1]
+    assert doors.voters_at([]).tolist() == []
+
+
+def test_counts_match_nunique():
+    voters_df = make_voters()
+    doors = DoorTable(voters_df)
+    for positions in [np.arange(6), np.array([0, 2, 5]), np.array([3])]:
+        rows = voters_df.iloc[positions]
+        assert doors.count_addresses(positions) == rows.address.nunique()
+        assert doors.count_doors(positions) == len(
+            rows[["address", "apt"]].drop_duplicates()
+        )
+
+
+def test_sort_keys_sort_like_the_strings():
+    voters_df = make_voters()
+    doors = DoorTable(voters_df)
+    positions = np.array([5, 4, 3, 2, 1, 0])
+    rows = voters_df.iloc[positions]
+    by = ["address", "apt", "fullname"]
+    order = doors.sort_keys(rows, positions, by).sort_values(by=by).index.to_numpy()
+    expected = rows.sort_values(by=by)
+    out_df = doors.attach(
+        rows[["fullname"]].iloc[order], positions[order], ["address", "apt", "fullname"]
+    )
+    pd.testing.assert_frame_equal(out_df, expected)
+
+
+def test_stop_ids_split_voters_without_an_address_by_house_number():
+    doors = DoorTable(make_voters())
+    positions = np.array([0, 1, 2, 3, 4, 5])
+    streets = np.array(["ELM ST"] * 6, dtype=object)
+    ids = doors.stop_ids(positions, streets, np.array([2, 1, 2, 3, 1, 2]))
+    addressed = np.array([0, 1, 2, 4, 5])
+    assert (ids[addressed] == doors.address_ids(addressed)).all()
+    # the voter without an address gets an ID after the address IDs
+    assert ids[3] == doors.address.max() + 1
+    # voters without an address share a stop only at the same street and number
+    voters_df = make_voters()
+    voters_df["address"] = np.nan
+    doors = DoorTable(voters_df)
+    streets = np.array(["ELM ST", "ELM ST", "OAK RD", "ELM ST", "OAK RD", "ELM ST"])
+    ids = doors.stop_ids(positions, streets, np.array([2, 1, 2, 2, 2, 1]))
+    assert ids[0] == ids[3] and ids[2] == ids[4] and ids[1] == ids[5]
+    assert len(set(ids.tolist())) == 3
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from voters.figures import (
+    GridBins,
+    MapTraces,
+    draw_voters,
+    map_camera,
+    voter_map,
+    with_plain_marker_arrays,
+)
+
+
+def make_map(n=40):
+    df = pd.DataFrame(
+        {
+            "lat": np.linspace(42.3, 42.4, n),
+            "lon": np.linspace(-71.3, -71.2, n),
+            "politics": ["left"] * n,
+            "fullname": [f"V{i}" for i in range(n)],
+            "voter_id_number": [f"ID{i}" for i in range(n)],
+            "uid": np.arange(n) * 10,
+        }
+    )
+    return voter_map(df, {"hover_name": "fullname"})
+
+
+def test_with_plain_marker_arrays():
+    fig_dict = with_plain_marker_arrays(make_map())
+    assert isinstance(fig_dict["data"][0]["lat"], list)
+    assert fig_dict["data"][0]["customdata"][3][1] == 30
+
+
+def test_remove_deletes_few_points_from_the_end():
+    map_traces = MapTraces(make_map())
+    patch = map_traces.remove(lambda uids: np.isin(uids, [10, 30]))
+    deleted = [
+        op["location"]
+        for op in patch.to_plotly_json()["operations"]
+        if op["operation"] == "Delete"
+    ]
+    assert [loc[3] for loc in deleted if loc[2] == "lat"] == [3, 1]
+    assert 10 not in map_traces.uids[0] and len(map_traces.uids[0]) == 38
+
+    # nothing new to remove -> empty patch
+    assert (
+        map_traces.remove(lambda uids: np.isin(uids, [10, 30])).to_plotly_json()[
+            "operations"
+        ]
+        == []
+    )
+
+
+def test_remove_resends_arrays_for_large_removals():
+    map_traces = MapTraces(make_map())
+    patch = map_traces.remove(lambda uids: uids < 200)
+    assigned = {
+        op["location"][2]: op["params"]["value"]
+        for op in patch.to_plotly_json()["operations"]
+        if op["operation"] == "Assign"
+    }
+    assert len(assigned["lat"]) == 20
+    assert assigned["selectedpoints"] is None
+
+
+def test_grid_bins_resolve_selection_to_member_uids():
+    df = pd.DataFrame(
+        {
+            "lat": [0.1, 0.2, 0.9, 0.95, 0.15],
+            "lon": [0.1, 0.2, 0.9, 0.95, 0.1],
+            "uid": [1, 2, 3, 4, 5],
+        }
+    )
+    grid_bins = GridBins(df, (0, 0, 1, 1), n_bins=2)
+    assert grid_bins.counts.tolist() == [3, 2]
+    assert sorted(grid_bins.selected_uids([{"customdata": 0}])) == [1, 2, 5]
+    assert sorted(grid_bins.selected_uids([{"customdata": 1}])) == [3, 4]
+
+
+def test_map_camera():
+    assert map_camera({"dragmode": "pan"}) is None
+    camera = map_camera(
+        {
+            "map.center": {"lat": 1, "lon": 2},
+            "map.zoom": 10,
+            "map._derived": {"coordinates": [[1, 0], [3, 0], [3, 2], [1, 2]]},
+        }
+    )
+    assert camera["bounds"] == (1, 0, 3, 2)
+    assert camera["zoom"] == 10
+
+
+def test_draw_voters_aggregates_when_viewport_is_crowded():
+    df = pd.DataFrame(
+        {
+            "lat": np.linspace(0, 1, 50),
+            "lon": np.linspace(0, 1, 50),
+            "politics": "left",
+            "fullname": "V",
+            "voter_id_number": "ID",
+            "uid": np.arange(50),
+        }
+    )
+    config = {"hover_name": "fullname", "map_mode": "aggregate", "max_points": 10}
+    _, view = draw_voters(df, config)
+    assert isinstance(view, GridBins)
+
+    camera = {"bounds": (0, 0, 0.1, 0.1), "center": None, "zoom": None}
+    fig_dict, view = draw_voters(df, config, camera)
+    assert isinstance(view, MapTraces)
+    assert len(fig_dict["data"][0]["lat"]) == 5
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from voters.filters import VoterFilter
+
+CONFIG = {
+    "ward": [1, 2],
+    "include_politics": ["left"],
+    "exclude_politics": ["right"],
+    "include_boolean": ["educator", "helping"],
+    "exclude_boolean": ["finance"],
+}
+
+
+def loop_filter(voter_df, config):
+    """The list-comprehension rules voter.py used before VoterFilter"""
+    voter_df = voter_df.loc[(voter_df.ward.isin(config["ward"]))]
+    voter_df = voter_df.loc[~voter_df.politics.isin(config["exclude_politics"])]
+    voter_df["includes"] = [
+        1 if i in config["include_politics"] else 0 for i in voter_df.politics
+    ]
+    for inc in config["include_boolean"]:
+        voter_df["includes"] = [
+            1 if i == 1 else x for i, x in zip(voter_df[inc], voter_df.includes)
+        ]
+    voter_df["excludes"] = 0
+    for exclude in config["exclude_boolean"]:
+        voter_df["excludes"] = [
+            1 if e == 1 else x for e, x in zip(voter_df[exclude], voter_df.excludes)
+        ]
+    voter_df = voter_df.loc[voter_df.includes == 1]
+    return voter_df.loc[voter_df.excludes == 0]
+
+
+def test_voter_filter_matches_loop_rules():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    voter_df = pd.DataFrame(
+        {
+            "ward": rng.choice([1, 2, 3, np.nan], n),
+            "politics": rng.choice(["left", "right", "middle/unclear", None], n),
+            "educator": rng.choice([0, 1, np.nan], n),
+            "helping": rng.choice([0, 1], n),
+            "finance": rng.choice([0, 0, 0, 1], n),
+        }
+    )
+    voter_df["politics"] = voter_df.politics.astype("category")
+    expected = loop_filter(voter_df.copy(), CONFIG)
+    assert VoterFilter(CONFIG).apply(voter_df).index.tolist() == expected.index.tolist()
+
+
+def test_voter_filter_without_flags():
+    voter_df = pd.DataFrame({"ward": [1, 1, 5], "politics": ["left", "right", "left"]})
+    config = {"ward": [1], "include_politics": ["left"], "exclude_politics": []}
+    assert VoterFilter(config).mask(voter_df).tolist() == [True, False, False]
+    assert VoterFilter(config).columns == ["ward", "politics"]
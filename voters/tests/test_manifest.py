@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from click.testing import CliRunner
+
+from utils.io import dict_to_yaml
+from voters.canvass import canvass
+from voters.manifest import CanvassManifest, roads_hash, row_hashes, rows_hash
+
+
+def make_voters(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    street = rng.choice(["ELM ST", "OAK RD", "PINE AVE", "BIRCH LN"], n)
+    number = rng.integers(1, 100, n)
+    return pd.DataFrame(
+        {
+            "form_id": rng.integers(0, 3, n),
+            "fullstname": street,
+            "number": number,
+            "address": [f"{a} {s}" for a, s in zip(number, street)],
+            "apt": np.where(rng.random(n) < 0.2, "2", None),
+            "fullname": [f"VOTER {i}" for i in range(n)],
+        }
+    )
+
+
+def write_config(tmp_path, roads):
+    config = {
+        "voter_file": str(tmp_path / "voters.csv"),
+        "output_dir": str(tmp_path),
+        "list_generation_id": "plan",
+        "voter_cache": False,
+        "groupby_cols": ["form_id", "fullstname", "number", "fullname"],
+        "write_out_cols": ["form_id", "address", "apt", "fullname"],
+        "street_col": "fullstname",
+        "street_number_col": "number",
+        "roads": roads,
+    }
+    dict_to_yaml(config, str(tmp_path / "plan.yml"))
+    return str(tmp_path / "plan.yml")
+
+
+def turf_files(tmp_path):
+    return {p.name: p.stat().st_mtime_ns for p in tmp_path.glob("T*_addresses.csv")}
+
+
+def test_rows_hash_changes_only_with_the_turf_rows():
+    voters_df = make_voters()
+    hashes = row_hashes(voters_df)
+    edited = voters_df.copy()
+    edited.loc[5, "fullname"] = "SOMEONE ELSE"
+    edited_hashes = row_hashes(edited)
+    assert rows_hash(hashes, np.array([1, 2])) == rows_hash(edited_hashes, [1, 2])
+    assert rows_hash(hashes, np.array([1, 5])) != rows_hash(edited_hashes, [1, 5])
+    assert roads_hash(["ELM ST", {"OAK RD": [1, 9]}]) != roads_hash(["ELM ST"])
+
+
+def test_manifest_round_trip(tmp_path):
+    manifest = CanvassManifest("settings", master="plan.csv")
+    manifest.add("T1", "r", "v")
+    manifest.turfs["T1"]["file"] = "T1_3_addresses.csv"
+    manifest.save(tmp_path / "manifest.json")
+    loaded = CanvassManifest.load(tmp_path / "manifest.json")
+    assert loaded.turfs == manifest.turfs and loaded.master == "plan.csv"
+    assert CanvassManifest.load(tmp_path / "missing.json") is None
+
+
+def test_rerun_rewrites_only_changed_turfs(tmp_path):
+    voters_df = make_voters()
+    voters_df.to_csv(tmp_path / "voters.csv", index=False)
+    roads = {"T1": ["ELM ST"], "T2": ["OAK RD"], "T3": [{"PINE AVE": [1, 50]}]}
+    runner = CliRunner()
+    assert runner.invoke(canvass, [write_config(tmp_path, roads)]).exit_code == 0
+    first = turf_files(tmp_path)
+    master = (tmp_path / "plan.csv").read_bytes()
+
+    # nothing changed: no turf file is touched
+    assert runner.invoke(canvass, [write_config(tmp_path, roads)]).exit_code == 0
+    assert turf_files(tmp_path) == first
+    assert (tmp_path / "plan.csv").read_bytes() == master
+
+    # one voter on OAK RD renamed and T3's range edited: only T2 and T3 rewritten
+    first_oak = voters_df.index[voters_df.fullstname == "OAK RD"][0]
+    voters_df.loc[first_oak, "fullname"] = "RENAMED"
+    voters_df.to_csv(tmp_path / "voters.csv", index=False)
+    roads["T3"] = [{"PINE AVE": [1, 80]}]
+    assert runner.invoke(canvass, [write_config(tmp_path, roads)]).exit_code == 0
+    second = turf_files(tmp_path)
+    t1 = next(name for name in first if name.startswith("T1_"))
+    assert second[t1] == first[t1]
+    assert len(second) == 3
+    assert all(second[n] != first.get(n) for n in second if not n.startswith("T1_"))
+
+    # the reassembled master matches a full rebuild
+    master = (tmp_path / "plan.csv").read_bytes()
+    result = runner.invoke(canvass, [write_config(tmp_path, roads), "--rebuild"])
+    assert result.exit_code == 0
+    assert (tmp_path / "plan.csv").read_bytes() == master
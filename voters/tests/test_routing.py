@@ -0,0 +1,47 @@
+import numpy as np
+
+from voters.routing import (
+    door_walk_rank,
+    nearest_neighbour_order,
+    path_length,
+    two_opt,
+    walk_order,
+)
+
+
+def test_walk_order_follows_a_street():
+    rng = np.random.default_rng(0)
+    lon = -71.2 + 0.0001 * rng.permutation(50)
+    lat = np.full(50, 42.33)
+    order = walk_order(lat, lon)
+    assert np.all(np.diff(lon[order]) > 0) or np.all(np.diff(lon[order]) < 0)
+
+
+def test_two_opt_untangles_a_crossed_route():
+    # a square walked corner to corner crosses itself; 2-opt walks round the edge
+    x = np.array([0.0, 1.0, 0.0, 1.0])
+    y = np.array([0.0, 1.0, 1.0, 0.0])
+    order = two_opt(x, y, np.array([0, 1, 2, 3]))
+    assert order[0] == 0
+    assert path_length(x, y, order) == 3.0
+
+
+def test_two_opt_never_lengthens_the_route():
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(0, 1000, (2, 2000))
+    greedy = nearest_neighbour_order(x, y)
+    improved = two_opt(x, y, greedy)
+    assert sorted(improved) == list(range(2000))
+    assert path_length(x, y, improved) < path_length(x, y, greedy)
+
+
+def test_door_walk_rank_keeps_voters_at_a_door_together():
+    door = np.array([30, 10, 20, 10, 30, 5])
+    lat = np.array([42.0] * 5 + [np.nan])
+    lon = np.array([-71.0003, -71.0001, -71.0002, -71.0001, -71.0003, np.nan])
+    rank = door_walk_rank(door, lat, lon)
+    assert rank[1] == rank[3] and rank[0] == rank[4]
+    # doors 10, 20, 30 lie along the street in that order
+    assert rank[[1, 2, 0]].tolist() in ([0, 1, 2], [2, 1, 0])
+    # the door without a location is visited last
+    assert rank[5] == 3
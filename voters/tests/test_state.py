@@ -0,0 +1,69 @@
+import pandas as pd
+
+from voters.state import VoterSessions, VoterState
+
+
+def make_state():
+    voter_df = pd.DataFrame(
+        {"fullname": ["A", "B", "C", "D"]}, index=[3, 10, 11, 40]
+    ).assign(uid=lambda df: df.index)
+    return VoterState(voter_df)
+
+
+def test_select_keeps_frame_order_and_ignores_unknown_uids():
+    state = make_state()
+    assert state.select([40, 3, 999, 3]).fullname.tolist() == ["A", "D"]
+
+
+def test_mark_exported():
+    state = make_state()
+    assert state.mark_exported([10, 40]) == 1
+    assert state.remaining().uid.tolist() == [3, 11]
+    assert state.mark_exported([3]) == 2
+    assert state.remaining().uid.tolist() == [11]
+
+
+def test_spatial_queries_skip_exported_voters():
+    voter_df = pd.DataFrame(
+        {"lat": [42.0, 42.0005, 42.01, 42.0002], "lon": [-71.0, -71.0, -71.0, -71.0]},
+        index=[7, 8, 9, 10],
+    )
+    state = VoterState(voter_df)
+    square = [
+        [-71.001, 41.999],
+        [-70.999, 41.999],
+        [-70.999, 42.001],
+        [-71.001, 42.001],
+    ]
+    assert state.in_polygon(square).tolist() == [7, 8, 10]
+    assert state.near(42.0, -71.0, 100).index.tolist() == [7, 10, 8]
+    state.mark_exported([10])
+    assert state.in_polygon(square).tolist() == [7, 8]
+    assert state.near(42.0, -71.0, 100).index.tolist() == [7, 8]
+
+
+def test_sessions_keep_their_own_exports():
+    sessions = VoterSessions(make_state(), max_sessions=2)
+    first = sessions.get("tab-1")
+    first.mark_exported([10])
+    second = sessions.get("tab-2")
+    assert second.remaining().uid.tolist() == [3, 10, 11, 40]
+    assert sessions.get("tab-1") is first
+    assert first.remaining().uid.tolist() == [3, 11, 40]
+    # a third session drops the map of the least recently used one (tab-2), which
+    # still keeps its exports
+    first.map_view = second.map_view = "drawn"
+    second.mark_exported([3])
+    sessions.get("tab-3")
+    assert sessions.get("tab-1") is first and first.map_view == "drawn"
+    assert sessions.get("tab-2") is second and second.map_view is None
+    assert second.remaining().uid.tolist() == [10, 11, 40]
+    # tab-1 is the least recently used once tab-3 is used again
+    sessions.get("tab-3")
+    assert first.map_view is None and first.remaining().uid.tolist() == [3, 11, 40]
+
+
+def test_forked_states_share_the_spatial_index():
+    voter_df = pd.DataFrame({"lat": [42.0, 42.001], "lon": [-71.0, -71.0]})
+    state = VoterState(voter_df)
+    assert state.fork().spatial_index is state.spatial_index
@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import pandas as pd
+from click.testing import CliRunner
+
+from voters.canvass import canvass
+from voters.streaming import read_spilled_turf, spill_turfs
+from voters.streets import RoadLookup
+from voters.tests.test_manifest import make_voters, turf_files, write_config
+
+ROADS = {
+    "T1": ["ELM ST", {"OAK RD": [1, 40]}],
+    "T2": [{"PINE AVE": [1, 50]}, {"PINE AVE": [40, 99]}],
+    "T3": ["MAPLE AVE"],
+}
+
+
+def test_spilled_turfs_read_back_in_road_entry_order(tmp_path):
+    voters_df = make_voters()
+    voters_df.to_csv(tmp_path / "voters.csv", index=False)
+    columns = ["fullstname", "number", "fullname"]
+    lookup = RoadLookup(ROADS)
+    spill_paths, dtypes, n_voters, n_missing = spill_turfs(
+        tmp_path / "voters.csv", columns, "fullstname", "number", lookup, tmp_path, 64
+    )
+    assert n_voters == len(voters_df) and n_missing == 0
+    assert spill_paths[2] is None
+    assert dtypes == {"fullstname": "object", "number": "int64", "fullname": "object"}
+
+    turf_df, positions = read_spilled_turf(spill_paths[1], dtypes)
+    pine = voters_df[voters_df.fullstname == "PINE AVE"]
+    expected = pd.concat(
+        [pine[pine.number.between(1, 50)], pine[pine.number.between(40, 99)]]
+    )
+    assert turf_df.iloc[positions].fullname.tolist() == expected.fullname.tolist()
+
+
+def test_streaming_writes_the_same_files(tmp_path):
+    voters_df = make_voters(n=1000)
+    # columns whose type over the whole file differs from their type in some turfs:
+    # apartments are numbers except on ELM ST, and form IDs are missing only there
+    elm = voters_df.fullstname == "ELM ST"
+    voters_df.loc[elm & voters_df.apt.notna(), "apt"] = "2A"
+    voters_df["form_id"] = voters_df.form_id.astype(object)
+    voters_df.loc[voters_df.index[elm][::5], "form_id"] = None
+    outputs = {}
+    for mode, args in [("loaded", []), ("streamed", ["--chunk-size", "97"])]:
+        out_dir = tmp_path / mode
+        out_dir.mkdir()
+        voters_df.to_csv(out_dir / "voters.csv", index=False)
+        result = CliRunner().invoke(canvass, [write_config(out_dir, ROADS), *args])
+        assert result.exit_code == 0
+        outputs[mode] = {
+            p.name: p.read_bytes() for p in out_dir.glob("*.csv") if p.stem != "voters"
+        }
+        # the spill files are removed once the turfs are written
+        assert not list(out_dir.glob(".spill_*"))
+    assert outputs["streamed"] == outputs["loaded"]
+    assert "T3_0_addresses.csv" in outputs["streamed"]
+
+
+def test_streaming_rerun_keeps_unchanged_turfs(tmp_path):
+    voters_df = make_voters()
+    voters_df.to_csv(tmp_path / "voters.csv", index=False)
+    args = [write_config(tmp_path, ROADS), "--chunk-size", "50"]
+    runner = CliRunner()
+    assert runner.invoke(canvass, args).exit_code == 0
+    first = turf_files(tmp_path)
+
+    voters_df.loc[voters_df.fullstname == "ELM ST", "fullname"] = "RENAMED"
+    voters_df.to_csv(tmp_path / "voters.csv", index=False)
+    assert runner.invoke(canvass, args).exit_code == 0
+    second = turf_files(tmp_path)
+    changed = {name.split("_")[0] for name in second if second[name] != first[name]}
+    assert changed == {"T1"}
+
+
+def test_streaming_needs_a_roads_section(tmp_path):
+    config_path = Path(write_config(tmp_path, ROADS))
+    config_text = config_path.read_text().replace("roads:", "cut_turfs: {}\nroads:")
+    config_path.write_text(config_text)
+    result = CliRunner().invoke(canvass, [str(config_path), "--chunk-size", "50"])
+    assert result.exit_code != 0 and "--chunk-size" in result.output
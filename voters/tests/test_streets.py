@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from voters.streets import RoadLookup, StreetIndex, normalize_street_numbers
+
+
+def make_voters():
+    return pd.DataFrame(
+        {
+            "fullstname": ["ELM ST", "OAK RD", "ELM ST", "ELM ST", np.nan, "ELM ST"],
+            "number": [10, 5, -1, 300, 10, 12],
+        }
+    )
+
+
+def test_lookup_whole_street():
+    street_index = StreetIndex(make_voters(), "fullstname", "number")
+    assert street_index.lookup("ELM ST").tolist() == [0, 2, 3, 5]
+    assert street_index.lookup("OAK RD").tolist() == [1]
+    assert street_index.lookup("MAPLE AVE").tolist() == []
+
+
+def test_lookup_number_range_keeps_missing_numbers():
+    street_index = StreetIndex(make_voters(), "fullstname", "number")
+    assert street_index.lookup("ELM ST", [10, 12]).tolist() == [0, 2, 5]
+    assert street_index.lookup("ELM ST", [400, 500]).tolist() == [2]
+    # a range that itself covers -1 must not double count
+    assert street_index.lookup("ELM ST", [-5, 10]).tolist() == [0, 2]
+
+
+def test_lookup_roads_matches_boolean_masks():
+    rng = np.random.default_rng(1)
+    voters_df = pd.DataFrame(
+        {
+            "fullstname": rng.choice(["A ST", "B ST", "C ST"], 500),
+            "number": rng.choice([-1, 1, 2, 3, 50, 51, 99], 500),
+        }
+    )
+    roadlist = ["A ST", {"B ST": [2, 51]}, {"C ST": [99, 99]}]
+    street_index = StreetIndex(voters_df, "fullstname", "number")
+    for road, positions in zip(roadlist, street_index.lookup_roads(roadlist)):
+        if isinstance(road, dict):
+            street, (low, high) = list(road.items())[0]
+            mask = (voters_df.fullstname == street) & (
+                voters_df.number.between(low, high) | (voters_df.number == -1)
+            )
+        else:
+            mask = voters_df.fullstname == road
+        assert positions.tolist() == np.flatnonzero(mask).tolist()
+
+
+def test_road_lookup_routes_rows_like_street_index():
+    voters_df = make_voters()
+    roads = {
+        "T1": ["ELM ST", {"OAK RD": [1, 9]}],
+        "T2": [{"ELM ST": [10, 12]}, {"ELM ST": [12, 400]}],
+        "T3": ["MAPLE AVE"],
+    }
+    street_index = StreetIndex(voters_df, "fullstname", "number")
+    rows, turfs, entries = RoadLookup(roads).route(
+        voters_df.fullstname, voters_df.number.to_numpy()
+    )
+    for turf, name in enumerate(roads):
+        for entry, positions in enumerate(street_index.lookup_roads(roads[name])):
+            routed = rows[(turfs == turf) & (entries == entry)]
+            assert sorted(routed.tolist()) == positions.tolist()
+    # the missing-number row and number 12 match both of T2's entries
+    assert sorted(rows[turfs == 1].tolist()) == [0, 2, 2, 3, 5, 5]
+
+
+def test_normalize_street_numbers():
+    raw = pd.Series(["58A", "12-14", "58 1/2", "1/2", " ", "7.0", None, 3.7, "inf"])
+    numbers, n_missing = normalize_street_numbers(raw)
+    assert numbers.tolist() == [58, 12, 58, -1, -1, 7, -1, 3, -1]
+    assert n_missing == 4
+
+
+def test_normalize_street_numbers_numeric_column():
+    numbers, n_missing = normalize_street_numbers(
+        pd.Series([10.0, np.nan, -2.5], index=[4, 5, 6])
+    )
+    assert numbers.tolist() == [10, -1, -2]
+    assert numbers.index.tolist() == [4, 5, 6]
+    assert n_missing == 1
+
+
+def test_normalize_street_numbers_leaves_the_input_alone():
+    values = pd.Series([1.0, np.nan, 3.5])
+    normalize_street_numbers(values)
+    assert values.isna().tolist() == [False, True, False]
+    assert values[[0, 2]].tolist() == [1.0, 3.5]
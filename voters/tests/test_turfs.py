@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from voters.doors import DoorTable
+from voters.streets import StreetIndex
+from voters.turfs import bisect_turfs, cut_turfs, turf_roads
+
+
+def make_voters(n=3000, seed=0):
+    """Voters on ten east-west streets, numbered from west to east"""
+    rng = np.random.default_rng(seed)
+    street = rng.integers(0, 10, n)
+    number = rng.integers(1, 400, n)
+    number[rng.random(n) < 0.01] = -1
+    streets = np.array([f"STREET{s} ST" for s in range(10)])[street]
+    return pd.DataFrame(
+        {
+            "fullstname": streets,
+            "number": number,
+            "address": [f"{n} {s}" for n, s in zip(number, streets)],
+            "apt": np.where(rng.random(n) < 0.2, "1", None),
+            "lat": 42.33 + 0.001 * street,
+            "lon": -71.2 + 0.00001 * number,
+            "ward": rng.integers(1, 3, n),
+        }
+    )
+
+
+def test_bisect_turfs_balances_turf_sizes():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 1000, (2, 10_000))
+    turf = bisect_turfs(x, y, 60)
+    sizes = np.bincount(turf)
+    assert len(sizes) == 167
+    assert sizes.min() >= 59 and sizes.max() <= 61
+
+
+def test_bisect_turfs_keeps_a_small_area_whole():
+    assert bisect_turfs(np.arange(20.0), np.zeros(20), 60).tolist() == [0] * 20
+
+
+def test_turf_roads_lists_whole_streets_and_number_runs():
+    streets = np.array(["A ST", "A ST", "A ST", "A ST", "B ST", "B ST", "A ST"])
+    numbers = np.array([1, 3, 5, 7, 2, 4, -1])
+    turf = np.array([0, 0, 1, 0, 1, 1, 1])
+    roads = turf_roads(streets, numbers, turf, ["T1", "T2"])
+    assert roads == {
+        "T1": [{"A ST": [1, 3]}, {"A ST": [7, 7]}],
+        "T2": [{"A ST": [5, 5]}, "B ST"],
+    }
+
+
+def test_turf_roads_stop_at_doors_in_no_turf():
+    streets = np.array(["A ST", "A ST", "A ST", "A ST", "B ST", "B ST"])
+    numbers = np.array([1, 3, 5, 7, 2, -1])
+    turf = np.array([0, 0, -1, 0, 0, -1])
+    roads = turf_roads(streets, numbers, turf, ["T1"])
+    assert roads == {"T1": [{"A ST": [1, 3]}, {"A ST": [7, 7]}, {"B ST": [2, 2]}]}
+
+
+def test_cut_turfs_roads_select_the_same_voters():
+    voters_df = make_voters()
+    # the ward line crosses the first five streets at number 200; a few voters in
+    # ward 2 have no location
+    street = voters_df.fullstname.str.extract(r"(\d+)", expand=False).astype(int)
+    crossing = street < 5
+    voters_df.loc[crossing, "ward"] = np.where(voters_df.number[crossing] < 200, 1, 2)
+    voters_df.loc[~crossing, "ward"] = 2
+    voters_df.loc[voters_df.index[::97], "lat"] = np.nan
+    config = {
+        "street_col": "fullstname",
+        "street_number_col": "number",
+        "cut_turfs": {"ward": 2, "doors_per_turf": 50},
+    }
+    names, turf_positions, roads = cut_turfs(voters_df, config, DoorTable(voters_df))
+    assert list(roads) == names
+    positions = np.concatenate(turf_positions)
+    selected = (voters_df.ward.to_numpy() == 2) & voters_df.lat.notna().to_numpy()
+    assert np.array_equal(np.sort(positions), np.flatnonzero(selected))
+
+    # the generated roads pick out each turf again, and nobody outside the ward or
+    # without a location, except at a house number the turf holds (missing numbers
+    # are matched by every range on their street)
+    street_index = StreetIndex(voters_df, "fullstname", "number")
+    known = voters_df.number.to_numpy() != -1
+    houses = list(zip(voters_df.fullstname, voters_df.number))
+    for name, expected in zip(names, turf_positions):
+        found = np.unique(np.concatenate(street_index.lookup_roads(roads[name])))
+        found = found[known[found]]
+        assert set(expected[known[expected]]) <= set(found)
+        turf_houses = {houses[i] for i in expected}
+        extra = set(found) - set(expected)
+        assert all(houses[i] in turf_houses and not selected[i] for i in extra)
+
+
+def test_cut_turfs_places_voters_without_an_address_by_street():
+    voters_df = make_voters()
+    unaddressed = np.flatnonzero(voters_df.number.to_numpy() > 0)[::50]
+    voters_df.loc[unaddressed, "address"] = np.nan
+    voters_df.loc[unaddressed, "apt"] = None
+    config = {
+        "street_col": "fullstname",
+        "street_number_col": "number",
+        "cut_turfs": {"doors_per_turf": 50},
+    }
+    names, turf_positions, _ = cut_turfs(voters_df, config, DoorTable(voters_df))
+    turf = np.empty(len(voters_df), dtype=np.int64)
+    for t, positions in enumerate(turf_positions):
+        turf[positions] = t
+    # they are spread over the city rather than pooled into one turf, and each lies
+    # in the turf of their neighbours on their street
+    assert len(np.unique(turf[unaddressed])) > 10
+    for position in unaddressed:
+        same_turf = voters_df.iloc[turf_positions[turf[position]]].dropna(
+            subset=["address"]
+        )
+        on_street = same_turf.number[
+            same_turf.fullstname == voters_df.fullstname[position]
+        ]
+        assert np.abs(on_street - voters_df.number[position]).min() <= 20
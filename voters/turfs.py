@@ -0,0 +1,245 @@
+"""Automatic turf cutting: splits the doors of a ward or precinct into compact turfs of
+about the same size, and describes them as a canvass 'roads' config section"""
+
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from voters.doors import DoorTable
+from voters.routing import project_m
+from voters.streets import MISSING_STREET_NUMBER
+
+DEFAULT_DOORS_PER_TURF = 60
+DEFAULT_TURF_PREFIX = "T"
+# columns a cut_turfs section can select voters by
+CUT_TURF_FILTER_COLS = ["ward", "precinct"]
+
+
+def bisect_turfs(
+    x: np.ndarray,
+    y: np.ndarray,
+    doors_per_turf: int,
+    doors: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Cuts points into compact turfs of about doors_per_turf doors by recursive
+    bisection: each cell is split across its longer side, at the point that leaves
+    each half a whole number of turfs
+    Args:
+        x: point x coordinates (metres)
+        y: point y coordinates (metres)
+        doors_per_turf: target number of doors per turf
+        doors: number of doors at each point (default 1), e.g. the households of a
+            building, which are kept in one turf
+    Returns:
+        turf number of each point; turfs are numbered in bisection order, so turfs
+        with consecutive numbers are neighbours
+    """
+    n = len(x)
+    turf = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        return turf
+    points = np.column_stack([x, y])
+    doors = np.ones(n) if doors is None else np.asarray(doors, dtype=float)
+    n_turfs = max(int(round(doors.sum() / doors_per_turf)), 1)
+    # cells still to be cut: (point indices, number of turfs, first turf number)
+    cells = [(np.arange(n), n_turfs, 0)]
+    while cells:
+        members, k, first = cells.pop()
+        if k == 1:
+            turf[members] = first
+            continue
+        cell = points[members]
+        axis = int(np.argmax(cell.max(axis=0) - cell.min(axis=0)))
+        k_low = k // 2
+        order = np.argsort(cell[:, axis], kind="stable")
+        cumulative = np.cumsum(doors[members[order]])
+        split = int(np.searchsorted(cumulative, cumulative[-1] * k_low / k)) + 1
+        split = min(max(split, 1), len(members) - 1)
+        cells.append((members[order[split:]], k - k_low, first + k_low))
+        cells.append((members[order[:split]], k_low, first))
+    return turf
+
+
+def turf_roads(
+    streets: np.ndarray, numbers: np.ndarray, turf: np.ndarray, names: List[str]
+) -> Dict[str, List[Union[str, dict]]]:
+    """Describes turfs of doors as a canvass 'roads' section: a street name where a
+    turf holds the whole street, otherwise one [low, high] entry per run of house
+    numbers. Doors that belong to no turf (outside the ward or precinct, or without
+    a location) keep their street from being listed by name and end the runs around
+    them. Voters with a missing house number are matched by every range on their
+    street (see StreetIndex.lookup), so such a street may show up in several turfs.
+    Args:
+        streets: street of each door
+        numbers: house number of each door (MISSING_STREET_NUMBER if unknown)
+        turf: turf number of each door (-1 for a door in no turf)
+        names: turf names, indexed by turf number
+    Returns:
+        dictionary of turf name -> list of road entries
+    """
+    street_codes, street_names = pd.factorize(streets, sort=True)
+    # doors without a street cannot be named in a roads section
+    order = np.lexsort((numbers, street_codes))[np.sum(street_codes < 0) :]
+    street_codes, numbers, turf = street_codes[order], numbers[order], turf[order]
+
+    # a run is a stretch of a street's known numbers that belongs to one turf; the
+    # missing numbers sort first on each street
+    known = numbers != MISSING_STREET_NUMBER
+    new_run = np.ones(len(numbers), dtype=bool)
+    new_run[1:] = (
+        (street_codes[1:] != street_codes[:-1]) | (turf[1:] != turf[:-1]) | ~known[:-1]
+    )
+    starts = np.flatnonzero(known & new_run)
+    street_ends = np.searchsorted(street_codes, street_codes[starts], side="right")
+    ends = np.minimum(np.append(starts[1:], len(numbers)), street_ends) - 1
+    # runs of doors in no turf only bound the runs next to them
+    in_turf = turf[starts] >= 0
+    starts, ends = starts[in_turf], ends[in_turf]
+
+    # streets whose doors all belong to one turf are listed by name alone
+    first_door = np.searchsorted(street_codes, np.arange(len(street_names)))
+    turfs_on_street = (
+        pd.DataFrame({"street": street_codes, "turf": turf})
+        .drop_duplicates()
+        .groupby("street")
+        .size()
+        .to_numpy()
+    )
+    whole = (turfs_on_street == 1) & (turf[first_door] >= 0)
+
+    whole_codes = np.flatnonzero(whole)
+    ranges = ~whole[street_codes[starts]]
+
+    # a split street's missing numbers are matched by its ranges, so they only need
+    # an entry of their own in a turf that has no range on the street
+    n_streets = len(street_names)
+    missing = ~known & ~whole[street_codes] & (turf >= 0)
+    missing_keys = np.setdiff1d(
+        turf[missing] * n_streets + street_codes[missing],
+        turf[starts] * n_streets + street_codes[starts],
+    )
+
+    # one row per road entry: turf, street, low and high number (a high below the
+    # low marks a whole street), listed in street and number order
+    entry_turf = np.concatenate(
+        [turf[first_door[whole_codes]], turf[starts][ranges], missing_keys // n_streets]
+    )
+    entry_street = np.concatenate(
+        [whole_codes, street_codes[starts][ranges], missing_keys % n_streets]
+    )
+    entry_low = np.concatenate(
+        [
+            np.full(len(whole_codes), MISSING_STREET_NUMBER),
+            numbers[starts][ranges],
+            np.full(len(missing_keys), MISSING_STREET_NUMBER),
+        ]
+    )
+    entry_high = np.concatenate(
+        [
+            np.full(len(whole_codes), MISSING_STREET_NUMBER - 1),
+            numbers[ends][ranges],
+            np.full(len(missing_keys), MISSING_STREET_NUMBER),
+        ]
+    )
+    by_street = np.lexsort((entry_low, entry_street))
+
+    street_names = [str(s) for s in street_names]
+    roads = {name: [] for name in names}
+    for t, code, low, high in zip(
+        entry_turf[by_street].tolist(),
+        entry_street[by_street].tolist(),
+        entry_low[by_street].tolist(),
+        entry_high[by_street].tolist(),
+    ):
+        roads[names[t]].append(
+            street_names[code] if high < low else {street_names[code]: [low, high]}
+        )
+    return roads
+
+
+def cut_turfs(
+    voters_df: pd.DataFrame, config: dict, doors: DoorTable
+) -> Tuple[List[str], List[np.ndarray], Dict[str, list]]:
+    """Cuts the voters of a ward or precinct into turfs of about the same number of
+    doors
+    Args:
+        voters_df: one row per voter, with the street, street number, lat and lon
+            columns (and the columns filtered on)
+        config: canvass configuration; its 'cut_turfs' section may hold
+            'doors_per_turf', 'turf_prefix' and filters such as 'ward' or
+            'precinct' (a value or a list of values) that select the voters to cut
+        doors: door table of voters_df
+    Returns:
+        tuple: turf names, row positions of each turf's voters (door by door), roads
+            section describing the turfs
+    """
+    cut_config = config["cut_turfs"]
+    doors_per_turf = cut_config.get("doors_per_turf", DEFAULT_DOORS_PER_TURF)
+    prefix = cut_config.get("turf_prefix", DEFAULT_TURF_PREFIX)
+
+    selected = np.ones(len(voters_df), dtype=bool)
+    for col in CUT_TURF_FILTER_COLS:
+        if col in cut_config:
+            values = np.atleast_1d(cut_config[col]).tolist()
+            selected &= voters_df[col].isin(values).to_numpy()
+    lat = voters_df["lat"].to_numpy(dtype=float)
+    lon = voters_df["lon"].to_numpy(dtype=float)
+    located = np.isfinite(lat) & np.isfinite(lon)
+    logging.info(
+        f" --- {int((selected & ~located).sum())} of {int(selected.sum())} selected voters have no location and are left out of the turfs"
+    )
+    keep = selected & located
+    positions = np.flatnonzero(keep)
+
+    # one point per address, at the mean location of its voters, so that the
+    # households of a building (which share a house number) stay in one turf;
+    # voters without an address are placed by their street and house number
+    door = doors.door[positions]
+    point_keys = doors.stop_ids(
+        positions,
+        voters_df[config["street_col"]].to_numpy()[positions],
+        voters_df[config["street_number_col"]].to_numpy(dtype=np.int64)[positions],
+    )
+    _, first_voter, point = np.unique(
+        point_keys, return_index=True, return_inverse=True
+    )
+    n_points = len(first_voter)
+    counts = np.bincount(point, minlength=n_points)
+    point_lat, point_lon = (
+        np.bincount(point, weights=v[positions], minlength=n_points) / counts
+        for v in [lat, lon]
+    )
+    # weight each point by its doors (households)
+    point_doors = np.bincount(
+        np.unique(point * np.int64(doors.n_doors) + door) // doors.n_doors,
+        minlength=n_points,
+    )
+    voter_turf = bisect_turfs(
+        *project_m(point_lat, point_lon), doors_per_turf, point_doors
+    )[point]
+
+    n_turfs = voter_turf.max() + 1 if len(positions) else 0
+    width = len(str(n_turfs))
+    names = [f"{prefix}{t + 1:0{width}d}" for t in range(n_turfs)]
+    # each turf's voters door by door (in file order at each door)
+    by_turf = np.lexsort((positions, door, voter_turf))
+    bounds = np.searchsorted(voter_turf[by_turf], np.arange(n_turfs + 1))
+    turf_positions = [
+        positions[by_turf[bounds[t] : bounds[t + 1]]] for t in range(n_turfs)
+    ]
+
+    # street and number of each point, from its first voter, and of the house
+    # numbers whose voters are in no turf, so that the roads leave those out (except
+    # at a house number a turf also holds, which no range can split)
+    street_col, number_col = config["street_col"], config["street_number_col"]
+    point_rows = voters_df.iloc[positions[first_voter]]
+    left_out = voters_df.loc[~keep, [street_col, number_col]].drop_duplicates()
+    roads = turf_roads(
+        np.concatenate([point_rows[street_col], left_out[street_col]]),
+        np.concatenate([point_rows[number_col], left_out[number_col]]).astype(np.int64),
+        np.concatenate([voter_turf[first_voter], np.full(len(left_out), -1)]),
+        names,
+    )
+    return names, turf_positions, roads
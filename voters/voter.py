@@ -1,16 +1,38 @@
+import uuid
+
 import dash
 from dash import Dash, dcc, html, Input, Output, State
-import plotly.express as px
 import geopandas as gpd
 import pandas as pd
-from utils.io import yaml_to_dict
+from utils.io import write_csv_chunks, yaml_to_dict
+from voters.doors import DOOR_COLS, DoorTable
+from voters.filters import VoterFilter
+from voters.figures import MapTraces, draw_voters, map_camera, selection_polygon
+from voters.state import VoterSessions, VoterState
+from voters.voter_file import read_voter_file
 import click
 import logging
-from math import ceil
 
 
 logging.basicConfig(level=logging.INFO)
 
+# order in which selected voters are written out
+EXPORT_SORT_COLS = ["fullstname", "number", "age_on_election_day"]
+
+
+def map_columns(config: dict) -> list:
+    """Returns the voter-file columns used to filter and draw voters"""
+    return (
+        ["lat", "lon", "politics", "voter_id_number", "fullname"]
+        + [config["hover_name"]]
+        + VoterFilter(config).columns
+    )
+
+
+def voter_columns(config: dict) -> list:
+    """Returns the voter-file columns used by the Dash app"""
+    return map_columns(config) + EXPORT_SORT_COLS + config["write_out_cols"] + DOOR_COLS
+
 
 @click.command()
 @click.argument("config_path", type=click.Path(exists=True))
@@ -26,43 +48,32 @@ def voter(config_path):
     # voter_gdf = gpd.read_file(config["voter_locations"])
 
     # voter_df = pd.DataFrame(voter_gdf.drop(columns="geometry"))
-    voter_df = pd.read_csv(config["voter_locations"])
-    # get the right ward
-    voter_df = voter_df.loc[(voter_df.ward.isin(config["ward"]))]
-
-    # subset the voters to get rid of the exclude politics
-    voter_df = voter_df.loc[~voter_df.politics.isin(config["exclude_politics"])]
-
-    # mark the voters to include, starting with politics
-    voter_df["includes"] = [
-        1 if i in config["include_politics"] else 0 for i in voter_df.politics
-    ]
-
-    # also mark the other 'includes'
-    for inc in config["include_boolean"]:
-        voter_df["includes"] = [
-            1 if i == 1 else x for i, x in zip(voter_df[inc], voter_df.includes)
-        ]
-
-    # mark the excludes
-    voter_df["excludes"] = 0
-    for exclude in config["exclude_boolean"]:
-        voter_df["excludes"] = [
-            1 if e == 1 else x for e, x in zip(voter_df[exclude], voter_df.excludes)
-        ]
-
-    # get the includes
-    voter_df = voter_df.loc[voter_df.includes == 1]
-
-    # remove the excludes
-    voter_df = voter_df.loc[voter_df.excludes == 0]
+    voter_df = read_voter_file(config["voter_locations"], voter_columns(config), config)
+    # keep the wards, politics and include/exclude flags asked for in the config
+    voter_df = VoterFilter(config).apply(voter_df)
 
     # get the UID
     voter_df["uid"] = voter_df.index
+
+    # count the doors of each export with integer door IDs; the address and
+    # apartment strings stay in the frame only if they are drawn or written out
+    doors = DoorTable(voter_df)
+    voter_df = voter_df.drop(
+        columns=[
+            c
+            for c in DOOR_COLS
+            if c not in map_columns(config) + config["write_out_cols"]
+        ]
+    )
+
+    # the voter frame stays on the server; the browser only holds uids, a version
+    # and its session ID, under which the server keeps that tab's exports and map
+    sessions = VoterSessions(VoterState(voter_df, doors))
     # Initialize Dash app
     app = Dash(__name__)
 
-    app.layout = html.Div(
+    # a function, so that every page load gets its own session ID
+    app.layout = lambda: html.Div(
         [
             html.H3("Lasso-select points on map"),
             # Move the export button and output above the map
@@ -75,55 +86,78 @@ def voter(config_path):
             ),
             dcc.Graph(id="map", config={"scrollZoom": True}),
             # Hidden data stores
-            dcc.Store(id="voter-data", data=voter_df.to_dict("records")),
+            dcc.Store(id="session-id", data=str(uuid.uuid4())),
+            dcc.Store(id="voter-version", data=0),
+            dcc.Store(id="selection", data=None),
             dcc.Store(id="selected-ids", data=[]),
             dcc.Store(id="export-count", data=0),
-            dcc.Store(id="exported-ids", data=[]),
         ]
     )
 
-    @app.callback(
-        Output("map", "figure"),
-        Input("voter-data", "data"),
-        Input("exported-ids", "data"),
-    )
-    def update_map(voter_data, exported_ids):
-        df = pd.DataFrame(voter_data)
-        if exported_ids:
-            df = df[~df["uid"].isin(exported_ids)]
-        fig = px.scatter_map(
-            df,
-            lat="lat",
-            lon="lon",
-            hover_name=config["hover_name"],
-            hover_data={"voter_id_number": True, "uid": True, "fullname": False},
-            zoom=12,
-            height=900,
-            color="politics",
-        )
-        fig.update_layout(mapbox_style="basic")
-        fig.update_traces(marker=dict(size=5))
-        fig.update_layout(clickmode="event+select", dragmode="lasso")
+    # in aggregate mode the map is redrawn for the viewport after every pan or zoom
+    map_inputs = [Input("voter-version", "data")]
+    if config.get("map_mode", "points") == "aggregate":
+        map_inputs.append(Input("map", "relayoutData"))
+
+    @app.callback(Output("map", "figure"), *map_inputs, State("session-id", "data"))
+    def update_map(version, *args):
+        # args: (relayoutData, session ID) in aggregate mode, else (session ID,)
+        state = sessions.get(args[-1])
+        relayout_data = args[0] if len(args) == 2 else None
+        # after an export, only remove the exported points from the drawn figure
+        if dash.ctx.triggered_id == "voter-version" and isinstance(
+            state.map_view, MapTraces
+        ):
+            return state.map_view.remove(state.is_exported)
+        if dash.ctx.triggered_id == "map":
+            camera = map_camera(relayout_data)
+            if camera is None:
+                return dash.no_update
+            state.camera = camera
+        fig, state.map_view = draw_voters(state.remaining(), config, state.camera)
         return fig
 
+    # send the server only the lasso/box outline (or, for clicks, the clicked
+    # points' customdata) instead of every selected point
+    app.clientside_callback(
+        """
+        function(selected) {
+            if (!selected) { return null; }
+            if (selected.lassoPoints || selected.range) {
+                return {lassoPoints: selected.lassoPoints, range: selected.range};
+            }
+            return {points: selected.points.map(p => ({customdata: p.customdata}))};
+        }
+        """,
+        Output("selection", "data"),
+        Input("map", "selectedData"),
+    )
+
     @app.callback(
         Output("selected-ids", "data"),
         Output("output", "children"),
-        Input("map", "selectedData"),
-        State("voter-data", "data"),
+        Input("selection", "data"),
+        State("session-id", "data"),
     )
-    def on_select(selected_data, voter_data):
-        if not selected_data:
+    def on_select(selection, session_id):
+        if not selection:
             return [], "No points selected."
-
-        df = pd.DataFrame(voter_data)
-
-        # Extract 'uid' directly from selected points
-        selected_ids = [
-            p["customdata"][1] if "customdata" in p else p["hoverdata"]["uid"]
-            for p in selected_data["points"]
-        ]
-        selected_df = df[df["uid"].isin(selected_ids)]
+        state = sessions.get(session_id)
+
+        # resolve a lasso or box against the spatial index; clicked points (or
+        # bins) carry their uid in customdata
+        polygon = selection_polygon(selection)
+        if polygon is not None:
+            selected_ids = state.in_polygon(polygon).tolist()
+        else:
+            # a session that dropped its map redraws it as the browser shows it (the
+            # same remaining voters and viewport); it is not kept, so the next map
+            # update sends the full figure
+            map_view = state.map_view
+            if map_view is None:
+                _, map_view = draw_voters(state.remaining(), config, state.camera)
+            selected_ids = map_view.selected_uids(selection["points"])
+        selected_df = state.select(selected_ids)
 
         selected_names = selected_df["fullname"].tolist()
 
@@ -133,54 +167,53 @@ def voter(config_path):
         )
 
     @app.callback(
-        Output("voter-data", "data"),
-        Output("exported-ids", "data"),
+        Output("voter-version", "data"),
         Output("export-btn", "children"),
         Output("export-count", "data"),
         Input("export-btn", "n_clicks"),
         State("selected-ids", "data"),
-        State("voter-data", "data"),
-        State("exported-ids", "data"),
         State("export-count", "data"),
+        State("session-id", "data"),
         prevent_initial_call=True,
     )
-    def export_selected(
-        n_clicks, selected_ids, current_data, exported_ids, export_count
-    ):
+    def export_selected(n_clicks, selected_ids, export_count, session_id):
         if not selected_ids:
-            return dash.no_update, dash.no_update, "⚠️ No points to export", export_count
-
-        df = pd.DataFrame(current_data)
-        selected_df = df[df["uid"].isin(selected_ids)]
-
-        write_df = selected_df.sort_values(
-            by=["fullstname", "number", "age_on_election_day"],
-            ascending=True,
-            inplace=True,
-        )
+            return dash.no_update, "⚠️ No points to export", export_count
+        state = sessions.get(session_id)
+
+        # sort only the sort keys; the extract files take their rows straight from
+        # the voter frame in that order
+        positions = state.positions(selected_ids)
+        sort_keys = state.voter_df[EXPORT_SORT_COLS].iloc[positions]
+        order = positions[
+            sort_keys.reset_index(drop=True).sort_values(by=EXPORT_SORT_COLS).index
+        ]
 
-        write_df = selected_df[config["write_out_cols"]]
-        # Write file
+        # Write files
         export_count += 1
-
-        n_records = len(write_df)
-        n_files = ceil(n_records / config["file_length"])
-        id_start = 0
-        for f in range(n_files):
-            id_end = min(n_records - 1, id_start + config["file_length"] - 1)
-            filename = f"{config['output_file_path']}/{config['output_file_prefix']}{export_count}_{f+1}.csv"
-            write_df.iloc[id_start:id_end, :].to_csv(filename, index=False)
-            id_start = id_end + 1
-            logging.info(f" --- >>> Wrote voter extract to {filename}")
-        # Update list of exported IDs
-        updated_exported_ids = list(set(exported_ids + selected_ids))
-
-        return (
-            current_data,
-            updated_exported_ids,
-            f"📁 Exported {len(selected_df)} to selected_points_{export_count}.csv",
-            export_count,
+        prefix = f"{config['output_file_prefix']}{export_count}"
+        paths = write_csv_chunks(
+            state.voter_df,
+            config["output_file_path"],
+            prefix,
+            config["file_length"],
+            order=order,
+            columns=config["write_out_cols"],
+            workers=config.get("export_workers", 1),
+            combined=config.get("export_combined"),
+        )
+        # Flag the exported voters; the new version token redraws the map
+        version = state.mark_exported(selected_ids)
+
+        # the numbered files, then the combined file (if one was written)
+        chunk_paths = [path for path in paths if path.stem != prefix]
+        message = (
+            f"📁 Exported {len(order)} voters at {state.doors.count_doors(positions)}"
+            f" doors to {len(chunk_paths)} file(s) named {prefix}_*"
         )
+        if len(paths) > len(chunk_paths):
+            message += f" and to {paths[-1].name}"
+        return version, message, export_count
 
     logging.info(
         " --- Newton Voter Dash app is running. To see the Dash app, go to http://127.0.0.1:8050/ in an html browser window"
@@ -0,0 +1,31 @@
+"""Loading of voter files shared by canvass.py and voter.py"""
+
+from typing import List
+
+import pandas as pd
+
+from utils.io import read_csv_cached
+
+# low-cardinality text columns stored as categoricals in the columnar cache
+VOTER_CATEGORICAL_COLS = ["politics", "ward", "fullstname"]
+
+
+def read_voter_file(voter_file: str, columns: List[str], config: dict) -> pd.DataFrame:
+    """Reads the columns a tool needs from a voter csv
+    Args:
+        voter_file: path to the voter csv
+        columns: columns used by the calling tool (duplicates are ignored)
+        config: tool configuration; 'voter_cache' (default True) turns the columnar
+            cache off and on, and 'cache_dir' optionally says where it lives
+    Returns:
+        dataframe with the requested columns, indexed by row number in the csv
+    """
+    columns = list(dict.fromkeys(columns))
+    if not config.get("voter_cache", True):
+        return pd.read_csv(voter_file, usecols=columns)[columns]
+    return read_csv_cached(
+        voter_file,
+        columns=columns,
+        categorical_cols=VOTER_CATEGORICAL_COLS,
+        cache_dir=config.get("cache_dir"),
+    )